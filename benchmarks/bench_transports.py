@@ -0,0 +1,74 @@
+"""
+Compare the transports against the stand-in API.
+
+Every transport walks all pages of a feedback resource, sequentially and from
+a pool of threads sharing one client. Run from the root of the repository:
+
+    PYTHONPATH=. python benchmarks/bench_transports.py --total 20000 --limit 100 --threads 8
+"""
+from concurrent.futures import ThreadPoolExecutor
+from mopinion import MopinionClient
+from mopinion.test.mocks.server import StandInServer
+from mopinion.transports import HttpxTransport
+from mopinion.transports import RequestsTransport
+from mopinion.transports import Urllib3Transport
+
+import argparse
+import time
+
+
+def walk(client, limit, page):
+    response = client.get_datasets_feedback(
+        dataset_id=1, query_params={"limit": limit, "page": page}
+    )
+    return len(response.content)
+
+
+def run(name, transport, server, args):
+    client = MopinionClient(
+        "PUBLIC_KEY", "PRIVATE_KEY", transport=transport, base_url=server.url
+    )
+    pages = range(1, args.total // args.limit + 1)
+    with client:
+        start = time.perf_counter()
+        for page in pages:
+            walk(client, args.limit, page)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as executor:
+            list(executor.map(lambda page: walk(client, args.limit, page), pages))
+        threaded = time.perf_counter() - start
+
+    print(
+        f"{name:<10} sequential {len(pages) / sequential:8.1f} pages/s   "
+        f"{args.threads} threads {len(pages) / threaded:8.1f} pages/s   "
+        f"ratio {client.stats.compression_ratio:.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--total", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with StandInServer(total=args.total, latency=args.latency) as server:
+        transports = {
+            "requests": RequestsTransport(base_url=server.url),
+            "urllib3": Urllib3Transport(base_url=server.url),
+        }
+        try:
+            # the stand-in only speaks HTTP/1.1, h2c is not supported by httpx
+            transports["httpx"] = HttpxTransport(base_url=server.url, http2=False)
+        except ImportError:
+            print("httpx is not installed, skipping")
+
+        for name, transport in transports.items():
+            run(name, transport, server, args)
+
+
+if __name__ == "__main__":
+    main()
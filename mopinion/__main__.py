@@ -0,0 +1,6 @@
+from mopinion.cli import main
+
+import sys
+
+
+sys.exit(main())
@@ -0,0 +1,467 @@
+"""
+Mergeable streaming aggregates of feedback.
+
+Every aggregate is updated one value at a time, merged with another aggregate
+of the same kind and serialized with ``to_dict`` / ``from_dict``. States built
+on different shards or processes, or on successive runs, merge into the state
+that would have been built from all the feedback at once, so a daily run only
+folds in the new feedback:
+
+- ``Sum``: count, total, minimum and maximum.
+- ``Histogram``: exact count per value, for scores.
+- ``QuantileSketch``: quantiles within a relative accuracy (DDSketch).
+- ``HyperLogLog``: approximate number of distinct values.
+
+``FeedbackAggregates`` combines them for the feedback items of a resource. It
+remembers the ids of the items of its last day, so the items of that day fetched
+again by the next increment are not counted twice.
+
+Examples:
+  >>> from mopinion.aggregates import FeedbackAggregates
+  >>> aggregates = FeedbackAggregates.load("nps.json", fields=("nps",))
+  >>> query = FeedbackQuery(date_from=aggregates.last_created[:10]) if aggregates.last_created else None
+  >>> aggregates.update_pages(client.get_datasets_feedback(dataset_id=123, query_params=query, iterator=True))
+  >>> aggregates.dump("nps.json")
+  >>> aggregates.fields["nps"].quantiles.quantile(0.5)
+"""
+from base64 import b64decode
+from base64 import b64encode
+from collections import defaultdict
+from mopinion.decoding import to_float
+from requests.models import Response
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+import hashlib
+import json
+import math
+import os
+
+
+__all__ = [
+    "FeedbackAggregates",
+    "FieldAggregates",
+    "Histogram",
+    "HyperLogLog",
+    "QuantileSketch",
+    "Sum",
+]
+
+
+def _check_type(aggregate, other) -> None:
+    if type(aggregate) is not type(other):
+        raise ValueError(
+            f"Cannot merge {type(other).__name__} into {type(aggregate).__name__}"
+        )
+
+
+class Sum:
+    """Count, total, minimum and maximum of values."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def merge(self, other: "Sum") -> "Sum":
+        _check_type(self, other)
+        self.count += other.count
+        self.total += other.total
+        for value in (other.minimum, other.maximum):
+            if value is not None:
+                self.minimum = value if self.minimum is None else min(self.minimum, value)
+                self.maximum = value if self.maximum is None else max(self.maximum, value)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "Sum":
+        aggregate = cls()
+        aggregate.count = state["count"]
+        aggregate.total = state["total"]
+        aggregate.minimum = state["minimum"]
+        aggregate.maximum = state["maximum"]
+        return aggregate
+
+
+class Histogram:
+    """Exact count per value."""
+
+    def __init__(self) -> None:
+        self.counts: Dict[float, int] = defaultdict(int)
+
+    def update(self, value: float) -> None:
+        self.counts[value] += 1
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        _check_type(self, other)
+        for value, count in other.counts.items():
+            self.counts[value] += count
+        return self
+
+    def to_dict(self) -> dict:
+        return {"counts": sorted(self.counts.items())}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "Histogram":
+        aggregate = cls()
+        for value, count in state["counts"]:
+            aggregate.counts[value] = count
+        return aggregate
+
+
+class QuantileSketch:
+    """Quantiles with a relative error of at most ``relative_accuracy`` (DDSketch).
+
+    Values are counted in buckets of exponentially growing width, so the size
+    of the sketch grows with the logarithm of the range of the values.
+
+    Args:
+      relative_accuracy (float): Defaults to 0.01.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"'{relative_accuracy}' is not a valid relative accuracy.")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive: Dict[int, int] = defaultdict(int)
+        self.negative: Dict[int, int] = defaultdict(int)
+        self.zero = 0
+        self.count = 0
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def update(self, value: float) -> None:
+        if value > 0:
+            self.positive[self._index(value)] += 1
+        elif value < 0:
+            self.negative[self._index(-value)] += 1
+        else:
+            self.zero += 1
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate of the ``q`` quantile, 0 <= q <= 1."""
+        if not 0 <= q <= 1:
+            raise ValueError(f"'{q}' is not a valid quantile.")
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._value(index)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.positive))
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        _check_type(self, other)
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches of different relative accuracy")
+        for index, count in other.positive.items():
+            self.positive[index] += count
+        for index, count in other.negative.items():
+            self.negative[index] += count
+        self.zero += other.zero
+        self.count += other.count
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive": sorted(self.positive.items()),
+            "negative": sorted(self.negative.items()),
+            "zero": self.zero,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "QuantileSketch":
+        aggregate = cls(state["relative_accuracy"])
+        for index, count in state["positive"]:
+            aggregate.positive[index] = count
+        for index, count in state["negative"]:
+            aggregate.negative[index] = count
+        aggregate.zero = state["zero"]
+        aggregate.count = aggregate.zero + sum(aggregate.positive.values()) + sum(
+            aggregate.negative.values()
+        )
+        return aggregate
+
+
+class HyperLogLog:
+    """Approximate count of distinct values, within about ``1.04 / sqrt(2 ** precision)``.
+
+    Args:
+      precision (int): Between 4 and 16, uses ``2 ** precision`` bytes. Defaults to 12.
+    """
+
+    def __init__(self, precision: int = 12) -> None:
+        if not 4 <= precision <= 16:
+            raise ValueError(f"'{precision}' is not a valid precision.")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def update(self, value: Hashable) -> None:
+        digest = hashlib.blake2b(repr(value).encode("utf-8"), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "little")
+        bits = 64 - self.precision
+        register = hashed >> bits
+        rest = hashed & ((1 << bits) - 1)
+        rank = bits - rest.bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def __len__(self) -> int:
+        return self.estimate()
+
+    def estimate(self) -> int:
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # linear counting for small cardinalities
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        _check_type(self, other)
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "precision": self.precision,
+            "registers": b64encode(bytes(self.registers)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "HyperLogLog":
+        aggregate = cls(state["precision"])
+        aggregate.registers = bytearray(b64decode(state["registers"]))
+        return aggregate
+
+
+class FieldAggregates:
+    """Sum, histogram and quantiles of the values of a field."""
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self.sum = Sum()
+        self.histogram = Histogram()
+        self.quantiles = QuantileSketch(relative_accuracy)
+
+    def update(self, value: float) -> None:
+        self.sum.update(value)
+        self.histogram.update(value)
+        self.quantiles.update(value)
+
+    def merge(self, other: "FieldAggregates") -> "FieldAggregates":
+        self.sum.merge(other.sum)
+        self.histogram.merge(other.histogram)
+        self.quantiles.merge(other.quantiles)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "sum": self.sum.to_dict(),
+            "histogram": self.histogram.to_dict(),
+            "quantiles": self.quantiles.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "FieldAggregates":
+        aggregate = cls()
+        aggregate.sum = Sum.from_dict(state["sum"])
+        aggregate.histogram = Histogram.from_dict(state["histogram"])
+        aggregate.quantiles = QuantileSketch.from_dict(state["quantiles"])
+        return aggregate
+
+
+class FeedbackAggregates:
+    """Aggregates of feedback items: count, distinct ids and numeric fields.
+
+    Args:
+      fields (iterable): Field keys aggregated. Defaults to ``nps``, ``ces`` and ``rating``.
+      relative_accuracy (float): Of the quantiles. Defaults to 0.01.
+      precision (int): Of the distinct count of ids. Defaults to 12.
+
+    Attributes:
+      count (int): Items, counting an item again if it was updated twice.
+      ids (HyperLogLog): Distinct item ids.
+      last_created (str): Creation date of the newest item, to fetch the next increment.
+      last_day_ids (set): Ids of the items created on the day of ``last_created``,
+        skipped when fetched again.
+    """
+
+    def __init__(
+        self,
+        fields: Iterable[str] = ("nps", "ces", "rating"),
+        relative_accuracy: float = 0.01,
+        precision: int = 12,
+    ) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.count = 0
+        self.ids = HyperLogLog(precision)
+        self.fields = {key: FieldAggregates(relative_accuracy) for key in fields}
+        self.last_created: Optional[str] = None
+        self.last_day_ids: Set[Hashable] = set()
+        # last day and its ids before the increment being folded in
+        self._boundary: Optional[Tuple[str, Set[Hashable]]] = None
+
+    def _seen(self, item: dict) -> bool:
+        """Whether the item was folded in, and remember it if it is of the last day."""
+        created, item_id = item.get("created"), item.get("id")
+        if not isinstance(created, str):
+            return False
+        day = created[:10]
+        last_day = self.last_created[:10] if self.last_created else None
+        if item_id is not None:
+            if day == last_day and item_id in self.last_day_ids:
+                return True
+            boundary = self._boundary
+            if boundary is not None and day == boundary[0] and item_id in boundary[1]:
+                return True
+        if last_day is None or day > last_day:
+            if self._boundary is None and last_day is not None:
+                # items of the previous last day may still come, newest first
+                self._boundary = (last_day, self.last_day_ids)
+            self.last_day_ids = set()
+            last_day = day
+        if day == last_day:
+            if item_id is not None:
+                self.last_day_ids.add(item_id)
+            if self.last_created is None or created > self.last_created:
+                self.last_created = created
+        return False
+
+    def update(self, item: dict) -> bool:
+        """Fold in a feedback item.
+
+        Returns:
+          False if the item was already folded in, fetched again from the last day.
+        """
+        if self._seen(item):
+            return False
+        self.count += 1
+        if "id" in item:
+            self.ids.update(item["id"])
+        for answer in item.get("fields") or ():
+            if isinstance(answer, dict) and answer.get("key") in self.fields:
+                value = to_float(answer.get("value"))
+                if value is not None and value == value:
+                    self.fields[answer["key"]].update(value)
+        return True
+
+    def update_pages(self, pages: Iterable[Union[Response, dict]]) -> int:
+        """Fold in the items of pages, responses or decoded dicts, one increment.
+
+        Returns:
+          Number of items folded in.
+        """
+        count = 0
+        self._boundary = None
+        for page in pages:
+            if not isinstance(page, dict):
+                page = page.json()
+            for item in page.get("data") or ():
+                if isinstance(item, dict) and self.update(item):
+                    count += 1
+        return count
+
+    def merge(self, other: "FeedbackAggregates") -> "FeedbackAggregates":
+        """Fold in the aggregates of ``other``, e.g. of another shard."""
+        self.count += other.count
+        self.ids.merge(other.ids)
+        for key, aggregates in other.fields.items():
+            if key in self.fields:
+                self.fields[key].merge(aggregates)
+            else:
+                self.fields[key] = FieldAggregates.from_dict(aggregates.to_dict())
+        if other.last_created is not None:
+            if self.last_created is None or other.last_created[:10] > self.last_created[:10]:
+                self.last_day_ids = set(other.last_day_ids)
+            elif other.last_created[:10] == self.last_created[:10]:
+                self.last_day_ids |= other.last_day_ids
+            if self.last_created is None or other.last_created > self.last_created:
+                self.last_created = other.last_created
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "count": self.count,
+            "ids": self.ids.to_dict(),
+            "fields": {key: aggregates.to_dict() for key, aggregates in self.fields.items()},
+            "last_created": self.last_created,
+            "last_day_ids": sorted(self.last_day_ids, key=str),
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "FeedbackAggregates":
+        aggregates = cls(fields=(), relative_accuracy=state["relative_accuracy"])
+        aggregates.count = state["count"]
+        aggregates.ids = HyperLogLog.from_dict(state["ids"])
+        aggregates.fields = {
+            key: FieldAggregates.from_dict(field) for key, field in state["fields"].items()
+        }
+        aggregates.last_created = state["last_created"]
+        aggregates.last_day_ids = set(state.get("last_day_ids", ()))
+        return aggregates
+
+    def dump(self, path: str) -> None:
+        """Write the state to ``path``, atomically."""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, separators=(",", ":"))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "FeedbackAggregates":
+        """Read the state written by ``dump``, or start from ``cls(**kwargs)``
+        if ``path`` does not exist."""
+        if not os.path.exists(path):
+            return cls(**kwargs)
+        with open(path, encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
@@ -0,0 +1,300 @@
+"""
+Score aggregates (NPS, CES, CSAT, ratings) over feedback, grouped by dataset,
+report, day or tag.
+
+``ScoreAggregator`` consumes pages of feedback and writes the group and the
+scores of every item into preallocated NumPy columns, grown geometrically when
+items count in several groups; every ``batch_size`` items the columns are
+folded into per-group totals with ``bincount`` and reused. Memory is bounded by
+the batch size and the number of groups.
+
+``aggregate_reference`` computes the same results with plain Python loops.
+
+Examples:
+  >>> from mopinion.analytics import ScoreAggregator
+  >>> aggregator = ScoreAggregator(fields={"nps": "nps", "ces": "ces"}, group_by="day")
+  >>> aggregator.update_pages(client.get_datasets_feedback(dataset_id=123, iterator=True))
+  >>> aggregator.result()["2023-01-01"]["nps"].score
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from dataclasses import field
+from mopinion.decoding import to_float
+from requests.models import Response
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Union
+
+
+__all__ = ["aggregate_reference", "ScoreAggregator", "Summary"]
+
+
+METRICS = {"nps", "ces", "csat", "rating"}
+GROUPS = {None, "dataset", "report", "day", "tag"}
+
+DEFAULT_FIELDS = {"nps": "nps", "ces": "ces", "rating": "rating"}
+
+
+@dataclass
+class Summary:
+    """Aggregate of the scores of a field in a group.
+
+    ``score`` is the NPS (-100 to 100) for ``nps``, the share of 4 and 5 ratings
+    (0 to 100) for ``csat`` and the mean for ``ces`` and ``rating``.
+    """
+
+    count: int = 0
+    mean: Optional[float] = None
+    score: Optional[float] = None
+    distribution: Dict[float, int] = field(default_factory=dict)
+
+
+def _check(fields: Dict[str, str], group_by: Optional[str]) -> None:
+    for key, metric in fields.items():
+        if metric not in METRICS:
+            raise ValueError(
+                f"'{metric}' is not a valid metric for '{key}'. Please consider one of: "
+                f"'{', '.join(sorted(METRICS))}'"
+            )
+    if group_by not in GROUPS:
+        raise ValueError(
+            f"'{group_by}' is not a valid group. Please consider one of: "
+            f"'{', '.join(sorted(group for group in GROUPS if group))}'"
+        )
+
+
+def _groups(item: dict, group_by: Optional[str]) -> List[Hashable]:
+    """Groups of a feedback item: one, or one per tag."""
+    if group_by is None:
+        return [None]
+    if group_by == "dataset":
+        return [item.get("dataset_id")]
+    if group_by == "report":
+        return [item.get("report_id")]
+    if group_by == "day":
+        created = item.get("created")
+        return [created[:10] if isinstance(created, str) else None]
+    return list(dict.fromkeys(item.get("tags") or ()))
+
+
+def _scores(item: dict, fields: Dict[str, str]) -> Dict[str, float]:
+    scores = {}
+    for answer in item.get("fields") or ():
+        if isinstance(answer, dict) and answer.get("key") in fields:
+            value = to_float(answer.get("value"))
+            if value is not None and value == value:
+                scores[answer["key"]] = value
+    return scores
+
+
+def _score(metric: str, count: int, total: float, high: float, low: float):
+    if not count:
+        return None
+    if metric == "nps":
+        return 100 * (high - low) / count
+    if metric == "csat":
+        return 100 * high / count
+    return total / count
+
+
+def _items(pages: Iterable[Union[Response, dict]]) -> Iterator[dict]:
+    for page in pages:
+        if not isinstance(page, dict):
+            page = page.json()
+        for item in page.get("data") or ():
+            if isinstance(item, dict):
+                yield item
+
+
+def aggregate_reference(
+    items: Iterable[dict],
+    fields: Dict[str, str] = DEFAULT_FIELDS,
+    group_by: Optional[str] = None,
+) -> Dict[Hashable, Dict[str, Summary]]:
+    """Aggregate the scores of feedback ``items`` with plain Python.
+
+    See ``ScoreAggregator`` for the arguments and the result.
+    """
+    _check(fields, group_by)
+    totals = defaultdict(lambda: [0, 0.0, 0, 0, defaultdict(int)])
+    for item in items:
+        scores = _scores(item, fields)
+        for group in _groups(item, group_by):
+            for key, value in scores.items():
+                total = totals[group, key]
+                total[0] += 1
+                total[1] += value
+                metric = fields[key]
+                if metric == "nps":
+                    total[2] += value >= 9
+                    total[3] += value <= 6
+                elif metric == "csat":
+                    total[2] += value >= 4
+                total[4][value] += 1
+
+    result = defaultdict(dict)
+    for (group, key), (count, total, high, low, distribution) in totals.items():
+        result[group][key] = Summary(
+            count=count,
+            mean=total / count,
+            score=_score(fields[key], count, total, high, low),
+            distribution=dict(sorted(distribution.items())),
+        )
+    return dict(result)
+
+
+class _Columns:
+    """Group codes and values of a field, in preallocated NumPy arrays."""
+
+    def __init__(self, numpy, capacity: int) -> None:
+        self.np = numpy
+        self.codes = numpy.empty(capacity, dtype=numpy.intp)
+        self.values = numpy.empty(capacity, dtype=numpy.float64)
+        self.size = 0
+
+    def append(self, code: int, value: float) -> None:
+        if self.size == len(self.codes):
+            self._grow()
+        self.codes[self.size] = code
+        self.values[self.size] = value
+        self.size += 1
+
+    def _grow(self) -> None:
+        capacity = max(16, 2 * len(self.codes))
+        for name in ("codes", "values"):
+            column = getattr(self, name)
+            grown = self.np.empty(capacity, dtype=column.dtype)
+            grown[: self.size] = column[: self.size]
+            setattr(self, name, grown)
+
+    def clear(self) -> None:
+        self.size = 0
+
+
+class ScoreAggregator:
+    """Aggregate scores of feedback per group, in NumPy batches.
+
+    Requires NumPy, install it with: pip install mopinion[analytics]
+
+    Args:
+      fields (dict): Field keys to aggregate and their metric, one of ``nps``,
+        ``ces``, ``csat`` (ratings from 1 to 5) or ``rating``. Defaults to
+        ``{"nps": "nps", "ces": "ces", "rating": "rating"}``.
+      group_by (str): Optional. ``dataset``, ``report``, ``day`` (of creation)
+        or ``tag``. Items with several tags count in each of them.
+      batch_size (int): Items buffered before folding. Defaults to 10,000.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, str] = DEFAULT_FIELDS,
+        group_by: Optional[str] = None,
+        batch_size: int = 10_000,
+    ) -> None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError(
+                "ScoreAggregator requires numpy, install it with: pip install mopinion[analytics]"
+            ) from None
+
+        _check(fields, group_by)
+        self.np = numpy
+        self.fields = dict(fields)
+        self.group_by = group_by
+        self.batch_size = batch_size
+        self.items = 0
+        # group -> code, code -> group
+        self._codes: Dict[Hashable, int] = {}
+        self._groups: List[Hashable] = []
+        # per field: group codes and values of the batch
+        self._batch: Dict[str, _Columns] = {
+            key: _Columns(numpy, batch_size) for key in self.fields
+        }
+        self._buffered = 0
+        # per field: count, total, high and low per group code
+        self._totals = {key: numpy.zeros((4, 0)) for key in self.fields}
+        self._distributions = {key: defaultdict(int) for key in self.fields}
+
+    def _code(self, group: Hashable) -> int:
+        code = self._codes.get(group)
+        if code is None:
+            code = self._codes[group] = len(self._groups)
+            self._groups.append(group)
+        return code
+
+    def update(self, items: Iterable[dict]) -> None:
+        """Add feedback items."""
+        for item in items:
+            scores = _scores(item, self.fields)
+            codes = [self._code(group) for group in _groups(item, self.group_by)]
+            for key, value in scores.items():
+                columns = self._batch[key]
+                for code in codes:
+                    columns.append(code, value)
+            self.items += 1
+            self._buffered += 1
+            if self._buffered >= self.batch_size:
+                self.flush()
+
+    def update_pages(self, pages: Iterable[Union[Response, dict]]) -> None:
+        """Add the feedback of pages, responses or decoded dicts."""
+        self.update(_items(pages))
+
+    def flush(self) -> None:
+        """Fold the buffered items into the totals."""
+        np = self.np
+        size = len(self._groups)
+        for key, columns in self._batch.items():
+            totals = self._totals[key]
+            if totals.shape[1] < size:
+                totals = self._totals[key] = np.pad(totals, ((0, 0), (0, size - totals.shape[1])))
+            if not columns.size:
+                continue
+
+            codes_array = columns.codes[: columns.size]
+            values_array = columns.values[: columns.size]
+            metric = self.fields[key]
+            totals[0] += np.bincount(codes_array, minlength=size)
+            totals[1] += np.bincount(codes_array, weights=values_array, minlength=size)
+            if metric == "nps":
+                totals[2] += np.bincount(codes_array, weights=values_array >= 9, minlength=size)
+                totals[3] += np.bincount(codes_array, weights=values_array <= 6, minlength=size)
+            elif metric == "csat":
+                totals[2] += np.bincount(codes_array, weights=values_array >= 4, minlength=size)
+
+            pairs, counts = np.unique(
+                np.stack([codes_array.astype(np.float64), values_array]), axis=1, return_counts=True
+            )
+            distribution = self._distributions[key]
+            for code, value, count in zip(pairs[0].tolist(), pairs[1].tolist(), counts.tolist()):
+                distribution[int(code), value] += count
+            columns.clear()
+        self._buffered = 0
+
+    def result(self) -> Dict[Hashable, Dict[str, Summary]]:
+        """Aggregates per group and per field key.
+
+        Returns:
+          ``{group: {key: Summary}}``, the group is ``None`` without ``group_by``.
+        """
+        self.flush()
+        result = defaultdict(dict)
+        for key, totals in self._totals.items():
+            distributions = defaultdict(dict)
+            for (code, value), count in sorted(self._distributions[key].items()):
+                distributions[code][value] = count
+            for code in totals[0].nonzero()[0].tolist():
+                count, total, high, low = (value.item() for value in totals[:, code])
+                count = int(count)
+                result[self._groups[code]][key] = Summary(
+                    count=count,
+                    mean=total / count,
+                    score=_score(self.fields[key], count, total, high, low),
+                    distribution=distributions[code],
+                )
+        return dict(result)
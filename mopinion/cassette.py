@@ -0,0 +1,179 @@
+"""
+Record and replay API traffic.
+
+``RecordingTransport`` wraps a transport and writes every request/response
+pair, pagination chains included, to a gzip-compressed cassette of JSON
+lines. ``ReplayTransport`` serves a cassette back without network or
+credentials, optionally with the original timing, so tests and benchmarks
+run deterministically offline.
+
+Request headers are never recorded: they hold the credentials and the tokens.
+The signature token in the responses of the token endpoint is replaced with
+``REDACTED_TOKEN``, which replayed clients use instead.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.cassette import RecordingTransport, ReplayTransport
+  >>> from mopinion.transports import RequestsTransport
+  >>> with RecordingTransport(RequestsTransport(), "export.jsonl.gz") as transport:
+  ...     client = MopinionClient(PUBLICKEY, PRIVATEKEY, transport=transport)
+  ...     pages = list(client.get_datasets_feedback(dataset_id=123, iterator=True))
+  >>>
+  >>> client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", transport=ReplayTransport("export.jsonl.gz"))
+  >>> pages = list(client.get_datasets_feedback(dataset_id=123, iterator=True))
+"""
+from base64 import b64decode
+from base64 import b64encode
+from collections import defaultdict
+from collections import deque
+from mopinion import settings
+from mopinion.exceptions import CassetteMiss
+from mopinion.transports import Transport
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from typing import Optional
+
+import gzip
+import json
+import threading
+import time
+import urllib.parse
+
+
+__all__ = ["REDACTED_TOKEN", "RecordingTransport", "ReplayTransport"]
+
+
+# the recorded body is already decoded
+SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+REDACTED_TOKEN = "redacted-token"
+
+
+def request_key(method: str, url: str, params: Optional[dict]) -> str:
+    # the host is left out, a cassette can be replayed for any ``base_url``
+    path = urllib.parse.urlsplit(url).path
+    return json.dumps([method.upper(), path, params or {}], sort_keys=True, default=str)
+
+
+def redact(url: str, content: bytes) -> bytes:
+    """Replace the signature token of a response of the token endpoint."""
+    if not urllib.parse.urlsplit(url).path.endswith(settings.TOKEN_PATH):
+        return content
+    try:
+        body = json.loads(content)
+    except ValueError:
+        return content
+    if isinstance(body, dict) and "token" in body:
+        body["token"] = REDACTED_TOKEN
+        return json.dumps(body).encode("utf-8")
+    return content
+
+
+class RecordingTransport(Transport):
+    """Record the traffic of ``transport`` into the cassette at ``path``.
+
+    Entries are appended, so several runs can be recorded into the same cassette.
+
+    Args:
+      transport (Transport): Transport sending the requests.
+      path (str): Cassette file.
+    """
+
+    def __init__(self, transport: Transport, path: str) -> None:
+        self.transport = transport
+        self.base_url = transport.base_url
+        self.path = path
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers, params=None, timeout=None) -> Response:
+        start = time.monotonic()
+        response = self.transport.request(method, url, headers, params, timeout)
+        elapsed = time.monotonic() - start
+
+        content = redact(url, response.content)
+        try:
+            body, body_encoding = content.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            body, body_encoding = b64encode(content).decode("ascii"), "base64"
+        entry = {
+            "key": request_key(method, url, params),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                key: value
+                for key, value in response.headers.items()
+                if key.lower() not in SKIPPED_HEADERS
+            },
+            "body": body,
+            "body_encoding": body_encoding,
+            "transferred": self.transport.transferred_bytes(response),
+            "elapsed": round(elapsed, 6),
+        }
+        with self._lock:
+            self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        return response
+
+    def transferred_bytes(self, response: Response) -> Optional[int]:
+        return self.transport.transferred_bytes(response)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """Serve the responses of a cassette.
+
+    Identical requests get the recorded responses in order; once they are
+    exhausted the last one is repeated. Unknown requests raise ``CassetteMiss``.
+
+    Args:
+      path (str): Cassette file.
+      timing (bool): Wait the recorded time before answering. Defaults to False.
+      speed (float): Divides the recorded time when ``timing`` is set. Defaults to 1.
+    """
+
+    def __init__(self, path: str, timing: bool = False, speed: float = 1.0) -> None:
+        self.path = path
+        self.timing = timing
+        self.speed = speed
+        self._entries = defaultdict(deque)
+        self._lock = threading.Lock()
+        with gzip.open(path, "rt", encoding="utf-8") as cassette:
+            for line in cassette:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def request(self, method, url, headers, params=None, timeout=None) -> Response:
+        key = request_key(method, url, params)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recorded response for {key}")
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+
+        if self.timing:
+            time.sleep(entry["elapsed"] / self.speed)
+
+        response = Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = "utf-8"
+        response.url = url
+        if entry["body_encoding"] == "base64":
+            response._content = b64decode(entry["body"])
+        else:
+            response._content = entry["body"].encode("utf-8")
+        response.transferred = entry.get("transferred")
+        return response
+
+    def transferred_bytes(self, response: Response) -> Optional[int]:
+        return getattr(response, "transferred", None)
@@ -0,0 +1,434 @@
+"""
+Command line interface for bulk operations.
+
+Examples:
+  $ export MOPINION_PUBLIC_KEY=... MOPINION_PRIVATE_KEY=...
+  $ mopinion export datasets 123 456 -o feedback.jsonl.gz --concurrency 4 --rate-limit 10
+  $ mopinion export reports 789 -o feedback.csv --since 2023-01-01 --resume
+  $ mopinion crawl -o account.json
+  $ mopinion sync datasets 123 456 --database feedback.db
+  $ mopinion export reports 789 -o feedback.jsonl --trace nightly.trace
+  $ mopinion trace nightly.trace --top 20
+
+Exports save their position after every page in ``OUTPUT.state``; with
+``--resume`` an interrupted export continues where it stopped. Pages written
+just before an interruption may be written again.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from mopinion import settings
+from mopinion.client import MopinionClient
+from mopinion.client import next_query_params
+from mopinion.crawler import AccountCrawler
+from mopinion.dataclasses import FeedbackQuery
+from mopinion.decoding import FeedbackSchema
+from mopinion.export import RawExporter
+from mopinion.mirror import FeedbackMirror
+from mopinion.paging import PageSizeTuner
+from mopinion.shared import SharedRateLimiter
+from mopinion.tracing import format_summary
+from mopinion.tracing import summarize
+from mopinion.tracing import to_har
+from mopinion.tracing import Tracer
+from typing import List
+from typing import Optional
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import requests
+import sys
+import tempfile
+import threading
+import time
+
+
+__all__ = ["main"]
+
+
+FORMATS = ["jsonl", "csv", "raw"]
+COMPRESSIONS = ["auto", "gzip", "none"]
+RESOURCES = ["datasets", "reports"]
+
+
+class CommandError(Exception):
+    """Invalid usage, reported without a traceback."""
+
+
+class Progress:
+    """Pages, items and throughput, redrawn on one line of ``stream``.
+
+    Args:
+      stream: Defaults to ``sys.stderr``.
+      enabled (bool): Defaults to whether ``stream`` is a terminal.
+      interval (float): Seconds between redraws. Defaults to 0.5.
+    """
+
+    def __init__(self, stream=None, enabled: bool = None, interval: float = 0.5) -> None:
+        self.stream = stream or sys.stderr
+        self.enabled = self.stream.isatty() if enabled is None else enabled
+        self.interval = interval
+        self.pages = 0
+        self.items = 0
+        self.start = time.monotonic()
+        self._shown = 0.0
+        self._lock = threading.Lock()
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        return (
+            f"{self.pages} pages, {self.items} items in {elapsed:.1f}s "
+            f"({self.items / elapsed:.0f} items/s)"
+        )
+
+    def update(self, items: int = 0, pages: int = 1) -> None:
+        with self._lock:
+            self.pages += pages
+            self.items += items
+            now = time.monotonic()
+            if self.enabled and now - self._shown >= self.interval:
+                self._shown = now
+                self.stream.write(f"\r{self.line()}")
+                self.stream.flush()
+
+    def close(self) -> None:
+        if self.enabled:
+            self.stream.write(f"\r{self.line()}\n")
+            self.stream.flush()
+
+
+class ExportState:
+    """Position of an export per resource, saved after every page."""
+
+    def __init__(self, path: str, resume: bool) -> None:
+        self.path = path
+        self.resources = {}
+        if resume and os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                self.resources = json.load(file)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict:
+        with self._lock:
+            return dict(self.resources.get(key, {}))
+
+    def save(self, key: str, **position) -> None:
+        with self._lock:
+            self.resources[key] = position
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as file:
+                json.dump(self.resources, file)
+            os.replace(temporary, self.path)
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Output:
+    """Binary output shared by the workers, written one page at a time."""
+
+    def __init__(self, path: str, compression: str, append: bool) -> None:
+        if path == "-":
+            self.file, self.close_file = sys.stdout.buffer, False
+        else:
+            gzipped = compression == "gzip" or (compression == "auto" and path.endswith(".gz"))
+            mode = "ab" if append else "wb"
+            self.file = gzip.open(path, mode) if gzipped else open(path, mode)
+            self.close_file = True
+        self.empty = not append or path == "-" or os.path.getsize(path) == 0
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes) -> None:
+        with self._lock:
+            self.file.write(data)
+            self.file.flush()
+            self.empty = False
+
+    def close(self) -> None:
+        if self.close_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+def _client(args, page_sizes: PageSizeTuner = None) -> MopinionClient:
+    public_key = args.public_key or os.environ.get("MOPINION_PUBLIC_KEY")
+    private_key = args.private_key or os.environ.get("MOPINION_PRIVATE_KEY")
+    if not public_key or not private_key:
+        raise CommandError(
+            "credentials are required: --public-key and --private-key, or "
+            "MOPINION_PUBLIC_KEY and MOPINION_PRIVATE_KEY"
+        )
+    rate_limiter = None
+    if args.rate_limit:
+        rate_limiter = SharedRateLimiter(args.rate_limit_file, rate=args.rate_limit)
+    return MopinionClient(
+        public_key,
+        private_key,
+        base_url=args.base_url,
+        timeout=args.timeout,
+        thread_local_sessions=args.concurrency > 1,
+        rate_limiter=rate_limiter,
+        page_sizes=page_sizes,
+        tracer=Tracer(args.trace) if args.trace else None,
+    )
+
+
+def _close(client: MopinionClient) -> None:
+    client.close()
+    if client.tracer is not None:
+        client.tracer.close()
+
+
+def _run(function, arguments: list, concurrency: int) -> list:
+    """Call ``function`` with each argument, ``concurrency`` at a time."""
+    with ThreadPoolExecutor(max(1, concurrency)) as executor:
+        return list(executor.map(function, arguments))
+
+
+def _page_size(value: str) -> Optional[int]:
+    if value == "auto":
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not 'auto' nor a number") from None
+    if not 1 <= limit <= settings.MAX_LIMIT:
+        raise argparse.ArgumentTypeError(f"page size must be within 1 and {settings.MAX_LIMIT}")
+    return limit
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    if isinstance(value, tuple):
+        return ";".join(value)
+    return str(value)
+
+
+def export(args) -> int:
+    if args.resume and args.output == "-":
+        raise CommandError("--resume needs an --output file")
+    tuner = PageSizeTuner() if args.page_size is None else None
+    client = _client(args, page_sizes=tuner)
+    state = ExportState(f"{args.output}.state", resume=args.resume)
+    output = Output(args.output, args.compression, append=args.resume)
+    progress = Progress(enabled=False if args.quiet else None)
+
+    schema = None
+    if args.format == "csv":
+        # one column per field of any of the resources
+        fields = {}
+        for resource_id in args.ids:
+            response = client.resource(args.resource, resource_id, "fields")
+            for field in response.json().get("data") or ():
+                fields.setdefault(field.get("key"), field)
+        schema = FeedbackSchema(fields.values())
+        if output.empty:
+            output.write(_csv_lines([schema.columns]))
+
+    query = FeedbackQuery(
+        limit=args.page_size or settings.DEFAULT_LIMIT, date_from=args.since, date_to=args.until
+    )
+
+    def export_resource(resource_id):
+        key = f"{args.resource}/{resource_id}"
+        position = state.get(key)
+        if position.get("done"):
+            return
+
+        def saved(meta):
+            has_more = bool(meta.get("has_more"))
+            query_params = next_query_params(meta["next"]) if has_more else None
+            state.save(key, query_params=query_params, done=not has_more)
+
+        start = position.get("query_params") or query
+        if args.format == "raw":
+            buffer = io.BytesIO()
+
+            def write_page(meta):
+                output.write(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate()
+                progress.update(items=meta.get("count") or 0)
+                saved(meta)
+
+            exporter = RawExporter(client)
+            exporter.export(
+                args.resource, resource_id, "feedback", buffer, query_params=start, on_page=write_page
+            )
+            return
+
+        pages = client.resource(
+            args.resource, resource_id, "feedback", query_params=start, iterator=True
+        )
+        for response in pages:
+            page = response.json()
+            items = [item for item in page.get("data") or () if isinstance(item, dict)]
+            if schema is not None:
+                rows = [[_csv_value(value) for value in schema.decode_item(item)] for item in items]
+                output.write(_csv_lines(rows))
+            else:
+                output.write(
+                    b"".join(
+                        json.dumps(item, separators=(",", ":")).encode("utf-8") + b"\n"
+                        for item in items
+                    )
+                )
+            progress.update(items=len(items))
+            saved(page["_meta"])
+
+    try:
+        _run(export_resource, args.ids, args.concurrency)
+    finally:
+        output.close()
+        progress.close()
+        _close(client)
+    state.remove()
+    return 0
+
+
+def _csv_lines(rows: List[list]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def crawl(args) -> int:
+    client = _client(args)
+    try:
+        index = AccountCrawler(client, max_workers=args.concurrency).crawl(fields=not args.no_fields)
+    finally:
+        _close(client)
+    document = {
+        "deployments": list(index.deployments.values()),
+        "reports": list(index.reports.values()),
+        "datasets": list(index.datasets.values()),
+        "fields": {
+            f"{resource}/{resource_id}": [vars(field) for field in fields.values()]
+            for (resource, resource_id), fields in index.fields.items()
+        },
+    }
+    content = json.dumps(document, indent=2, default=str) + "\n"
+    if args.output == "-":
+        sys.stdout.write(content)
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(content)
+    return 0
+
+
+def sync(args) -> int:
+    client = _client(args)
+    progress = Progress(enabled=False if args.quiet else None)
+    try:
+        with FeedbackMirror(args.database) as mirror:
+
+            def sync_resource(resource_id):
+                count = mirror.sync(client, args.resource, resource_id, limit=args.page_size)
+                progress.update(items=count, pages=0)
+                return count
+
+            counts = _run(sync_resource, args.ids, args.concurrency)
+    finally:
+        progress.close()
+        _close(client)
+    for resource_id, count in zip(args.ids, counts):
+        print(f"{args.resource}/{resource_id}: {count} items")
+    return 0
+
+
+def trace(args) -> int:
+    summary = summarize(args.file, top=args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(format_summary(summary))
+    if args.har:
+        with open(args.har, "w", encoding="utf-8") as file:
+            json.dump(to_har(args.file), file)
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--public-key", help="Defaults to $MOPINION_PUBLIC_KEY.")
+    common.add_argument("--private-key", help="Defaults to $MOPINION_PRIVATE_KEY.")
+    common.add_argument("--base-url", default=settings.BASE_URL, help=argparse.SUPPRESS)
+    common.add_argument("--timeout", type=float, help="Timeout of each request in seconds.")
+    common.add_argument("--concurrency", type=int, default=4, help="Resources processed at once.")
+    common.add_argument(
+        "--rate-limit", type=float, help="Requests per second, shared by the processes of the host."
+    )
+    common.add_argument(
+        "--rate-limit-file",
+        default=os.path.join(tempfile.gettempdir(), "mopinion-rate-limit.json"),
+        help="State of the shared rate limit.",
+    )
+    common.add_argument("--quiet", action="store_true", help="Do not show progress.")
+    common.add_argument("--trace", metavar="FILE", help="Append a trace of the requests to FILE.")
+
+    parser = argparse.ArgumentParser(
+        prog="mopinion", description="Bulk operations on the Mopinion Data API."
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    command = commands.add_parser("export", parents=[common], help="Export feedback.")
+    command.add_argument("resource", choices=RESOURCES)
+    command.add_argument("ids", nargs="+", metavar="id")
+    command.add_argument("-o", "--output", required=True, help="File, or - for stdout.")
+    command.add_argument("--format", choices=FORMATS, default="jsonl", help="Defaults to jsonl.")
+    command.add_argument(
+        "--compression", choices=COMPRESSIONS, default="auto", help="auto: gzip for .gz files."
+    )
+    command.add_argument(
+        "--page-size", type=_page_size, default="auto", help="Items per page, or auto (default)."
+    )
+    command.add_argument("--since", help="Feedback created from this day, YYYY-MM-DD.")
+    command.add_argument("--until", help="Feedback created until this day, YYYY-MM-DD.")
+    command.add_argument("--resume", action="store_true", help="Continue an interrupted export.")
+    command.set_defaults(handler=export)
+
+    command = commands.add_parser("crawl", parents=[common], help="Crawl the account metadata.")
+    command.add_argument("-o", "--output", default="-", help="File, defaults to stdout.")
+    command.add_argument("--no-fields", action="store_true", help="Skip the fields.")
+    command.set_defaults(handler=crawl)
+
+    command = commands.add_parser("sync", parents=[common], help="Sync feedback to SQLite.")
+    command.add_argument("resource", choices=RESOURCES)
+    command.add_argument("ids", nargs="+", metavar="id")
+    command.add_argument("--database", required=True, help="SQLite file of the mirror.")
+    command.add_argument("--page-size", type=int, default=100, help="Defaults to 100.")
+    command.set_defaults(handler=sync)
+
+    command = commands.add_parser("trace", help="Summarize a trace recorded with --trace.")
+    command.add_argument("file", help="Trace file.")
+    command.add_argument("--top", type=int, default=10, help="Requests listed, defaults to 10.")
+    command.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    command.add_argument("--har", help="Also convert the trace to a HAR file.")
+    command.set_defaults(handler=trace)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = parser()
+    args = arguments.parse_args(argv)
+    if args.command is None:
+        arguments.print_help()
+        return 2
+    try:
+        return args.handler(args)
+    except CommandError as error:
+        arguments.error(str(error))
+    except (ValueError, OSError, requests.RequestException) as error:
+        print(f"mopinion: error: {error}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("\nmopinion: interrupted, exports continue with --resume", file=sys.stderr)
+        return 130
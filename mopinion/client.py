@@ -8,21 +8,57 @@ from collections.abc import Iterator
 from mopinion import settings
 from mopinion.dataclasses import Credentials
 from mopinion.dataclasses import EndPoint
+from mopinion.dataclasses import FeedbackQuery
 from mopinion.dataclasses import RequestArguments
 from mopinion.dataclasses import ResourceUri
 from mopinion.dataclasses import ResourceVerbosity
-from requests.adapters import HTTPAdapter
-from requests.adapters import Retry
+from mopinion.exceptions import DeadlineExceeded
+from mopinion.hedging import Hedger
+from mopinion.hedging import within_deadline
+from mopinion.paging import PageSizeTuner
+from mopinion.resilience import AdaptiveConcurrencyLimiter
+from mopinion.resilience import CircuitBreakers
+from mopinion.resilience import is_failure
+from mopinion.sampling import Sample
+from mopinion.sampling import Sampling
+from mopinion.scheduling import PriorityScheduler
+from mopinion.shared import SharedRateLimiter
+from mopinion.shared import SharedTokenStore
+from mopinion.spool import PageSpool
+from mopinion.stats import ClientStats
+from mopinion.tracing import Tracer
+from mopinion.transports import RequestsTransport
+from mopinion.transports import send_deadline
+from mopinion.transports import Transport
 from requests.models import Response
 from typing import Union
 
 import abc
+import dataclasses
+import functools
 import hashlib
 import hmac
 import requests
+import threading
+import time
 
 
-__all__ = ["MopinionClient"]
+__all__ = ["MopinionClient", "next_query_params"]
+
+
+def next_query_params(next_url: str) -> dict:
+    """Query parameters of the next page, from the ``next`` link of a page.
+
+    Args:
+      next_url (str): ``_meta.next`` of a page.
+    """
+    next_uri = urllib.parse.urlparse(next_url)
+    # keep repeated parameters, e.g. a date range filter
+    query_params = urllib.parse.parse_qs(next_uri.query)
+    return {
+        key: values[0] if len(values) == 1 else values
+        for key, values in query_params.items()
+    }
 
 
 class AbstractClient(abc.ABC):
@@ -67,13 +103,33 @@ class MopinionClient(AbstractClient):
     Steps during instantiation:
 
       1. Credential validations.
-      2. Instantiation of a session object from ``requests.Session`` that will be used in each request.
+      2. Instantiation of a transport, by default a session object from ``requests.Session``,
+         that will be used in each request.
       3. Retrieval of ``signature_token`` from the API for a specific ``private_key`` and ``public_key``.
 
     When instantiating, a signature token is retrieved from the API  and stored
     in the ``signature_token`` attribute using your ``private_key`` and ``public_key``.
     The ``signature_token`` will be used in each request.
 
+    The client is fork-safe: when used from a forked child process (``multiprocessing``,
+    pre-fork servers) the inherited session is discarded and a new one is built transparently,
+    while the ``signature_token`` is kept, so no extra token calls are made.
+    With ``thread_local_sessions=True`` every thread gets its own session.
+    Other HTTP backends can be used with the ``transport`` argument, see ``mopinion.transports``.
+
+    Responses are requested compressed with the best encoding available, see
+    ``mopinion.transports.accept_encoding``.
+
+    There is no timeout by default, a ``timeout`` in seconds can be set for every request
+    and overridden per call. Slow responses can be hedged, see ``mopinion.hedging``.
+    Circuit breakers and adaptive concurrency can be enabled, see ``mopinion.resilience``.
+    Requests can be given priority classes with shares of the concurrency, see ``mopinion.scheduling``.
+    The API can be checked in the background, see ``mopinion.health``.
+    Requests can be traced to a file for profiling slow runs, see ``mopinion.tracing``.
+    Processes of a host can share the signature token and a rate limit, see ``mopinion.shared``.
+    Iterators without an explicit ``limit`` can tune their page size, see ``mopinion.paging``.
+    Transferred and decoded bytes are recorded in the ``stats`` attribute.
+
     In each request, an HMAC signature will be created using SHA256-hashing, and encrypted with your ``signature_token``.
     This HMAC signature is encoded together with the ``public_key``.
     After this encryption, the token is set into the headers under the ``X-Auth-Token`` key.
@@ -86,6 +142,18 @@ class MopinionClient(AbstractClient):
       content_negotiation (str): Defaults to application/json.
       max_retries (int): Defaults to 3.
       backoff_factor (int): Defaults to 1.
+      thread_local_sessions (bool): Use one session per thread. Defaults to False.
+      transport (Transport): Optional. Defaults to a ``RequestsTransport``.
+      base_url (str): Defaults to the Mopinion API.
+      timeout (float): Timeout of each request in seconds. Optional.
+      hedging (Hedger): Optional. Hedge slow requests.
+      circuit_breakers (CircuitBreakers): Optional. Fail fast while an endpoint family is failing.
+      limiter (AdaptiveConcurrencyLimiter): Optional. Limit the requests in flight.
+      token_store (SharedTokenStore): Optional. Share the signature token between processes.
+      rate_limiter (SharedRateLimiter): Optional. Rate limit shared between processes.
+      page_sizes (PageSizeTuner): Optional. Tune the page size of iterators.
+      scheduler (PriorityScheduler): Optional. Share the requests in flight between priority classes.
+      tracer (Tracer): Optional. Record a trace of every request.
     """
 
     def __init__(
@@ -97,6 +165,18 @@ class MopinionClient(AbstractClient):
         version: str = None,
         verbosity: str = "normal",
         content_negotiation: str = "application/json",
+        thread_local_sessions: bool = False,
+        transport: Transport = None,
+        base_url: str = settings.BASE_URL,
+        timeout: float = None,
+        hedging: Hedger = None,
+        circuit_breakers: CircuitBreakers = None,
+        limiter: AdaptiveConcurrencyLimiter = None,
+        token_store: SharedTokenStore = None,
+        rate_limiter: SharedRateLimiter = None,
+        page_sizes: PageSizeTuner = None,
+        scheduler: PriorityScheduler = None,
+        tracer: Tracer = None,
     ) -> None:
         """
         Constructor
@@ -109,25 +189,97 @@ class MopinionClient(AbstractClient):
           content_negotiation (str): Defaults to application/json.
           max_retries (int): Defaults to 3.
           backoff_factor (int): Defaults to 1.
+          thread_local_sessions (bool): Use one session per thread. Defaults to False.
+          transport (Transport): Optional. Defaults to a ``RequestsTransport``.
+          base_url (str): Defaults to the Mopinion API.
+          timeout (float): Timeout of each request in seconds. Optional.
+          hedging (Hedger): Optional. Hedge slow requests.
+          circuit_breakers (CircuitBreakers): Optional. Fail fast while an endpoint family is failing.
+          limiter (AdaptiveConcurrencyLimiter): Optional. Limit the requests in flight.
+          token_store (SharedTokenStore): Optional. Share the signature token between processes.
+          rate_limiter (SharedRateLimiter): Optional. Rate limit shared between processes.
+          page_sizes (PageSizeTuner): Optional. Tune the page size of iterators.
+          scheduler (PriorityScheduler): Optional. Share the requests in flight between priority classes.
+          tracer (Tracer): Optional. Record a trace of every request.
         """
         self.credentials = Credentials(public_key=public_key, private_key=private_key)
-        self.session = requests.Session()
-        retries = Retry(total=max_retries, backoff_factor=backoff_factor)
-        adapter = HTTPAdapter(max_retries=retries)
-        self.session.mount(settings.BASE_URL, adapter=adapter)
-        self.signature_token = self._get_signature_token(self.credentials)
+        self.base_url = base_url
+        self.transport = transport or RequestsTransport(
+            base_url=base_url,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            thread_local=thread_local_sessions,
+        )
+        self.stats = ClientStats()
+        self.timeout = timeout
+        self.hedging = hedging
+        self.circuit_breakers = circuit_breakers
+        self.limiter = limiter
+        self.rate_limiter = rate_limiter
+        self.token_store = token_store
+        self.page_sizes = page_sizes
+        self.scheduler = scheduler
+        self.tracer = tracer
+        # set by a running ``mopinion.health.HealthMonitor``
+        self.health_monitor = None
+        self._token_lock = threading.Lock()
+        self.signature_token = self._fetch_signature_token()
         self.content_negotiation = content_negotiation
         self.verbosity = verbosity
         self.version = version
 
+    @property
+    def session(self) -> requests.Session:
+        """Session of the ``RequestsTransport`` for the current process and thread.
+
+        Only the default ``RequestsTransport`` has a session, other transports
+        are used through ``transport``.
+        """
+        if not isinstance(self.transport, RequestsTransport):
+            raise TypeError(
+                f"'session' is only available with a RequestsTransport, "
+                f"not a {type(self.transport).__name__}. Use 'transport' instead."
+            )
+        return self.transport.session
+
     def close(self) -> None:
-        self.session.close()
+        self.transport.close()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.session.__exit__(exc_type, exc_val, exc_tb)
+        self.close()
+
+    def _fetch_signature_token(self) -> str:
+        if self.token_store is None:
+            return self._get_signature_token(self.credentials)
+        return self.token_store.get_or_fetch(
+            self._token_key, functools.partial(self._get_signature_token, self.credentials)
+        )
+
+    @property
+    def _token_key(self) -> str:
+        credentials = self.credentials
+        return self.token_store.key(credentials.public_key, self.base_url, credentials.private_key)
+
+    def renew_signature_token(self, token: str) -> None:
+        """Fetch a new signature token after ``token`` was rejected, once for all threads.
+
+        Args:
+          token (str): The rejected signature token.
+        """
+        with self._token_lock:
+            if self.signature_token == token:
+                if self.token_store is not None:
+                    self.token_store.invalidate(self._token_key, token)
+                self.signature_token = self._fetch_signature_token()
+
+    def _renew_signature_token(self, error: requests.exceptions.HTTPError, token: str) -> bool:
+        if error.response is None or error.response.status_code != 401:
+            return False
+        self.renew_signature_token(token)
+        return True
 
     def _get_signature_token(self, credentials: Credentials) -> str:
         # The authorization method is public_key:private_key encoded as b64 string
@@ -136,9 +288,11 @@ class MopinionClient(AbstractClient):
         headers = {"Authorization": "Basic " + auth_header.decode()}
 
         # request and return token
-        response = self.session.request(
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        response = self.transport.request(
             method="GET",
-            url=f"{settings.BASE_URL}{settings.TOKEN_PATH}",
+            url=f"{self.base_url}{settings.TOKEN_PATH}",
             headers=headers,
         )
         response.raise_for_status()
@@ -165,6 +319,9 @@ class MopinionClient(AbstractClient):
         In case we need extra information about the state of the API, we can provide a
         flag ``verbose=True``.
 
+        While a ``mopinion.health.HealthMonitor`` runs, the outcome of its last check
+        is returned without sending a request.
+
         Examples:
           >>> from mopinion import MopinionClient
           >>> client = MopinionClient(public_key=PUBLICKEY, private_key=PRIVATEKEY)
@@ -172,6 +329,9 @@ class MopinionClient(AbstractClient):
           >>> r = client.is_available(verbose=True)
           >>> assert r["code"] == 200 and r["response"] == "pong" and r["version"] == "2.0.0"
         """
+        monitor = self.health_monitor
+        if monitor is not None and monitor.available is not None:
+            return monitor.is_available(verbose)
         response = self.request(endpoint="/ping")
         if not verbose:
             return response.json()["code"] == 200 if response.ok else False
@@ -180,15 +340,18 @@ class MopinionClient(AbstractClient):
     def request(
         self,
         endpoint: str,
-        query_params: dict = None,
+        query_params: Union[dict, FeedbackQuery] = None,
         version: str = None,
         verbosity: str = "normal",
         content_negotiation: str = "application/json",
+        timeout: float = None,
+        stream: bool = False,
+        deadline: float = None,
     ) -> Response:
         """Generic method to send requests to our API.
 
-        Wrapper on top of ``requests.Session.request`` method adding token encryption
-        on headers.
+        Wrapper on top of the transport's ``request`` method, by default ``requests.Session.request``,
+        adding token encryption on headers.
         Every time we call `request` five steps are applied:
           1. Validation of arguments.
           2. Token creation - token depends on the `endpoint` argument and `signature_token`.
@@ -202,7 +365,13 @@ class MopinionClient(AbstractClient):
           verbosity (str): `normal`, `quiet` or `full`. Defaults to `normal`.
           content_negotiation (str): `application/json` or `application/x-yaml`. Defaults to `application/json`.
           body (dict): Optional.
-          query_params (dict): Optional.
+          query_params (dict/FeedbackQuery): Optional.
+          timeout (float): Timeout in seconds. Optional. Defaults to the client's ``timeout``.
+          stream (bool): Return before reading the body, read it with ``iter_content``.
+            Defaults to False.
+          deadline (float): Time budget in seconds for the request, waits, retries and
+            hedged requests included. ``mopinion.exceptions.DeadlineExceeded`` is raised
+            when exhausted. Optional.
 
         Returns:
           response (requests.models.Response).
@@ -238,10 +407,11 @@ class MopinionClient(AbstractClient):
         )
 
         # create token - token depends on endpoint
+        token = self.signature_token
         xtoken = self.build_token(endpoint=args.endpoint)
 
         # prepare params dict (url, method, headers, query_params)
-        url = f"{settings.BASE_URL}{args.endpoint.path}"
+        url = f"{self.base_url}{args.endpoint.path}"
         headers = {
             "X-Auth-Token": xtoken,
             "verbosity": args.verbosity or self.verbosity,
@@ -253,27 +423,146 @@ class MopinionClient(AbstractClient):
         if version:
             headers["version"] = version
 
+        # feedback queries are only valid for the feedback endpoints
+        if isinstance(query_params, FeedbackQuery):
+            if not args.endpoint.path.endswith("/feedback"):
+                raise ValueError(
+                    f"Feedback queries are not supported for '{args.endpoint.path}'."
+                )
+            query_params = query_params.to_query_params()
+
         # build params dict, set method, url and headers
         params = {"method": "GET", "url": url, "headers": headers}
         if query_params:
             params["params"] = query_params
+        params["timeout"] = timeout if timeout is not None else self.timeout
 
         # request
-        response = self.session.request(**params)
-        response.raise_for_status()
+        send = functools.partial(
+            self.transport.stream if stream else self.transport.request, **params
+        )
+        deadline_at = None if deadline is None else time.monotonic() + deadline
+        try:
+            response = self._dispatch(args.endpoint, params, send, stream, deadline)
+        except requests.exceptions.HTTPError as error:
+            # the signature token expired or was revoked: sign again with a new one
+            if not self._renew_signature_token(error, token):
+                raise
+            headers["X-Auth-Token"] = self.build_token(endpoint=args.endpoint)
+            if deadline_at is not None:
+                deadline = deadline_at - time.monotonic()
+            response = self._dispatch(args.endpoint, params, send, stream, deadline)
+        if not stream:
+            # the transfer of a stream is recorded by the caller, once the body is read
+            self._record_transfer(response)
         return response
 
+    def _dispatch(self, endpoint: EndPoint, params: dict, send, stream: bool, deadline: float):
+        if self.tracer is None:
+            return self._send(endpoint, send, deadline)
+        return self._traced(endpoint, params, send, stream, deadline)
+
+    def _send(self, endpoint: EndPoint, send: functools.partial, deadline: float = None) -> Response:
+        # Layers, from the outside: deadline, circuit breaker, priority scheduler, shared rate
+        # limit, concurrency limiter, hedging. Errors are raised inside every layer so they all
+        # see failed responses. The rate limit is waited for outside the limiter and hedging,
+        # where the wait would be taken for latency.
+        family = endpoint.family
+        deadline_at = None if deadline is None else time.monotonic() + deadline
+        message = None if deadline is None else f"'{endpoint.path}' exceeded the deadline of {deadline:g}s"
+
+        def checked():
+            if deadline_at is None:
+                response = send()
+            else:
+                # every request, hedged ones included, gets what is left of the budget,
+                # so a request given up on stops too instead of retrying unobserved
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceeded(message)
+                timeout = send.keywords.get("timeout")
+                with send_deadline(deadline_at):
+                    response = send(timeout=min(remaining, timeout or remaining))
+            response.raise_for_status()
+            return response
+
+        def rate_limited(send):
+            if deadline_at is None:
+                self.rate_limiter.acquire()
+            elif not self.rate_limiter.acquire(timeout=max(0.0, deadline_at - time.monotonic())):
+                raise DeadlineExceeded(message)
+            return send()
+
+        def can_hedge():
+            # a duplicate is only sent with a token of the rate limit to spare
+            return self.rate_limiter.try_acquire() == 0
+
+        call = checked
+        if self.hedging:
+            call = functools.partial(
+                self.hedging.call, family, call, can_hedge if self.rate_limiter else None
+            )
+        if self.limiter:
+            call = functools.partial(self.limiter.call, call)
+        if self.rate_limiter:
+            call = functools.partial(rate_limited, call)
+        if self.scheduler:
+            call = functools.partial(self.scheduler.call, call)
+        if self.circuit_breakers:
+            call = functools.partial(self.circuit_breakers.call, family, call)
+        if deadline_at is None:
+            return call()
+        return within_deadline(call, deadline_at - time.monotonic(), message)
+
+    def _traced(
+        self,
+        endpoint: EndPoint,
+        params: dict,
+        send: functools.partial,
+        stream: bool,
+        deadline: float = None,
+    ):
+        entry = self.tracer.start()
+        trace = functools.partial(
+            self.tracer.finish,
+            entry,
+            method=params["method"],
+            endpoint=endpoint.path,
+            family=endpoint.family,
+            params=params.get("params"),
+            streamed=stream,
+        )
+        try:
+            response = self._send(endpoint, send, deadline)
+        except Exception as error:
+            trace(error=error)
+            raise
+        received = None if stream else self.transport.transferred_bytes(response)
+        trace(response=response, received=received)
+        return response
+
+    def _record_transfer(self, response: Response) -> None:
+        received = self.transport.transferred_bytes(response)
+        if received is None:
+            return
+        encoding = response.headers.get("Content-Encoding", "identity")
+        self.stats.record_response(encoding, received, len(response.content))
+
     def resource(
         self,
         resource_name: str,
         resource_id: Union[str, int] = None,
         sub_resource_name: str = None,
-        query_params: dict = None,
+        query_params: Union[dict, FeedbackQuery] = None,
         version: str = None,
         verbosity: str = "normal",
         content_negotiation: str = "application/json",
         iterator: bool = False,
-    ) -> Union[Response, Iterator]:
+        timeout: float = None,
+        deadline: float = None,
+        spool: PageSpool = None,
+        sample: Sampling = None,
+    ) -> Union[Response, Iterator, Sample]:
         """Method to send requests to our API.
 
         Abstraction of ``mopinion_api.MopinionClient.request``.
@@ -288,11 +577,19 @@ class MopinionClient(AbstractClient):
           verbosity (str): `normal`, `quiet` or `full`. Defaults to `normal`.
           content_negotiation (str): `application/json` or `application/x-yaml`. Defaults to `application/json`.
           body (dict): Optional.
-          query_params (dict): Optional.
+          query_params (dict/FeedbackQuery): Optional.
           iterator (bool): If sets to `True` an iterator will be returned.
+          timeout (float): Timeout of each request in seconds. Optional.
+          deadline (float): Time budget in seconds for the whole call, retries included and
+            across all pages when iterating. ``mopinion.exceptions.DeadlineExceeded`` is raised
+            when exhausted.
+          spool (PageSpool): Optional. Append the pages to an on-disk spool, see ``mopinion.spool``.
+          sample (Sampling): Optional. Fetch a sample of the pages of a feedback resource
+            and return a ``Sample`` with estimates, see ``mopinion.sampling``.
 
         Returns:
-          response (requests.models.Response) or iterator (collections.abc.Iterator)
+          response (requests.models.Response), iterator (collections.abc.Iterator)
+          or sample (mopinion.sampling.Sample)
 
         The endpoint is built from ``mopinion_api.dataclasses.ResourceUri`` and the parameters are:
           -  resource_name (str) Required
@@ -363,23 +660,95 @@ class MopinionClient(AbstractClient):
             "version": version,
             "query_params": query_params,
             "content_negotiation": content_negotiation,
+            "timeout": timeout,
         }
 
+        if sample is not None:
+            if iterator or spool is not None:
+                raise ValueError("Samples cannot be combined with 'iterator' or 'spool'.")
+            if sub_resource_name != "feedback":
+                raise ValueError("Only feedback can be sampled.")
+            return sample.fetch(self, resource_uri.endpoint, **params)
+
         if iterator:
-            return self._get_iterator(resource_uri.endpoint, **params)
-        else:
-            return self.request(endpoint=resource_uri.endpoint, **params)
+            return self._get_iterator(
+                resource_uri.endpoint, deadline=deadline, spool=spool, **params
+            )
+        response = self.request(endpoint=resource_uri.endpoint, deadline=deadline, **params)
+        if spool is not None:
+            spool.append(response)
+        return response
+
+    def _get_iterator(
+        self, endpoint: str, deadline: float = None, spool: PageSpool = None, **params
+    ):
+        deadline_at = None if deadline is None else time.monotonic() + deadline
+
+        # tune the page size unless a limit or a page was requested
+        query = params.get("query_params")
+        if isinstance(query, FeedbackQuery):
+            query = query.to_query_params()
+        tuned = not {"limit", "page"} & set(query or {})
+        tuner = self.page_sizes if tuned else None
+        if tuner is not None:
+            family = EndPoint(path=endpoint).family
+            limit, consumed = tuner.limit(family), 0
 
-    def _get_iterator(self, endpoint: str, **params):
         while True:
-            response = self.request(endpoint=endpoint, **params)
+            # each page gets what is left of the time budget
+            if deadline_at is not None:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceeded(
+                        f"Iterating '{endpoint}' exceeded the deadline of {deadline:g}s"
+                    )
+                params["deadline"] = remaining
+
+            if tuner is None:
+                response = self.request(endpoint=endpoint, **params)
+            else:
+                response, limit, latency = self._get_tuned_page(
+                    endpoint, tuner, limit, consumed, params
+                )
+                consumed += limit
+                limit = tuner.next_limit(limit, consumed, latency, len(response.content))
+                tuner.remember(family, limit)
+            if spool is not None:
+                spool.append(response)
             yield response
 
-            if not response.json()["_meta"]["has_more"]:
+            meta = response.json()["_meta"]
+            if not meta["has_more"]:
                 break
 
-            next_uri = urllib.parse.urlparse(response.json()["_meta"]["next"])
-            params["query_params"] = dict(urllib.parse.parse_qsl(next_uri.query))
+            params["query_params"] = next_query_params(meta["next"])
+
+    def _get_tuned_page(self, endpoint, tuner, limit, consumed, params):
+        # the page number follows from the items consumed, so a page that failed
+        # is retried with a smaller limit without skipping or repeating items
+        query = params.get("query_params") or {}
+        while True:
+            page = {"limit": limit, "page": consumed // limit + 1}
+            if isinstance(query, FeedbackQuery):
+                params["query_params"] = dataclasses.replace(query, **page)
+            else:
+                params["query_params"] = {**query, **page}
+
+            start = time.monotonic()
+            try:
+                response = self.request(endpoint=endpoint, **params)
+            except DeadlineExceeded:
+                raise
+            except requests.exceptions.RequestException as error:
+                smaller = tuner.shrink(limit, consumed) if is_failure(error) else None
+                if smaller is None:
+                    raise
+                limit = smaller
+                if params.get("deadline") is not None:
+                    # the smaller page gets what is left of the budget
+                    params["deadline"] -= time.monotonic() - start
+                continue
+            return response, limit, time.monotonic() - start
 
     # GET methods
     def get_account(self, **kwargs):
@@ -476,7 +845,7 @@ class MopinionClient(AbstractClient):
               - version (str): API Version. Optional. Defaults to the latest.
               - verbosity (str): `normal`, `quiet` or `full`. Defaults to `normal`.
               - content_negotiation (str): `application/json` or `application/x-yaml`. Defaults to `application/json`.
-              - query_params (dict): Optional. See documentation.
+              - query_params (dict/FeedbackQuery): Optional. See documentation.
               - iterator (bool): If sets to `True` an iterator will be returned.
 
         Returns:
@@ -541,7 +910,7 @@ class MopinionClient(AbstractClient):
               - version (str): API Version. Optional. Defaults to the latest.
               - verbosity (str): `normal`, `quiet` or `full`. Defaults to `normal`.
               - content_negotiation (str): `application/json` or `application/x-yaml`. Defaults to `application/json`.
-              - query_params (dict): Optional. See documentation.
+              - query_params (dict/FeedbackQuery): Optional. See documentation.
               - iterator (bool): If sets to `True` an iterator will be returned.
 
         Returns:
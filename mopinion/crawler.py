@@ -0,0 +1,170 @@
+"""
+Crawl the resources of an account into an in-memory index.
+
+``AccountCrawler`` lists the deployments, reports and datasets of the account
+concurrently, then fetches the fields of every report and dataset, with at most
+``max_workers`` requests in flight. Responses are cached per endpoint, so
+crawling again only fetches what is missing unless ``refresh=True``.
+
+The resulting ``AccountIndex`` answers in O(1) which reports a dataset belongs
+to, which datasets a report holds and the label and type of a field key.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.crawler import AccountCrawler
+  >>> client = MopinionClient(public_key=PUBLICKEY, private_key=PRIVATEKEY)
+  >>> index = AccountCrawler(client, max_workers=8).crawl()
+  >>> index.datasets_of(report_id=123)
+  >>> index.field("nps", dataset_id=456).label
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import threading
+
+
+__all__ = ["AccountCrawler", "AccountIndex", "Field"]
+
+
+@dataclass(frozen=True)
+class Field:
+    key: str
+    label: Optional[str] = None
+    type: Optional[str] = None
+
+
+@dataclass
+class AccountIndex:
+    """Resources of an account, indexed by id."""
+
+    deployments: Dict[str, dict] = field(default_factory=dict)
+    reports: Dict[int, dict] = field(default_factory=dict)
+    datasets: Dict[int, dict] = field(default_factory=dict)
+    report_datasets: Dict[int, Set[int]] = field(default_factory=lambda: defaultdict(set))
+    dataset_reports: Dict[int, Set[int]] = field(default_factory=lambda: defaultdict(set))
+    fields: Dict[Tuple[str, int], Dict[str, Field]] = field(default_factory=dict)
+    # first definition found of every field key, over all resources
+    field_keys: Dict[str, Field] = field(default_factory=dict)
+
+    def link(self, report_id: int, dataset_id: int) -> None:
+        self.report_datasets[report_id].add(dataset_id)
+        self.dataset_reports[dataset_id].add(report_id)
+
+    def datasets_of(self, report_id: int) -> Set[int]:
+        return self.report_datasets.get(report_id, set())
+
+    def reports_of(self, dataset_id: int) -> Set[int]:
+        return self.dataset_reports.get(dataset_id, set())
+
+    def add_fields(self, resource: str, resource_id: int, fields: List[Field]) -> None:
+        self.fields[(resource, resource_id)] = {field.key: field for field in fields}
+        for definition in fields:
+            self.field_keys.setdefault(definition.key, definition)
+
+    def field(
+        self, key: str, dataset_id: int = None, report_id: int = None
+    ) -> Optional[Field]:
+        """Definition of the field ``key``, of a dataset or report if given."""
+        if dataset_id is not None:
+            return self.fields.get(("datasets", dataset_id), {}).get(key)
+        if report_id is not None:
+            return self.fields.get(("reports", report_id), {}).get(key)
+        return self.field_keys.get(key)
+
+
+def _id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class AccountCrawler:
+    """Walk deployments, reports, datasets and fields with bounded concurrency.
+
+    Args:
+      client (MopinionClient):
+      max_workers (int): Requests in flight. Defaults to 8.
+    """
+
+    def __init__(self, client, max_workers: int = 8) -> None:
+        self.client = client
+        self.max_workers = max_workers
+        self.cache: Dict[str, List[dict]] = {}
+        self._lock = threading.Lock()
+
+    def _items(self, resource_name: str, resource_id=None, sub_resource_name=None):
+        """All items of a resource, following pagination, cached per endpoint."""
+        key = "/".join(str(part) for part in (resource_name, resource_id, sub_resource_name) if part)
+        with self._lock:
+            if key in self.cache:
+                return self.cache[key]
+
+        items = []
+        pages = self.client.resource(
+            resource_name,
+            resource_id=resource_id,
+            sub_resource_name=sub_resource_name,
+            iterator=True,
+        )
+        for page in pages:
+            data = page.json().get("data") or []
+            items.extend(data if isinstance(data, list) else [data])
+
+        with self._lock:
+            self.cache[key] = items
+        return items
+
+    def crawl(self, fields: bool = True, refresh: bool = False) -> AccountIndex:
+        """Crawl the account.
+
+        Args:
+          fields (bool): Fetch the fields of reports and datasets. Defaults to True.
+          refresh (bool): Ignore the cached responses. Defaults to False.
+
+        Returns:
+          AccountIndex
+        """
+        if refresh:
+            with self._lock:
+                self.cache.clear()
+
+        index = AccountIndex()
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            deployments = executor.submit(self._items, "deployments")
+            reports = executor.submit(self._items, "reports")
+            datasets = executor.submit(self._items, "datasets")
+
+            for deployment in deployments.result():
+                index.deployments[deployment.get("key")] = deployment
+            for report in reports.result():
+                index.reports[_id(report["id"])] = report
+                for dataset in report.get("datasets") or ():
+                    index.link(_id(report["id"]), _id(dataset["id"]))
+            for dataset in datasets.result():
+                index.datasets[_id(dataset["id"])] = dataset
+                if dataset.get("report_id") is not None:
+                    index.link(_id(dataset["report_id"]), _id(dataset["id"]))
+
+            if fields:
+                resources = [("reports", id) for id in index.reports]
+                resources += [("datasets", id) for id in index.datasets]
+                futures = {
+                    resource: executor.submit(self._items, *resource, "fields")
+                    for resource in resources
+                }
+                for (resource, resource_id), future in futures.items():
+                    definitions = [
+                        Field(item["key"], item.get("label"), item.get("type"))
+                        for item in future.result()
+                        if "key" in item
+                    ]
+                    index.add_fields(resource, resource_id, definitions)
+        return index
@@ -1,7 +1,13 @@
 from dataclasses import dataclass
 from dataclasses import field
+from datetime import date
+from datetime import datetime
 from mopinion import settings
+from mopinion.decoding import decode_page
+from typing import Any
+from typing import Mapping
 from typing import Optional
+from typing import Tuple
 from typing import Union
 
 import re
@@ -10,6 +16,7 @@ import re
 __all__ = [
     "Credentials",
     "EndPoint",
+    "FeedbackQuery",
     "ResourceUri",
     "ResourceVerbosity",
 ]
@@ -57,6 +64,11 @@ class EndPoint(Argument):
         if not regexp.search(self.path):
             raise ValueError(f"Resource '{self.path}' is not supported.")
 
+    @property
+    def family(self) -> str:
+        """Endpoint without identifiers, e.g. ``datasets/feedback`` for ``/datasets/1/feedback``."""
+        return "/".join(self.path.strip("/").split("/")[0::2]).lower()
+
 
 @dataclass(frozen=True)
 class RequestArguments(Argument):
@@ -114,3 +126,99 @@ class ResourceVerbosity(Argument):
                 f"'{self.verbosity}' is not a valid verbosity level. Please "
                 f"consider one of: '{', '.join(['normal', 'full'])}'"
             )
+
+
+@dataclass(frozen=True)
+class FeedbackQuery(Argument):
+    """Query parameters for the feedback endpoints.
+
+    Only the parameters that differ from the API defaults are sent, so the request
+    is as small as possible. ``fields`` is not sent to the API, it is used to drop
+    unused keys from each feedback item while decoding, see ``FeedbackQuery.decode``.
+
+    Examples:
+      >>> from mopinion.dataclasses import FeedbackQuery
+      >>> query = FeedbackQuery(limit=100, date_from="2023-01-01", filters={"nps": "gte:8"})
+      >>> response = client.get_datasets_feedback(dataset_id=123, query_params=query)
+      >>> page = query.decode(response)
+    """
+
+    limit: Optional[int] = None
+    page: Optional[int] = None
+    date_from: Optional[Union[str, date]] = None
+    date_to: Optional[Union[str, date]] = None
+    filters: Union[Mapping[str, Any], Tuple[Tuple[str, Any], ...]] = ()
+    fields: Tuple[str, ...] = ()
+
+    def __post_init__(self):
+        if self.limit is not None and not 1 <= self.limit <= settings.MAX_LIMIT:
+            raise ValueError(
+                f"'{self.limit}' is not a valid limit. Please consider a value "
+                f"between 1 and {settings.MAX_LIMIT}"
+            )
+
+        if self.page is not None and self.page < 1:
+            raise ValueError(f"'{self.page}' is not a valid page. Pages start at 1")
+
+        # normalize dates to strings, validating the format
+        for name in ["date_from", "date_to"]:
+            value = getattr(self, name)
+            if value is not None:
+                object.__setattr__(self, name, self._format_date(value))
+
+        if self.date_from and self.date_to and self.date_from > self.date_to:
+            raise ValueError(
+                f"'date_from' ({self.date_from}) must be before 'date_to' ({self.date_to})"
+            )
+
+        # stored as pairs, the query stays hashable
+        filters = self.filters.items() if isinstance(self.filters, Mapping) else self.filters
+        filters = tuple(
+            (key, tuple(value) if isinstance(value, list) else value) for key, value in filters
+        )
+        object.__setattr__(self, "filters", filters)
+        for key, _ in self.filters:
+            if not re.match(r"^\w+$", key):
+                raise ValueError(f"'{key}' is not a valid filter name.")
+
+        if isinstance(self.fields, str):
+            raise ValueError("'fields' must be a sequence of field names, not a string")
+        object.__setattr__(self, "fields", tuple(self.fields))
+
+    @staticmethod
+    def _format_date(value: Union[str, date]) -> str:
+        if isinstance(value, datetime):
+            value = value.date()
+        if isinstance(value, date):
+            return value.strftime(settings.DATE_FORMAT)
+        try:
+            datetime.strptime(value, settings.DATE_FORMAT)
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"'{value}' is not a valid date. Please use the format YYYY-MM-DD"
+            ) from None
+        return value
+
+    def to_query_params(self) -> dict:
+        """Build the ``query_params`` dict, leaving out API defaults."""
+        params = {}
+        if self.limit is not None and self.limit != settings.DEFAULT_LIMIT:
+            params["limit"] = self.limit
+        if self.page is not None and self.page != 1:
+            params["page"] = self.page
+
+        dates = []
+        if self.date_from:
+            dates.append(f"gte:{self.date_from}")
+        if self.date_to:
+            dates.append(f"lte:{self.date_to}")
+        if dates:
+            params["filter[date]"] = dates if len(dates) > 1 else dates[0]
+
+        for key, value in self.filters:
+            params[f"filter[{key}]"] = list(value) if isinstance(value, tuple) else value
+        return params
+
+    def decode(self, response) -> dict:
+        """Decode a feedback page keeping only the selected ``fields``."""
+        return decode_page(response, fields=self.fields)
@@ -0,0 +1,262 @@
+"""
+Decoding of API responses.
+
+``FeedbackSchema`` decodes feedback items into compact rows, using the field
+definitions of ``get_datasets_fields`` / ``get_reports_fields``. A row is a
+named tuple with one column per item attribute and per field key, so keys and
+labels are stored once per schema instead of once per item. Values are typed:
+scores are ints, numbers floats and dates ``datetime`` objects.
+
+Examples:
+  >>> from mopinion.decoding import FeedbackSchema
+  >>> schema = FeedbackSchema.from_fields(client.get_datasets_fields(dataset_id=123))
+  >>> pages = client.get_datasets_feedback(dataset_id=123, iterator=True)
+  >>> for row in schema.iter_rows(pages):
+  ...     row.created, row.nps
+"""
+from collections import namedtuple
+from datetime import datetime
+from json.decoder import scanstring
+from requests.models import Response
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Union
+
+import json
+import re
+import sys
+
+
+__all__ = ["decode_page", "FeedbackSchema", "project_item"]
+
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+_decoder = json.JSONDecoder()
+
+
+def project_item(item: dict, fields: frozenset) -> dict:
+    """Keep only the selected keys of a feedback item.
+
+    Top-level keys of the item are kept when they are in ``fields``. When the item
+    holds a ``fields`` list (the answers of the feedback form), only the entries
+    whose ``key`` is selected are kept.
+    """
+    projected = {key: value for key, value in item.items() if key in fields}
+    answers = item.get("fields")
+    if isinstance(answers, list):
+        answers = [
+            answer
+            for answer in answers
+            if isinstance(answer, dict) and answer.get("key") in fields
+        ]
+        if answers:
+            projected["fields"] = answers
+    return projected
+
+
+def _at(text: str, index: int, expected: str) -> None:
+    if text[index : index + 1] != expected:
+        raise json.JSONDecodeError(f"Expecting '{expected}'", text, index)
+
+
+def _skip(text: str, index: int) -> int:
+    return WHITESPACE.match(text, index).end()
+
+
+def _decode_items(text: str, index: int, fields: frozenset):
+    """Decode the array at ``index``, projecting its items one at a time."""
+    _at(text, index, "[")
+    items = []
+    index = _skip(text, index + 1)
+    if text[index : index + 1] == "]":
+        return items, index + 1
+    while True:
+        item, index = _decoder.raw_decode(text, index)
+        items.append(project_item(item, fields) if isinstance(item, dict) else item)
+        index = _skip(text, index)
+        if text[index : index + 1] == "]":
+            return items, index + 1
+        _at(text, index, ",")
+        index = _skip(text, index + 1)
+
+
+def _decode_projected(text: str, fields: frozenset) -> dict:
+    index = _skip(text, 0)
+    _at(text, index, "{")
+    page = {}
+    index = _skip(text, index + 1)
+    while text[index : index + 1] != "}":
+        if page:
+            _at(text, index, ",")
+            index = _skip(text, index + 1)
+        _at(text, index, '"')
+        key, index = scanstring(text, index + 1)
+        index = _skip(text, index)
+        _at(text, index, ":")
+        index = _skip(text, index + 1)
+        if key == "data" and text[index : index + 1] == "[":
+            page[key], index = _decode_items(text, index, fields)
+        else:
+            page[key], index = _decoder.raw_decode(text, index)
+        index = _skip(text, index)
+    if text[index + 1 :].strip():
+        raise json.JSONDecodeError("Extra data", text, index + 1)
+    return page
+
+
+def decode_page(response: Response, fields: Optional[Iterable[str]] = None) -> dict:
+    """Decode a page, optionally keeping only ``fields`` of each item in ``data``.
+
+    The items of ``data`` are decoded and projected one at a time, so the unused
+    keys of an item are released before the next item is decoded instead of the
+    whole page being decoded first. The body text itself is still held.
+
+    Args:
+      response (requests.models.Response):
+      fields (iterable): Optional. Keys to keep, see ``project_item``.
+
+    Returns:
+      page (dict).
+    """
+    if not fields:
+        return response.json()
+    return _decode_projected(response.text, frozenset(fields))
+
+
+# attributes of a feedback item decoded into columns, besides its fields
+ITEM_COLUMNS = ("id", "created", "dataset_id", "report_id", "tags")
+
+SCORE_TYPES = {"nps", "ces", "csat", "rating", "thumbs", "gcr", "likert", "slider"}
+NUMBER_TYPES = {"number", "float", "decimal"}
+
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d")
+
+
+def to_int(value) -> Optional[Union[int, float]]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return int(value)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def to_float(value) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_datetime(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    for format in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, format)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def to_text(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def to_tags(value) -> tuple:
+    # tags repeat across items: intern them
+    if not isinstance(value, list):
+        return ()
+    return tuple(sys.intern(str(tag)) for tag in value)
+
+
+def converter(field_type: Optional[str]) -> Callable:
+    """Converter of the values of a field of ``field_type``."""
+    field_type = (field_type or "").lower()
+    if field_type in SCORE_TYPES:
+        return to_int
+    if field_type in NUMBER_TYPES:
+        return to_float
+    if field_type in ("date", "datetime"):
+        return to_datetime
+    return to_text
+
+
+class FeedbackSchema:
+    """Decode feedback items into typed, tuple-backed rows.
+
+    Args:
+      fields (list): Field definitions, dicts with a ``key`` and a ``type``.
+
+    Attributes:
+      Row: Named tuple type of the rows. Keys that are not valid identifiers
+        are renamed, use ``index`` to find their position.
+      columns (tuple): Names of the columns, item attributes first.
+    """
+
+    def __init__(self, fields: Iterable[dict]) -> None:
+        fields = [field for field in fields if isinstance(field, dict) and "key" in field]
+        self.fields = {sys.intern(str(field["key"])): field for field in fields}
+        self.columns = ITEM_COLUMNS + tuple(
+            key for key in self.fields if key not in ITEM_COLUMNS
+        )
+        self.Row = namedtuple("Row", self.columns, rename=True)
+        self._index: Dict[str, int] = {
+            column: position for position, column in enumerate(self.columns)
+        }
+        self._converters: List[Callable] = [
+            to_int, to_datetime, to_int, to_int, to_tags
+        ] + [converter(self.fields[key].get("type")) for key in self.columns[5:]]
+
+    @classmethod
+    def from_fields(cls, response: Union[Response, dict, list]) -> "FeedbackSchema":
+        """Build the schema from the response of ``get_datasets_fields`` or
+        ``get_reports_fields``, or from its decoded ``data``."""
+        if not isinstance(response, (dict, list)):
+            response = response.json()
+        if isinstance(response, dict):
+            response = response.get("data") or []
+        return cls(response)
+
+    def index(self, key: str) -> int:
+        """Position of the column ``key`` in the rows."""
+        return self._index[key]
+
+    def decode_item(self, item: dict) -> tuple:
+        """Decode a feedback item. Answers to unknown keys are dropped."""
+        values = [None] * len(self.columns)
+        converters = self._converters
+        for position, key in enumerate(ITEM_COLUMNS):
+            values[position] = converters[position](item.get(key))
+        index = self._index
+        for answer in item.get("fields") or ():
+            position = index.get(answer.get("key")) if isinstance(answer, dict) else None
+            if position is not None and position >= len(ITEM_COLUMNS):
+                values[position] = converters[position](answer.get("value"))
+        return self.Row._make(values)
+
+    def decode_page(self, page: Union[Response, dict]) -> List[tuple]:
+        """Decode the items of a page, a response or its decoded dict."""
+        if not isinstance(page, dict):
+            page = page.json()
+        data = page.get("data")
+        if not isinstance(data, list):
+            return []
+        return [self.decode_item(item) for item in data if isinstance(item, dict)]
+
+    def iter_rows(self, pages: Iterable[Union[Response, dict]]) -> Iterator[tuple]:
+        """Yield the rows of all ``pages``."""
+        for page in pages:
+            yield from self.decode_page(page)
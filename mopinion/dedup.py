@@ -0,0 +1,187 @@
+"""
+Cross-page de-duplication of feedback.
+
+Pagination follows offset links (``_meta.next``), so feedback created during a
+long walk shifts items to later pages and they are returned twice; feedback
+deleted during the walk shifts items to earlier pages and they are skipped.
+``Deduplicator`` drops the items already seen and reports suspected gaps,
+detected when ``_meta.total`` shrinks between two pages.
+
+Seen ids are kept in an exact set up to ``threshold`` ids, then in a Bloom
+filter, so memory stays bounded on very large exports. Once in Bloom mode a
+small fraction (``error_rate``) of new items can be taken for duplicates.
+
+Examples:
+  >>> from mopinion.dedup import Deduplicator
+  >>> deduplicator = Deduplicator()
+  >>> pages = client.get_datasets_feedback(dataset_id=123, iterator=True)
+  >>> for page in deduplicator.iter_pages(pages):
+  ...     process(page["data"])
+  >>> deduplicator.duplicates, deduplicator.gaps
+"""
+from dataclasses import dataclass
+from requests.models import Response
+from typing import Hashable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Union
+
+import hashlib
+import math
+
+
+__all__ = ["BloomFilter", "Deduplicator", "Gap", "SeenIds"]
+
+
+class BloomFilter:
+    """Bloom filter sized for ``capacity`` elements at ``error_rate`` false positives.
+
+    Args:
+      capacity (int):
+      error_rate (float): Defaults to 0.001.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("Bloom filter needs capacity >= 1 and 0 < error_rate < 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: Hashable) -> Iterator[int]:
+        # double hashing: h1 + i * h2
+        digest = hashlib.blake2b(repr(value).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value: Hashable) -> bool:
+        """Add ``value``, returning False if it was (probably) already present."""
+        added = False
+        for position in self._positions(value):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        self.count += added
+        return added
+
+    def __contains__(self, value: Hashable) -> bool:
+        return all(
+            self.bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(value)
+        )
+
+
+class SeenIds:
+    """Set of ids, exact up to ``threshold`` ids and a Bloom filter beyond.
+
+    Args:
+      threshold (int): Ids kept exactly. Defaults to 1,000,000.
+      capacity (int): Ids the Bloom filter is sized for. Defaults to 10 times ``threshold``.
+      error_rate (float): False positives of the Bloom filter. Defaults to 0.001.
+    """
+
+    def __init__(
+        self, threshold: int = 1_000_000, capacity: int = None, error_rate: float = 0.001
+    ) -> None:
+        self.threshold = threshold
+        self.capacity = capacity or 10 * threshold
+        self.error_rate = error_rate
+        self._exact = set()
+        self._bloom = None
+
+    @property
+    def exact(self) -> bool:
+        return self._bloom is None
+
+    def add(self, value: Hashable) -> bool:
+        """Add ``value``, returning False if it was already seen."""
+        if self._bloom is not None:
+            return self._bloom.add(value)
+        if value in self._exact:
+            return False
+        self._exact.add(value)
+        if len(self._exact) > self.threshold:
+            self._bloom = BloomFilter(self.capacity, self.error_rate)
+            for seen in self._exact:
+                self._bloom.add(seen)
+            self._exact = set()
+        return True
+
+    def __contains__(self, value: Hashable) -> bool:
+        if self._bloom is not None:
+            return value in self._bloom
+        return value in self._exact
+
+
+@dataclass(frozen=True)
+class Gap:
+    """Items possibly skipped before ``page`` because ``_meta.total`` shrank."""
+
+    page: int
+    missing: int
+
+
+class Deduplicator:
+    """Drop feedback already returned by a previous page.
+
+    Args:
+      key (str): Id of the items. Defaults to ``id``.
+      threshold (int): See ``SeenIds``.
+      capacity (int): See ``SeenIds``.
+      error_rate (float): See ``SeenIds``.
+    """
+
+    def __init__(
+        self,
+        key: str = "id",
+        threshold: int = 1_000_000,
+        capacity: int = None,
+        error_rate: float = 0.001,
+    ) -> None:
+        self.key = key
+        self.seen = SeenIds(threshold, capacity, error_rate)
+        self.pages = 0
+        self.duplicates = 0
+        self.gaps: List[Gap] = []
+        self._total = None
+
+    def filter_page(self, page: Union[Response, dict]) -> dict:
+        """Decode ``page`` if needed and return it without the items already seen."""
+        if not isinstance(page, dict):
+            page = page.json()
+        self.pages += 1
+
+        total = (page.get("_meta") or {}).get("total")
+        if isinstance(total, int):
+            if self._total is not None and total < self._total:
+                self.gaps.append(Gap(page=self.pages, missing=self._total - total))
+            self._total = total
+
+        data = page.get("data")
+        if not isinstance(data, list):
+            return page
+        items = []
+        for item in data:
+            if not isinstance(item, dict) or self.key not in item:
+                items.append(item)
+            elif self.seen.add(item[self.key]):
+                items.append(item)
+            else:
+                self.duplicates += 1
+        return {**page, "data": items}
+
+    def iter_pages(self, pages: Iterable[Union[Response, dict]]) -> Iterator[dict]:
+        """Yield the decoded pages without duplicates."""
+        for page in pages:
+            yield self.filter_page(page)
+
+    def iter_items(self, pages: Iterable[Union[Response, dict]]) -> Iterator[dict]:
+        """Yield the items of all pages without duplicates."""
+        for page in self.iter_pages(pages):
+            yield from page.get("data") or ()
@@ -0,0 +1,20 @@
+"""
+Exceptions raised by the client, on top of the ``requests`` exceptions.
+"""
+from requests.exceptions import RequestException
+from requests.exceptions import Timeout
+
+
+__all__ = ["CassetteMiss", "CircuitOpenError", "DeadlineExceeded"]
+
+
+class CassetteMiss(RequestException):
+    """The request has not been recorded in the cassette being replayed."""
+
+
+class CircuitOpenError(RequestException):
+    """The circuit of the endpoint is open, the request has not been sent."""
+
+
+class DeadlineExceeded(Timeout):
+    """The time budget of a request or of a pagination has been exhausted."""
@@ -0,0 +1,183 @@
+"""
+Raw export of paginated resources, for archival.
+
+``RawExporter`` walks the pages of a resource like the iterator of
+``MopinionClient.resource`` but never decodes them: every response body is
+streamed in chunks to a writable sink or to one file per page. Only the
+``_meta`` object is decoded, to follow the pagination, and it is located with
+a scan of the first and last bytes of the body.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.export import RawExporter
+  >>> client = MopinionClient(public_key=PUBLICKEY, private_key=PRIVATEKEY)
+  >>> with open("feedback.jsonl", "wb") as sink:
+  ...     RawExporter(client).export("datasets", 123, "feedback", sink)
+  >>> RawExporter(client).export("datasets", 123, "feedback", "archive/")  # page-000001.json, ...
+"""
+from mopinion.client import next_query_params
+from mopinion.dataclasses import FeedbackQuery
+from mopinion.dataclasses import ResourceUri
+from typing import BinaryIO
+from typing import Callable
+from typing import Optional
+from typing import Union
+
+import json
+import os
+import re
+
+
+__all__ = ["RawExporter", "scan_meta"]
+
+
+META_HEAD = re.compile(r'\s*\{\s*"_meta"\s*:\s*')
+META_KEY = re.compile(r'"_meta"\s*:\s*')
+
+_decoder = json.JSONDecoder()
+
+
+def scan_meta(head: bytes, tail: bytes = b"") -> Optional[dict]:
+    """Decode the ``_meta`` object of a JSON document from its first and last bytes.
+
+    ``_meta`` is found when it is the first key of the document and ends within
+    ``head``, or when it is the last key and starts within ``tail``.
+    """
+    text = head.decode("utf-8", "ignore")
+    match = META_HEAD.match(text)
+    if match:
+        try:
+            return _decoder.raw_decode(text, match.end())[0]
+        except ValueError:
+            pass
+
+    text = tail.decode("utf-8", "ignore")
+    start = text.rfind('"_meta"')
+    match = META_KEY.match(text, start) if start >= 0 else None
+    if match:
+        try:
+            meta, end = _decoder.raw_decode(text, match.end())
+        except ValueError:
+            return None
+        # the key closes the document, it is not inside a value
+        if text[end:].strip() == "}":
+            return meta
+    return None
+
+
+class RawExporter:
+    """Stream the pages of a resource without decoding them.
+
+    Args:
+      client (MopinionClient):
+      chunk_size (int): Bytes read at once. Defaults to 64 KiB.
+      scan_size (int): Bytes at the start and the end of each page kept to find
+        ``_meta``. Defaults to 64 KiB.
+
+    Attributes:
+      pages (int): Pages exported.
+      bytes (int): Bytes written, separators excluded.
+    """
+
+    def __init__(self, client, chunk_size: int = 64 * 1024, scan_size: int = 64 * 1024) -> None:
+        self.client = client
+        self.chunk_size = chunk_size
+        self.scan_size = scan_size
+        self.pages = 0
+        self.bytes = 0
+
+    def export(
+        self,
+        resource_name: str,
+        resource_id: Union[str, int] = None,
+        sub_resource_name: str = None,
+        sink: Union[BinaryIO, str, os.PathLike] = None,
+        query_params: Union[dict, FeedbackQuery] = None,
+        version: str = None,
+        verbosity: str = "normal",
+        timeout: float = None,
+        separator: bytes = b"\n",
+        on_page: Callable[[dict], None] = None,
+    ) -> int:
+        """Write all the pages of a resource to ``sink``.
+
+        Args:
+          resource_name (str):
+          resource_id (str/int): Optional.
+          sub_resource_name (str): Optional.
+          sink: Writable binary file, pages are written one after the other
+            followed by ``separator``, or a directory, each page is written to
+            ``page-NNNNNN.json``.
+          query_params (dict/FeedbackQuery): Optional.
+          version (str): API Version. Optional. Defaults to the latest.
+          verbosity (str): `normal` or `full`. Defaults to `normal`.
+          timeout (float): Timeout of each request in seconds. Optional.
+          separator (bytes): Written after each page to a file. Defaults to a newline.
+          on_page (callable): Optional. Called with the ``_meta`` of each page once
+            written, e.g. to save the position of the export.
+
+        Returns:
+          Number of pages written.
+        """
+        if verbosity == "quiet":
+            # the pagination is in the metadata
+            raise ValueError("Raw exports need the metadata, 'quiet' is not supported.")
+        if sink is None:
+            raise ValueError("A sink is required.")
+        directory = sink if isinstance(sink, (str, os.PathLike)) else None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        endpoint = ResourceUri(
+            resource_name=resource_name,
+            resource_id=resource_id,
+            sub_resource_name=sub_resource_name,
+        ).endpoint
+        pages = 0
+        while True:
+            response = self.client.request(
+                endpoint,
+                query_params=query_params,
+                version=version,
+                verbosity=verbosity,
+                timeout=timeout,
+                stream=True,
+            )
+            with response:
+                if directory is not None:
+                    path = os.path.join(directory, f"page-{self.pages + 1:06d}.json")
+                    with open(path, "wb") as file:
+                        head, tail = self._copy(response, file)
+                else:
+                    head, tail = self._copy(response, sink)
+                    sink.write(separator)
+            pages += 1
+            self.pages += 1
+
+            meta = scan_meta(head, tail)
+            if meta is None:
+                raise ValueError(f"No pagination metadata found in page {pages} of '{endpoint}'")
+            if on_page is not None:
+                on_page(meta)
+            if not meta.get("has_more"):
+                return pages
+            query_params = next_query_params(meta["next"])
+
+    def _copy(self, response, file: BinaryIO):
+        """Copy the body of ``response`` to ``file``, keeping its first and last bytes."""
+        head, tail, size = bytearray(), bytearray(), 0
+        for chunk in response.iter_content(self.chunk_size):
+            file.write(chunk)
+            size += len(chunk)
+            if len(head) < self.scan_size:
+                head += chunk[: self.scan_size - len(head)]
+            tail += chunk
+            if len(tail) > self.scan_size:
+                del tail[: len(tail) - self.scan_size]
+        self.bytes += size
+
+        received = self.client.transport.transferred_bytes(response)
+        if received is not None:
+            encoding = response.headers.get("Content-Encoding", "identity")
+            self.client.stats.record_response(encoding, received, size)
+        return bytes(head), bytes(tail)
@@ -0,0 +1,219 @@
+"""
+Background health checks of the API.
+
+``HealthMonitor`` pings the API from a background thread every ``interval``
+seconds and keeps the outcome, so ``MopinionClient.is_available`` answers from
+the last check instead of sending a ``/ping`` before every batch. It also
+tracks the latency of the pings and feeds the client's resilience layers:
+
+- after ``failure_threshold`` failed checks in a row the circuits of the
+  client's ``CircuitBreakers`` are opened, those of families not used yet
+  included, and calls fail fast until a check succeeds and closes them again;
+- a failed or slow check (above ``latency_target``) halves the limit of the
+  client's ``AdaptiveConcurrencyLimiter``.
+
+Pings are sent directly with the transport, past the circuit breakers and the
+concurrency limits of the client, so the monitor keeps checking while they hold
+requests back. They do count in the client's shared rate limit, and a rejected
+signature token is renewed and the ping sent again instead of failing the check.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.health import HealthMonitor
+  >>> client = MopinionClient(PUBLICKEY, PRIVATEKEY, circuit_breakers=CircuitBreakers())
+  >>> with HealthMonitor(client, interval=30, latency_target=2.0) as monitor:
+  ...     if client.is_available():  # no request, the last check
+  ...         run_batch(client)
+  ...     monitor.latency_trend()
+"""
+from collections import deque
+from mopinion.dataclasses import EndPoint
+from requests.exceptions import HTTPError
+from typing import Callable
+from typing import Deque
+from typing import Optional
+from typing import Union
+
+import statistics
+import threading
+import time
+
+
+__all__ = ["HealthMonitor"]
+
+
+class HealthMonitor:
+    """Ping the API in the background and cache its availability.
+
+    Args:
+      client (MopinionClient):
+      interval (float): Seconds between checks. Defaults to 30.
+      timeout (float): Timeout of a ping in seconds. Defaults to 5.
+      failure_threshold (int): Failed checks in a row that open the client's
+        circuits. Defaults to 2.
+      latency_target (float): Seconds. Slower pings halve the client's
+        concurrency limit. Optional.
+      window (int): Latencies kept for the trend. Defaults to 20.
+      on_change (callable): Optional. Called with ``available`` when it changes.
+
+    Attributes:
+      available (bool): Outcome of the last check, None before the first one.
+      status (dict): Body of the last successful ping.
+      checked_at (float): ``time.time()`` of the last check.
+      failures (int): Failed checks in a row.
+      error (Exception): Error of the last failed check.
+    """
+
+    def __init__(
+        self,
+        client,
+        interval: float = 30,
+        timeout: float = 5,
+        failure_threshold: int = 2,
+        latency_target: Optional[float] = None,
+        window: int = 20,
+        on_change: Optional[Callable[[bool], None]] = None,
+    ) -> None:
+        if interval <= 0:
+            raise ValueError(f"'{interval}' is not a valid interval, use seconds > 0")
+        self.client = client
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.latency_target = latency_target
+        self.on_change = on_change
+        self.available: Optional[bool] = None
+        self.status: Optional[dict] = None
+        self.checked_at: Optional[float] = None
+        self.failures = 0
+        self.error: Optional[Exception] = None
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _ping(self) -> dict:
+        token = self.client.signature_token
+        try:
+            return self._send_ping()
+        except HTTPError as error:
+            # an expired or revoked token does not make the API unavailable
+            if error.response is None or error.response.status_code != 401:
+                raise
+        self.client.renew_signature_token(token)
+        return self._send_ping()
+
+    def _send_ping(self) -> dict:
+        endpoint = EndPoint(path="/ping")
+        if self.client.rate_limiter:
+            self.client.rate_limiter.acquire()
+        response = self.client.transport.request(
+            method="GET",
+            url=f"{self.client.base_url}{endpoint.path}",
+            headers={
+                "X-Auth-Token": self.client.build_token(endpoint),
+                "verbosity": self.client.verbosity,
+                "Accept": "application/json",
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        status = response.json()
+        if status.get("code") != 200:
+            raise ValueError(f"Unexpected ping response: {status}")
+        return status
+
+    def check(self) -> bool:
+        """Ping the API now and update the cached availability."""
+        start = time.monotonic()
+        try:
+            status = self._ping()
+        except Exception as error:
+            with self._lock:
+                self.failures += 1
+                self.error = error
+                changed = self._set(False)
+                failures = self.failures
+            if failures >= self.failure_threshold and self.client.circuit_breakers:
+                self.client.circuit_breakers.trip_all()
+            if self.client.limiter:
+                self.client.limiter.congested()
+        else:
+            latency = time.monotonic() - start
+            with self._lock:
+                self.failures = 0
+                self.error = None
+                self.status = status
+                self.latencies.append(latency)
+                changed = self._set(True)
+            if self.client.circuit_breakers:
+                self.client.circuit_breakers.reset_tripped()
+            slow = self.latency_target is not None and latency > self.latency_target
+            if slow and self.client.limiter:
+                self.client.limiter.congested()
+        if changed and self.on_change is not None:
+            self.on_change(self.available)
+        return self.available
+
+    def _set(self, available: bool) -> bool:
+        changed = self.available is not None and self.available != available
+        self.available = available
+        self.checked_at = time.time()
+        return changed
+
+    def is_available(self, verbose: bool = False) -> Union[dict, bool, None]:
+        """Outcome of the last check, None before the first one.
+
+        With ``verbose=True`` the body of the last ping, or None if it failed.
+        """
+        with self._lock:
+            if verbose:
+                return self.status if self.available else None
+            return self.available
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Latency of the last successful ping, in seconds."""
+        with self._lock:
+            return self.latencies[-1] if self.latencies else None
+
+    def latency_trend(self) -> Optional[float]:
+        """Mean latency of the newer half of the window over the older half.
+
+        Above 1 the API is getting slower. None until the window has 2 pings.
+        """
+        with self._lock:
+            latencies = list(self.latencies)
+        if len(latencies) < 2:
+            return None
+        half = len(latencies) // 2
+        older = statistics.mean(latencies[:half])
+        newer = statistics.mean(latencies[half:])
+        return newer / older if older else None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self.check()
+            self._stopped.wait(self.interval)
+
+    def start(self) -> "HealthMonitor":
+        """Check in a background thread, ``client.is_available`` reads the cache."""
+        self._stopped.clear()
+        self.client.health_monitor = self
+        self._thread = threading.Thread(target=self._run, name="mopinion-health", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.client.health_monitor is self:
+            self.client.health_monitor = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
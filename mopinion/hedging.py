@@ -0,0 +1,267 @@
+"""
+Hedged requests to cut tail latency.
+
+A hedged call sends the request and, when no response has arrived after the
+configured percentile of the latencies recently observed for the same endpoint
+family, sends a duplicate. Whichever response arrives first is returned and the
+other one is discarded. Only idempotent requests must be hedged, which is the
+case for every request of the API (all are ``GET``).
+
+``within_deadline`` bounds a call in time the same way: the caller stops
+waiting when the budget is exhausted and the response, if one still arrives,
+is discarded.
+
+Calls run in ``WorkerPool`` threads, so the threads are bounded. A call given
+up on keeps its thread until it returns, the send must stop at the deadline
+too: the client gives it the deadline, see ``mopinion.transports.send_deadline``.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.hedging import Hedger
+  >>> client = MopinionClient(PUBLICKEY, PRIVATEKEY, hedging=Hedger(percentile=0.95))
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError
+from concurrent.futures import wait
+from mopinion.exceptions import DeadlineExceeded
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+import contextvars
+import os
+import threading
+import time
+
+
+__all__ = ["Hedger", "LatencyTracker", "within_deadline", "WorkerPool"]
+
+
+class LatencyTracker:
+    """Sliding window of the latest latencies per key.
+
+    Args:
+      window (int): Number of latencies kept per key. Defaults to 100.
+    """
+
+    def __init__(self, window: int = 100) -> None:
+        self.window = window
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            latencies = self._latencies.get(key)
+            if latencies is None:
+                latencies = self._latencies[key] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return len(self._latencies.get(key, ()))
+
+    def percentile(self, key: str, q: float) -> Optional[float]:
+        """Latency at percentile ``q`` (between 0 and 1), None without samples."""
+        with self._lock:
+            latencies = sorted(self._latencies.get(key, ()))
+        if not latencies:
+            return None
+        index = min(int(q * len(latencies)), len(latencies) - 1)
+        return latencies[index]
+
+
+def _discard(future: Future) -> None:
+    # release the connection of the response that lost the race
+    if not future.cancelled() and future.exception() is None:
+        close = getattr(future.result(), "close", None)
+        if close is not None:
+            close()
+
+
+class WorkerPool:
+    """Pool of at most ``max_workers`` threads, rebuilt in a forked child.
+
+    Functions run with the context of the caller.
+
+    Args:
+      max_workers (int):
+      name (str): Prefix of the thread names.
+
+    Attributes:
+      busy (int): Functions running or waiting for a thread.
+    """
+
+    def __init__(self, max_workers: int, name: str) -> None:
+        self.max_workers = max_workers
+        self.name = name
+        self.busy = 0
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _reserve(self, queue: bool) -> Optional[ThreadPoolExecutor]:
+        with self._lock:
+            # worker threads do not survive a fork, build a new pool in the child
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.busy = 0
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+            if not queue and self.busy >= self.max_workers:
+                return None
+            self.busy += 1
+            return self._executor
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self.busy -= 1
+
+    def _start(self, executor: ThreadPoolExecutor, function: Callable, args) -> Future:
+        context = contextvars.copy_context()
+        future = executor.submit(context.run, function, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def submit(self, function: Callable, *args) -> Future:
+        """Run ``function``, waiting for a thread if they are all busy."""
+        return self._start(self._reserve(queue=True), function, args)
+
+    def try_submit(self, function: Callable, *args) -> Optional[Future]:
+        """Run ``function`` if a thread is free, else return None."""
+        executor = self._reserve(queue=False)
+        if executor is None:
+            return None
+        return self._start(executor, function, args)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# threads running the calls of ``within_deadline``
+_deadline_workers = WorkerPool(max_workers=32, name="mopinion-deadline")
+
+
+def within_deadline(
+    send: Callable, seconds: float, message: str = None, workers: WorkerPool = None
+):
+    """Call ``send`` and wait for its result for ``seconds`` at most.
+
+    Args:
+      send (callable): Sends the request, retries included, and returns the response.
+      seconds (float): Time budget.
+      message (str): Optional. Message of the ``DeadlineExceeded`` error.
+      workers (WorkerPool): Optional. Threads running ``send``, 32 shared ones by default.
+
+    Raises:
+      DeadlineExceeded: ``send`` did not return in time. If it is still waiting for
+        a thread it is not called, else its response is discarded.
+    """
+    message = message or f"Exceeded the deadline of {seconds:g}s"
+    if seconds <= 0:
+        raise DeadlineExceeded(message)
+    future = (workers or _deadline_workers).submit(send)
+    try:
+        return future.result(timeout=seconds)
+    except TimeoutError:
+        if not future.cancel():
+            future.add_done_callback(_discard)
+        raise DeadlineExceeded(message) from None
+
+
+class Hedger:
+    """Send a duplicate request when the first one is slower than usual.
+
+    Hedging starts once ``min_samples`` latencies have been observed for an
+    endpoint family; the duplicate is sent after the ``percentile`` of those
+    latencies, but never before ``min_delay`` seconds. First requests and
+    duplicates run in two pools of ``max_workers`` threads and never wait for a
+    thread: while the pools are busy, requests are sent without hedging.
+
+    Args:
+      percentile (float): Defaults to 0.95.
+      min_delay (float): Defaults to 0.05.
+      min_samples (int): Defaults to 20.
+      window (int): Latencies kept per endpoint family. Defaults to 100.
+      max_workers (int): Threads sending first requests, and duplicates. Defaults to 8.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_delay: float = 0.05,
+        min_samples: int = 20,
+        window: int = 100,
+        max_workers: int = 8,
+    ) -> None:
+        if not 0 < percentile < 1:
+            raise ValueError(f"'{percentile}' is not a valid percentile, use (0, 1)")
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.latencies = LatencyTracker(window=window)
+        self.hedged = 0
+        self.primaries = WorkerPool(max_workers, name="mopinion-primary")
+        self.duplicates = WorkerPool(max_workers, name="mopinion-hedge")
+        self._lock = threading.Lock()
+
+    def delay(self, key: str) -> Optional[float]:
+        """Seconds to wait before hedging, None while there are too few samples."""
+        if self.latencies.count(key) < self.min_samples:
+            return None
+        return max(self.latencies.percentile(key, self.percentile), self.min_delay)
+
+    def _timed(self, key: str, send: Callable):
+        start = time.monotonic()
+        result = send()
+        self.latencies.record(key, time.monotonic() - start)
+        return result
+
+    def call(self, key: str, send: Callable, can_hedge: Optional[Callable[[], bool]] = None):
+        """Call ``send``, hedging it with a second call if it is too slow.
+
+        Args:
+          key (str): Endpoint family, latencies are tracked per key.
+          send (callable): Sends the request and returns the response.
+          can_hedge (callable): Optional. Called before sending a duplicate, none
+            is sent if it returns False, e.g. when the rate limit is reached.
+
+        Returns:
+          The first successful result. If both calls fail, the last error is raised.
+        """
+        delay = self.delay(key)
+        primary = None if delay is None else self.primaries.try_submit(self._timed, key, send)
+        if primary is None:
+            return self._timed(key, send)
+
+        done, _ = wait([primary], timeout=delay)
+        if done or (can_hedge is not None and not can_hedge()):
+            return primary.result()
+        duplicate = self.duplicates.try_submit(self._timed, key, send)
+        if duplicate is None:
+            return primary.result()
+
+        with self._lock:
+            self.hedged += 1
+        pending = {primary, duplicate}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.add_done_callback(_discard)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def close(self) -> None:
+        self.primaries.close()
+        self.duplicates.close()
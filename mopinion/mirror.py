@@ -0,0 +1,326 @@
+"""
+Local SQLite mirror of feedback, for querying without network.
+
+Pages from ``get_datasets_feedback`` / ``get_reports_feedback`` are upserted
+into an indexed SQLite database. Feedback is indexed by resource, id and
+creation date, and every field value by key, so repeated questions such as
+"all feedback of dataset X last week with nps < 5" are answered locally.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.mirror import FeedbackMirror
+  >>> client = MopinionClient(public_key=PUBLICKEY, private_key=PRIVATEKEY)
+  >>> with FeedbackMirror("feedback.db") as mirror:
+  ...     mirror.sync(client, "datasets", 123)
+  ...     items = mirror.query("datasets", 123, since="2023-01-01", where={"nps": ("<", 5)})
+"""
+from mopinion.dataclasses import FeedbackQuery
+from requests.models import Response
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+import json
+import sqlite3
+import threading
+
+
+__all__ = ["FeedbackMirror"]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    resource TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    feedback_id TEXT NOT NULL,
+    created TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (resource, resource_id, feedback_id)
+);
+CREATE INDEX IF NOT EXISTS feedback_created
+    ON feedback (resource, resource_id, created);
+CREATE INDEX IF NOT EXISTS feedback_id ON feedback (feedback_id);
+
+CREATE TABLE IF NOT EXISTS feedback_values (
+    resource TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    feedback_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value_number REAL,
+    value_text TEXT
+);
+CREATE INDEX IF NOT EXISTS feedback_values_feedback
+    ON feedback_values (resource, resource_id, feedback_id);
+CREATE INDEX IF NOT EXISTS feedback_values_number
+    ON feedback_values (key, value_number);
+CREATE INDEX IF NOT EXISTS feedback_values_text
+    ON feedback_values (key, value_text);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    last_created TEXT,
+    PRIMARY KEY (resource, resource_id)
+);
+"""
+
+OPERATORS = {"=", "!=", "<", "<=", ">", ">="}
+
+RESOURCES = {"datasets", "reports"}
+
+
+def _values(item: dict):
+    """Yield ``(key, value)`` of the scalar values of a feedback item.
+
+    Lists of scalars, like tags, yield one pair per element.
+    """
+    for key, value in item.items():
+        if key in ("id", "fields") or isinstance(value, dict):
+            continue
+        if isinstance(value, list):
+            for element in value:
+                if not isinstance(element, (dict, list)):
+                    yield key, element
+        else:
+            yield key, value
+    for answer in item.get("fields") or ():
+        if isinstance(answer, dict) and "key" in answer:
+            value = answer.get("value")
+            if not isinstance(value, (dict, list)):
+                yield answer["key"], value
+
+
+def _typed(value) -> Tuple[Optional[float], Optional[str]]:
+    if isinstance(value, bool):
+        return float(value), None
+    if isinstance(value, (int, float)):
+        return float(value), None
+    if value is None:
+        return None, None
+    value = str(value)
+    try:
+        return float(value), value
+    except ValueError:
+        return None, value
+
+
+class FeedbackMirror:
+    """SQLite mirror of feedback items.
+
+    Args:
+      path (str): Database file, ``":memory:"`` for an in-memory mirror.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _check_resource(resource: str) -> None:
+        if resource not in RESOURCES:
+            raise ValueError(
+                f"'{resource}' is not a valid resource. Please consider one of: "
+                f"'{', '.join(sorted(RESOURCES))}'"
+            )
+
+    def ingest(
+        self,
+        pages: Iterable[Union[Response, dict]],
+        resource: str,
+        resource_id: Union[str, int],
+    ) -> int:
+        """Upsert the feedback of ``pages`` (responses or decoded pages).
+
+        Returns:
+          Number of items upserted.
+        """
+        self._check_resource(resource)
+        resource_id = str(resource_id)
+        count = 0
+        for page in pages:
+            if not isinstance(page, dict):
+                page = page.json()
+            items = [item for item in page.get("data") or () if "id" in item]
+            with self._lock, self._connection:
+                self._upsert(resource, resource_id, items)
+            count += len(items)
+        return count
+
+    def _upsert(self, resource: str, resource_id: str, items: List[dict]) -> None:
+        connection = self._connection
+        keys = [(resource, resource_id, str(item["id"])) for item in items]
+        connection.executemany(
+            "INSERT INTO feedback (resource, resource_id, feedback_id, created, data) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (resource, resource_id, feedback_id) "
+            "DO UPDATE SET created = excluded.created, data = excluded.data",
+            [
+                (*key, item.get("created"), json.dumps(item, separators=(",", ":")))
+                for key, item in zip(keys, items)
+            ],
+        )
+        connection.executemany(
+            "DELETE FROM feedback_values "
+            "WHERE resource = ? AND resource_id = ? AND feedback_id = ?",
+            keys,
+        )
+        connection.executemany(
+            "INSERT INTO feedback_values "
+            "(resource, resource_id, feedback_id, key, value_number, value_text) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (*key, field_key, *_typed(value))
+                for key, item in zip(keys, items)
+                for field_key, value in _values(item)
+            ],
+        )
+        created = [item["created"] for item in items if item.get("created")]
+        if created:
+            connection.execute(
+                "INSERT INTO sync_state (resource, resource_id, last_created) "
+                "VALUES (?, ?, ?) ON CONFLICT (resource, resource_id) DO UPDATE SET "
+                "last_created = max(coalesce(last_created, ''), excluded.last_created)",
+                (resource, resource_id, max(created)),
+            )
+
+    def last_created(self, resource: str, resource_id: Union[str, int]) -> Optional[str]:
+        """Creation date of the newest feedback mirrored for the resource."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT last_created FROM sync_state WHERE resource = ? AND resource_id = ?",
+                (resource, str(resource_id)),
+            ).fetchone()
+        return row["last_created"] if row else None
+
+    def sync(
+        self,
+        client,
+        resource: str,
+        resource_id: Union[str, int],
+        limit: int = 100,
+    ) -> int:
+        """Fetch feedback newer than the last sync and upsert it.
+
+        The first sync fetches everything. Next syncs only request the days
+        since the newest feedback mirrored; items of that day are upserted again.
+
+        Returns:
+          Number of items upserted.
+        """
+        self._check_resource(resource)
+        last_created = self.last_created(resource, resource_id)
+        query = FeedbackQuery(
+            limit=limit, date_from=last_created[:10] if last_created else None
+        )
+        pages = client.resource(
+            resource,
+            resource_id=resource_id,
+            sub_resource_name="feedback",
+            query_params=query,
+            iterator=True,
+        )
+        return self.ingest(pages, resource, resource_id)
+
+    def query(
+        self,
+        resource: Optional[str] = None,
+        resource_id: Optional[Union[str, int]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        where: Optional[dict] = None,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Query the mirrored feedback, newest first.
+
+        Args:
+          resource (str): Optional. ``datasets`` or ``reports``.
+          resource_id (str/int): Optional.
+          since (str): Optional. Created at or after, e.g. ``2023-01-01``.
+          until (str): Optional. Created before.
+          where (dict): Optional. Field conditions ``{key: value}`` or
+            ``{key: (operator, value)}`` with operators ``= != < <= > >=``.
+            ``None`` matches answers without a value, with ``=`` and ``!=`` only.
+          limit (int): Optional.
+
+        Returns:
+          List of feedback items.
+        """
+        sql, params = self._select("f.data", resource, resource_id, since, until, where)
+        sql += " ORDER BY f.created DESC, f.feedback_id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def count(
+        self,
+        resource: Optional[str] = None,
+        resource_id: Optional[Union[str, int]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        where: Optional[dict] = None,
+    ) -> int:
+        """Count the mirrored feedback, see ``query`` for the arguments."""
+        sql, params = self._select("count(*)", resource, resource_id, since, until, where)
+        with self._lock:
+            return self._connection.execute(sql, params).fetchone()[0]
+
+    def _select(self, columns, resource, resource_id, since, until, where):
+        conditions, params = [], []
+        if resource is not None:
+            self._check_resource(resource)
+            conditions.append("f.resource = ?")
+            params.append(resource)
+        if resource_id is not None:
+            conditions.append("f.resource_id = ?")
+            params.append(str(resource_id))
+        if since is not None:
+            conditions.append("f.created >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("f.created < ?")
+            params.append(until)
+
+        for key, condition in (where or {}).items():
+            operator, value = condition if isinstance(condition, tuple) else ("=", condition)
+            if operator not in OPERATORS:
+                raise ValueError(f"'{operator}' is not a valid operator.")
+            if value is None:
+                # NULL never equals NULL in SQL
+                if operator not in ("=", "!="):
+                    raise ValueError(f"'{operator}' is not a valid operator for None.")
+                test = "v.value_number IS NULL AND v.value_text IS NULL"
+                test = test if operator == "=" else f"NOT ({test})"
+                values = [key]
+            else:
+                number, text = _typed(value)
+                column, value = ("value_number", number) if number is not None else ("value_text", text)
+                test = f"v.{column} {operator} ?"
+                values = [key, value]
+            conditions.append(
+                "EXISTS (SELECT 1 FROM feedback_values v WHERE v.resource = f.resource "
+                "AND v.resource_id = f.resource_id AND v.feedback_id = f.feedback_id "
+                f"AND v.key = ? AND {test})"
+            )
+            params.extend(values)
+
+        sql = f"SELECT {columns} FROM feedback f"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return sql, params
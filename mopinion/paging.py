@@ -0,0 +1,107 @@
+"""
+Adaptive page size for paginated resources.
+
+Small pages cost round-trips, large pages time out and take memory. With a
+``PageSizeTuner`` the client picks the ``limit`` of each page while iterating:
+it doubles after fast and small pages, halves after slow or large pages and
+retries a page that failed with a smaller limit. Limits stay on a ladder of
+``min_limit * 2 ** n`` within the API maximum, and a new limit is only taken
+when the items already consumed are a multiple of it, so the page number of
+the next request is exact and no item is skipped or repeated.
+
+The last limit of every endpoint family is remembered, in a file shared by
+processes if ``path`` is given, and is the first limit of the next walk.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.paging import PageSizeTuner
+  >>> client = MopinionClient(PUBLICKEY, PRIVATEKEY, page_sizes=PageSizeTuner(path="limits.json"))
+  >>> pages = client.get_datasets_feedback(dataset_id=123, iterator=True)
+"""
+from mopinion import settings
+from mopinion.shared import SharedState
+from typing import Dict
+from typing import Optional
+
+import threading
+
+
+__all__ = ["PageSizeTuner"]
+
+
+class PageSizeTuner:
+    """Pick page sizes from the latency, size and errors of previous pages.
+
+    Args:
+      min_limit (int): Smallest page size. Defaults to 10.
+      max_limit (int): Largest page size, at most the API maximum. Defaults to 1000.
+      latency_target (float): Pages slower than this (seconds) halve the limit,
+        pages faster than half of it double it. Defaults to 1.
+      max_bytes (int): Pages larger than this halve the limit, pages smaller than
+        half of it may double it. Defaults to 4 MiB.
+      path (str): Optional. File remembering the limits between runs.
+    """
+
+    def __init__(
+        self,
+        min_limit: int = settings.DEFAULT_LIMIT,
+        max_limit: int = settings.MAX_LIMIT,
+        latency_target: float = 1.0,
+        max_bytes: int = 4 * 1024 * 1024,
+        path: Optional[str] = None,
+    ) -> None:
+        if not 1 <= min_limit <= max_limit <= settings.MAX_LIMIT:
+            raise ValueError(
+                f"Page sizes must be within 1 and {settings.MAX_LIMIT}, "
+                f"got {min_limit} and {max_limit}."
+            )
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.max_bytes = max_bytes
+        self.state = SharedState(path) if path else None
+        self._limits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _ladder(self, limit: int) -> int:
+        """Largest limit of the ladder not above ``limit``."""
+        step = self.min_limit
+        while step * 2 <= min(limit, self.max_limit):
+            step *= 2
+        return step
+
+    def limit(self, key: str) -> int:
+        """First limit for the endpoint family ``key``."""
+        with self._lock:
+            limit = self._limits.get(key)
+        if limit is None and self.state is not None:
+            with self.state.transaction() as limits:
+                limit = limits.get(key)
+        return self._ladder(limit or self.min_limit)
+
+    def remember(self, key: str, limit: int) -> None:
+        with self._lock:
+            if self._limits.get(key) == limit:
+                return
+            self._limits[key] = limit
+        if self.state is not None:
+            with self.state.transaction() as limits:
+                limits[key] = limit
+
+    def next_limit(self, limit: int, consumed: int, latency: float, size: int) -> int:
+        """Limit of the next page, after a page of ``limit`` items took
+        ``latency`` seconds and ``size`` bytes, ``consumed`` items in total."""
+        if latency > self.latency_target or size > self.max_bytes:
+            candidate = max(self.min_limit, limit // 2)
+        elif latency < self.latency_target / 2 and size < self.max_bytes / 2:
+            candidate = min(self._ladder(self.max_limit), limit * 2)
+        else:
+            candidate = limit
+        return candidate if consumed % candidate == 0 else limit
+
+    def shrink(self, limit: int, consumed: int) -> Optional[int]:
+        """Smaller limit to retry a page that failed, None if there is none."""
+        candidate = limit // 2
+        if candidate < self.min_limit or consumed % candidate:
+            return None
+        return candidate
@@ -0,0 +1,314 @@
+"""
+Bounded producer/consumer pipelines: fetch → transform → sink.
+
+The source (usually the page iterator of a resource) runs in its own thread,
+every stage runs in its own pool of workers and they are connected by bounded
+queues. Fetching goes on while pages are processed, and when a stage falls
+behind its queue fills up and the stages before it, the fetching included,
+wait: memory stays bounded by ``maxsize`` items per queue.
+
+A stage function returning ``None`` drops the item. With more than one worker
+in a stage, items may leave the stage out of order.
+
+Examples:
+  >>> from mopinion.pipeline import Pipeline, Stage
+  >>> pages = client.get_datasets_feedback(dataset_id=123, iterator=True)
+  >>> pipeline = Pipeline(
+  ...     pages,
+  ...     stages=[Stage(decode, workers=2), Stage(transform, workers=4)],
+  ...     sink=database.write,
+  ...     maxsize=8,
+  ... )
+  >>> pipeline.run()  # or: await pipeline.run_async()
+"""
+from dataclasses import dataclass
+from requests.models import Response
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Union
+
+import asyncio
+import functools
+import inspect
+import queue
+import threading
+
+
+__all__ = ["decode", "Pipeline", "PipelineCancelled", "Stage"]
+
+
+def decode(response: Response) -> dict:
+    """Stage function decoding a page."""
+    return response.json()
+
+
+class PipelineCancelled(Exception):
+    """The pipeline was cancelled before completion."""
+
+
+@dataclass
+class Stage:
+    """A step of the pipeline.
+
+    Args:
+      function (callable): Called with each item. Coroutine functions are
+        awaited by ``run_async``, other functions run in threads.
+      workers (int): Items processed concurrently. Defaults to 1.
+    """
+
+    function: Callable
+    workers: int = 1
+
+    def __post_init__(self):
+        if self.workers < 1:
+            raise ValueError(f"'{self.workers}' is not a valid number of workers.")
+
+
+_DONE = object()
+
+
+class Pipeline:
+    """Run ``source`` through ``stages`` into ``sink`` with bounded queues.
+
+    Args:
+      source (iterable): Items to process, e.g. the pages of a resource.
+      stages (list): ``Stage`` objects, or functions run with one worker.
+      sink (callable): Optional. Called with each output item, in the calling
+        thread (``run``) or the event loop (``run_async``).
+      maxsize (int): Capacity of each queue. Defaults to 4.
+    """
+
+    def __init__(
+        self,
+        source: Iterable,
+        stages: List[Union[Stage, Callable]] = (),
+        sink: Optional[Callable[[Any], Any]] = None,
+        maxsize: int = 4,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError(f"'{maxsize}' is not a valid queue size.")
+        self.source = source
+        self.stages = [
+            stage if isinstance(stage, Stage) else Stage(stage) for stage in stages
+        ]
+        self.sink = sink
+        self.maxsize = maxsize
+        self.processed = 0
+        self._cancelled = threading.Event()
+        self._error = None
+        self._loop = None
+        self._tasks = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Stop fetching and processing. ``run`` raises ``PipelineCancelled``.
+
+        It can be called from any thread.
+        """
+        self._cancelled.set()
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            # tasks are only cancelled from their event loop
+            for task in self._tasks:
+                loop.call_soon_threadsafe(task.cancel)
+
+    def _fail(self, error: BaseException) -> None:
+        if self._error is None:
+            self._error = error
+        self._cancelled.set()
+
+    # threads
+
+    def _put(self, output: queue.Queue, item) -> bool:
+        while not self._cancelled.is_set():
+            try:
+                output.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, input: queue.Queue):
+        while not self._cancelled.is_set():
+            try:
+                return input.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def _produce(self, output: queue.Queue) -> None:
+        try:
+            for item in self.source:
+                if not self._put(output, item):
+                    break
+        except BaseException as error:
+            self._fail(error)
+        finally:
+            # stop a generator source, e.g. the pagination of a resource
+            close = getattr(self.source, "close", None)
+            if close is not None:
+                close()
+        self._put(output, _DONE)
+
+    def _work(self, stage: Stage, input, output, running: List[int], lock) -> None:
+        try:
+            while True:
+                item = self._get(input)
+                if item is _DONE:
+                    # let the other workers of the stage see the end
+                    self._put(input, _DONE)
+                    break
+                result = stage.function(item)
+                if result is not None and not self._put(output, result):
+                    break
+        except BaseException as error:
+            self._fail(error)
+        with lock:
+            running[0] -= 1
+            last = running[0] == 0
+        if last:
+            self._put(output, _DONE)
+
+    def run(self) -> int:
+        """Run the pipeline with threads until the source is exhausted.
+
+        Returns:
+          Number of items delivered to the sink.
+        """
+        queues = [queue.Queue(self.maxsize) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._produce, args=(queues[0],), daemon=True)]
+        for index, stage in enumerate(self.stages):
+            running, lock = [stage.workers], threading.Lock()
+            for _ in range(stage.workers):
+                args = (stage, queues[index], queues[index + 1], running, lock)
+                threads.append(threading.Thread(target=self._work, args=args, daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _DONE:
+                    break
+                if self.sink is not None:
+                    self.sink(item)
+                self.processed += 1
+        except BaseException as error:
+            self._fail(error)
+        finally:
+            for thread in threads:
+                thread.join()
+        return self._result()
+
+    def _result(self) -> int:
+        if self._error is not None:
+            raise self._error
+        if self._cancelled.is_set():
+            raise PipelineCancelled(f"Cancelled after {self.processed} items")
+        return self.processed
+
+    # asyncio
+
+    async def _call(self, function: Callable, item):
+        if inspect.iscoroutinefunction(function):
+            return await function(item)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(function, item))
+
+    async def _produce_async(self, output: asyncio.Queue) -> None:
+        if hasattr(self.source, "__aiter__"):
+            iterator = self.source.__aiter__()
+            try:
+                async for item in iterator:
+                    await output.put(item)
+            finally:
+                aclose = getattr(iterator, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+        else:
+            await self._produce_blocking(output)
+        await output.put(_DONE)
+
+    async def _produce_blocking(self, output: asyncio.Queue) -> None:
+        # blocking source, e.g. the pagination of a resource
+        loop = asyncio.get_running_loop()
+        iterator = iter(self.source)
+        lock = threading.Lock()
+
+        def advance():
+            with lock:
+                return next(iterator, _DONE)
+
+        def close():
+            # once the item being fetched, if any, has arrived
+            with lock:
+                iterator.close()
+
+        try:
+            while True:
+                item = await loop.run_in_executor(None, advance)
+                if item is _DONE:
+                    break
+                await output.put(item)
+        finally:
+            if hasattr(iterator, "close"):
+                await loop.run_in_executor(None, close)
+
+    async def _work_async(self, stage: Stage, input, output, running: List[int]):
+        while True:
+            item = await input.get()
+            if item is _DONE:
+                await input.put(_DONE)
+                break
+            result = await self._call(stage.function, item)
+            if result is not None:
+                await output.put(result)
+        running[0] -= 1
+        if running[0] == 0:
+            await output.put(_DONE)
+
+    async def run_async(self) -> int:
+        """Run the pipeline on the running event loop.
+
+        Returns:
+          Number of items delivered to the sink.
+        """
+        self._loop = asyncio.get_running_loop()
+        queues = [asyncio.Queue(self.maxsize) for _ in range(len(self.stages) + 1)]
+        self._tasks = [asyncio.ensure_future(self._produce_async(queues[0]))]
+        for index, stage in enumerate(self.stages):
+            running = [stage.workers]
+            for _ in range(stage.workers):
+                worker = self._work_async(stage, queues[index], queues[index + 1], running)
+                self._tasks.append(asyncio.ensure_future(worker))
+
+        async def consume():
+            while True:
+                item = await queues[-1].get()
+                if item is _DONE:
+                    return
+                if self.sink is not None:
+                    if inspect.iscoroutinefunction(self.sink):
+                        await self.sink(item)
+                    else:
+                        self.sink(item)
+                self.processed += 1
+
+        self._tasks.append(asyncio.ensure_future(consume()))
+        try:
+            # the first error cancels everything
+            done, _ = await asyncio.wait(self._tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    self._fail(task.exception())
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        return self._result()
@@ -0,0 +1,346 @@
+"""
+Circuit breakers and adaptive concurrency control.
+
+``CircuitBreakers`` keeps one ``CircuitBreaker`` per endpoint family
+(``datasets/feedback``, ``reports``, ...). After ``failure_threshold``
+consecutive failures the circuit opens and calls fail immediately with
+``CircuitOpenError`` instead of waiting through retries. After ``reset_timeout``
+seconds one trial call is let through: it closes the circuit on success or
+opens it again on failure.
+
+``AdaptiveConcurrencyLimiter`` bounds the number of requests in flight and
+adapts the bound AIMD-style: it grows by one per window of healthy responses
+and is halved when a response fails or is slower than ``latency_target``.
+It can be shared by threads (``with limiter.slot()``) and coroutines
+(``async with limiter.async_slot()``); waiting coroutines are woken in turn as
+slots are released.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.resilience import AdaptiveConcurrencyLimiter, CircuitBreakers
+  >>> client = MopinionClient(
+  ...     PUBLICKEY,
+  ...     PRIVATEKEY,
+  ...     circuit_breakers=CircuitBreakers(failure_threshold=5, reset_timeout=30),
+  ...     limiter=AdaptiveConcurrencyLimiter(initial=4, max_limit=32, latency_target=2.0),
+  ... )
+"""
+from collections import deque
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from mopinion.exceptions import CircuitOpenError
+from requests.exceptions import HTTPError
+from requests.exceptions import RequestException
+from typing import Callable
+from typing import Deque
+from typing import Dict
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import asyncio
+import threading
+import time
+
+
+__all__ = [
+    "AdaptiveConcurrencyLimiter",
+    "CircuitBreaker",
+    "CircuitBreakers",
+    "is_failure",
+]
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def is_failure(error: BaseException) -> bool:
+    """Whether ``error`` means the API is unhealthy.
+
+    Connection errors, timeouts, server errors and rate limiting count as
+    failures; client errors (4xx) and validation errors do not.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, RequestException)
+
+
+class CircuitBreaker:
+    """Circuit breaker for a single endpoint family.
+
+    Args:
+      name (str): Name used in error messages.
+      failure_threshold (int): Consecutive failures that open the circuit. Defaults to 5.
+      reset_timeout (float): Seconds before a trial call is allowed. Defaults to 30.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._reset_due():
+                return self.HALF_OPEN
+            return self._state
+
+    def _reset_due(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def before_call(self) -> None:
+        """Raise ``CircuitOpenError`` unless a call is allowed now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN and self._reset_due():
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            raise CircuitOpenError(
+                f"Circuit for '{self.name}' is open after {self.failures} failures"
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+
+    def trip(self) -> None:
+        """Open the circuit, e.g. when a health check fails."""
+        with self._lock:
+            self._open()
+
+    def call(self, send: Callable):
+        self.before_call()
+        try:
+            result = send()
+        except BaseException as error:
+            if is_failure(error):
+                self.record_failure()
+            else:
+                # not the API's fault, let another call through
+                with self._lock:
+                    self._trial_running = False
+            raise
+        self.record_success()
+        return result
+
+
+class CircuitBreakers:
+    """One ``CircuitBreaker`` per endpoint family, created on first use.
+
+    Args:
+      failure_threshold (int): Defaults to 5.
+      reset_timeout (float): Defaults to 30.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # families opened by ``trip_all``, None when not tripped
+        self._tripped: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+
+    def __getitem__(self, family: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(family)
+            if breaker is None:
+                breaker = self._breakers[family] = CircuitBreaker(
+                    family, self.failure_threshold, self.reset_timeout
+                )
+                if self._tripped is not None:
+                    breaker.trip()
+                    self._tripped.add(family)
+            return breaker
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._breakers.values()))
+
+    def call(self, family: str, send: Callable):
+        return self[family].call(send)
+
+    def trip_all(self) -> None:
+        """Open every circuit, e.g. when a health check fails.
+
+        Circuits of families used later start open too, until ``reset_tripped``.
+        """
+        with self._lock:
+            if self._tripped is None:
+                self._tripped = set()
+            for family, breaker in self._breakers.items():
+                # circuits opened by their own failures are left to recover alone
+                if family in self._tripped or breaker.state == CircuitBreaker.CLOSED:
+                    breaker.trip()
+                    self._tripped.add(family)
+
+    def reset_tripped(self) -> None:
+        """Close the circuits opened by ``trip_all``, e.g. when a health check succeeds."""
+        with self._lock:
+            tripped, self._tripped = self._tripped, None
+            breakers = [self._breakers[family] for family in tripped or ()]
+        for breaker in breakers:
+            breaker.record_success()
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limit the requests in flight, adapting the limit to the API's health.
+
+    Args:
+      initial (int): Initial limit. Defaults to 4.
+      min_limit (int): Defaults to 1.
+      max_limit (int): Defaults to 64.
+      latency_target (float): Seconds. Slower responses shrink the limit. Optional.
+      decrease_factor (float): Multiplier applied on congestion. Defaults to 0.5.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_target: Optional[float] = None,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("Limits must satisfy 1 <= min_limit <= initial <= max_limit")
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"'{decrease_factor}' is not a valid factor, use (0, 1)")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._limit = float(initial)
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        # coroutines waiting for a slot, in order of arrival
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _grant(self) -> None:
+        # hand the free slots to waiting coroutines, with the lock held
+        while self._waiters and self.in_flight < self.limit:
+            loop, future = self._waiters.popleft()
+            self.in_flight += 1
+            loop.call_soon_threadsafe(_wake, future)
+
+    async def _async_acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if not self._waiters and self.in_flight < self.limit:
+                self.in_flight += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except BaseException:
+            with self._condition:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                else:
+                    # cancelled after the slot was granted, pass it on
+                    self.in_flight -= 1
+                    self._grant()
+                    self._condition.notify_all()
+            raise
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        with self._condition:
+            acquired = self._condition.wait_for(
+                lambda: self.in_flight < self.limit, timeout=timeout
+            )
+            if acquired:
+                self.in_flight += 1
+            return acquired
+
+    def release(self, latency: float, ok: bool = True) -> None:
+        """Release a slot, adapting the limit to the outcome of the request."""
+        with self._condition:
+            self.in_flight -= 1
+            congested = not ok or (
+                self.latency_target is not None and latency > self.latency_target
+            )
+            if congested:
+                # decrease at most once per latency, requests in flight during the
+                # congestion would otherwise collapse the limit to the minimum
+                now = time.monotonic()
+                if now - self._last_decrease >= latency:
+                    self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+                    self._last_decrease = now
+            else:
+                # +1 after a full window of healthy responses
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._grant()
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        start = time.monotonic()
+        ok = True
+        try:
+            yield
+        except BaseException as error:
+            ok = not is_failure(error)
+            raise
+        finally:
+            self.release(time.monotonic() - start, ok)
+
+    @asynccontextmanager
+    async def async_slot(self):
+        await self._async_acquire()
+        start = time.monotonic()
+        ok = True
+        try:
+            yield
+        except BaseException as error:
+            ok = not is_failure(error)
+            raise
+        finally:
+            self.release(time.monotonic() - start, ok)
+
+    def call(self, send: Callable):
+        with self.slot():
+            return send()
+
+    def congested(self) -> None:
+        """Halve the limit, e.g. when a health check fails."""
+        with self._condition:
+            self._limit = max(self.min_limit, self._limit * self.decrease_factor)
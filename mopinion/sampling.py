@@ -0,0 +1,282 @@
+"""
+Approximate answers from a sample of the pages of a feedback resource.
+
+With ``sample=Sampling(...)``, ``MopinionClient.resource`` fetches a subset of
+the pages of a feedback resource instead of all of them and returns a
+``Sample``. A probe request of one item gives the number of items; the pages to
+fetch are then drawn at random, or stratified: the pages are split into
+contiguous windows, periods of time as feedback is sorted by date, and each
+window gets its share of the sample.
+
+A ``Sample`` estimates counts, proportions, means and distributions over the
+whole resource, with confidence bounds. Pages are clusters of items, the
+estimators are the ratio estimators of stratified cluster sampling, so the
+bounds account for items of a page being alike. Fetching a larger fraction
+narrows the bounds; a fraction of 1 fetches everything and gives exact answers.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.sampling import Sampling
+  >>> client = MopinionClient(public_key=PUBLICKEY, private_key=PRIVATEKEY)
+  >>> sample = client.resource("reports", 123, "feedback", sample=Sampling(fraction=0.05, seed=1))
+  >>> sample.requests, sample.total
+  >>> sample.mean("nps")  # Estimate(value, low, high, standard_error)
+  >>> sample.proportion(lambda item: "mobile" in item["tags"])
+  >>> sample.distribution("nps")
+"""
+from dataclasses import dataclass
+from mopinion import settings
+from mopinion.dataclasses import FeedbackQuery
+from mopinion.decoding import to_float
+from statistics import NormalDist
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+import dataclasses
+import math
+import random
+
+
+__all__ = ["Estimate", "Sample", "Sampling"]
+
+
+STRATEGIES = ("random", "stratified")
+
+Value = Union[str, Callable[[dict], Optional[float]]]
+
+
+@dataclass(frozen=True)
+class Estimate:
+    """Estimated value with its confidence bounds."""
+
+    value: float
+    low: float
+    high: float
+    standard_error: float
+
+
+@dataclass
+class Sampling:
+    """How to sample the pages of a feedback resource.
+
+    Args:
+      fraction (float): Share of the pages to fetch, in (0, 1]. Defaults to 0.1.
+      pages (int): Optional. Number of pages to fetch, instead of a fraction.
+      strategy (str): ``stratified`` or ``random``. Defaults to ``stratified``.
+      limit (int): Items per page. Defaults to the ``limit`` of the query or 100.
+      confidence (float): Level of the confidence bounds. Defaults to 0.95.
+      seed (int): Optional. Seed of the draw, for reproducible samples.
+    """
+
+    fraction: float = 0.1
+    pages: Optional[int] = None
+    strategy: str = "stratified"
+    limit: Optional[int] = None
+    confidence: float = 0.95
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        if not 0 < self.fraction <= 1:
+            raise ValueError(f"'{self.fraction}' is not a valid fraction, use (0, 1]")
+        if self.pages is not None and self.pages < 1:
+            raise ValueError(f"'{self.pages}' is not a valid number of pages")
+        if self.strategy not in STRATEGIES:
+            raise ValueError(
+                f"'{self.strategy}' is not a valid strategy. "
+                f"Please consider one of: '{', '.join(STRATEGIES)}'"
+            )
+        if self.limit is not None and not 1 <= self.limit <= settings.MAX_LIMIT:
+            raise ValueError(f"The limit must be within 1 and {settings.MAX_LIMIT}")
+        if not 0 < self.confidence < 1:
+            raise ValueError(f"'{self.confidence}' is not a valid confidence, use (0, 1)")
+
+    def draw(self, pages: int) -> List[Tuple[int, List[int]]]:
+        """Page numbers to fetch out of ``pages``, per stratum with its number of pages."""
+        if not pages:
+            return []
+        size = self.pages if self.pages is not None else math.ceil(self.fraction * pages)
+        # two pages per stratum at least, to estimate the variance
+        size = min(pages, max(size, 2))
+        count = 1 if self.strategy == "random" else max(1, size // 2)
+        bounds = [stratum * pages // count for stratum in range(count + 1)]
+        rng = random.Random(self.seed)
+        strata = []
+        for start, end in zip(bounds, bounds[1:]):
+            share = min(end - start, max(2, round(size * (end - start) / pages)))
+            strata.append((end - start, sorted(rng.sample(range(start + 1, end + 1), share))))
+        return strata
+
+    def fetch(self, client, endpoint: str, query_params=None, **params) -> "Sample":
+        """Fetch a sample of the pages of ``endpoint``, ``params`` go to ``client.request``."""
+        query = query_params
+        if isinstance(query, FeedbackQuery):
+            query = query.to_query_params()
+        limit = self.limit or int((query or {}).get("limit") or 100)
+
+        def get_page(limit: int, number: int) -> dict:
+            page = {"limit": limit, "page": number}
+            if isinstance(query_params, FeedbackQuery):
+                query = dataclasses.replace(query_params, **page)
+            else:
+                query = {**(query_params or {}), **page}
+            return client.request(endpoint=endpoint, query_params=query, **params).json()
+
+        # a page of one item tells the number of items
+        meta = get_page(1, 1)["_meta"]
+        if meta.get("total") is None:
+            raise ValueError(f"'{endpoint}' has no total, it cannot be sampled.")
+        total = int(meta["total"])
+        strata = self.draw(math.ceil(total / limit))
+        return Sample(
+            total=total,
+            limit=limit,
+            strata=[
+                (size, [get_page(limit, number).get("data") or [] for number in numbers])
+                for size, numbers in strata
+            ],
+            pages=[number for _, numbers in strata for number in numbers],
+            requests=1 + sum(len(numbers) for _, numbers in strata),
+            confidence=self.confidence,
+        )
+
+
+def _value(item: dict, key: str):
+    """Value of the answer ``key`` of an item, or of its attribute ``key``."""
+    for answer in item.get("fields") or ():
+        if isinstance(answer, dict) and answer.get("key") == key:
+            return answer.get("value")
+    return item.get(key)
+
+
+class Sample:
+    """Pages sampled from a feedback resource, with estimators.
+
+    Args:
+      total (int): Items of the resource.
+      limit (int): Items per page.
+      strata (list): ``(pages in the stratum, [items of each sampled page])``.
+      pages (list): Page numbers fetched.
+      requests (int): Requests sent.
+      confidence (float): Level of the confidence bounds. Defaults to 0.95.
+    """
+
+    def __init__(
+        self,
+        total: int,
+        limit: int,
+        strata: List[Tuple[int, List[List[dict]]]],
+        pages: List[int],
+        requests: int,
+        confidence: float = 0.95,
+    ) -> None:
+        self.total = total
+        self.limit = limit
+        self.strata = strata
+        self.pages = pages
+        self.requests = requests
+        self.confidence = confidence
+        self._z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+    @property
+    def items(self) -> List[dict]:
+        """Items of the sampled pages."""
+        return [item for _, pages in self.strata for page in pages for item in page]
+
+    @property
+    def fraction(self) -> float:
+        """Share of the pages fetched."""
+        pages = sum(size for size, _ in self.strata)
+        return len(self.pages) / pages if pages else 1.0
+
+    def _totals(self, per_page: Callable[[List[dict]], float]) -> List[Tuple[int, List[float]]]:
+        return [(size, [per_page(page) for page in pages]) for size, pages in self.strata]
+
+    @staticmethod
+    def _estimate(totals: List[Tuple[int, List[float]]]) -> Tuple[float, float]:
+        """Estimated total over all the pages and its variance."""
+        estimate, variance = 0.0, 0.0
+        for size, values in totals:
+            if not values:
+                continue
+            n = len(values)
+            mean = sum(values) / n
+            estimate += size * mean
+            if n > 1:
+                spread = sum((value - mean) ** 2 for value in values) / (n - 1)
+                variance += size**2 * (1 - n / size) * spread / n
+        return estimate, variance
+
+    def _ratio(self, numerator, denominator) -> Tuple[float, float]:
+        """Ratio of two estimated totals and its variance (linearized)."""
+        y = self._totals(numerator)
+        x = self._totals(denominator)
+        y_total, _ = self._estimate(y)
+        x_total, _ = self._estimate(x)
+        if not x_total:
+            return math.nan, math.nan
+        ratio = y_total / x_total
+        residuals = [
+            (size, [a - ratio * b for a, b in zip(ys, xs)])
+            for (size, ys), (_, xs) in zip(y, x)
+        ]
+        _, variance = self._estimate(residuals)
+        return ratio, variance / x_total**2
+
+    def _interval(self, value: float, variance: float, scale: float = 1.0) -> Estimate:
+        error = math.sqrt(variance) * scale if variance == variance else math.nan
+        return Estimate(
+            value=value * scale,
+            low=value * scale - self._z * error,
+            high=value * scale + self._z * error,
+            standard_error=error,
+        )
+
+    def proportion(self, predicate: Callable[[dict], bool]) -> Estimate:
+        """Estimated share of the items matching ``predicate``."""
+        ratio, variance = self._ratio(
+            lambda page: sum(1 for item in page if predicate(item)), len
+        )
+        return self._interval(ratio, variance)
+
+    def count(self, predicate: Optional[Callable[[dict], bool]] = None) -> Estimate:
+        """Estimated number of items matching ``predicate``, all items by default."""
+        if predicate is None:
+            return Estimate(self.total, self.total, self.total, 0.0)
+        ratio, variance = self._ratio(
+            lambda page: sum(1 for item in page if predicate(item)), len
+        )
+        return self._interval(ratio, variance, scale=self.total)
+
+    def mean(self, value: Value) -> Estimate:
+        """Estimated mean of ``value`` over the items having it.
+
+        Args:
+          value: Key of an answer or of the item, e.g. ``nps``, or a callable
+            returning the value of an item, None if it has none.
+        """
+        get = value if callable(value) else lambda item: to_float(_value(item, value))
+
+        def values(page):
+            return [number for number in map(get, page) if number is not None]
+
+        ratio, variance = self._ratio(lambda page: sum(values(page)), lambda page: len(values(page)))
+        return self._interval(ratio, variance)
+
+    def distribution(self, key: str) -> Dict[Hashable, Estimate]:
+        """Estimated number of items per value of the answer or attribute ``key``.
+
+        Lists, like tags, count once per element.
+        """
+        def values(item) -> list:
+            value = _value(item, key)
+            if isinstance(value, list):
+                return [element for element in value if not isinstance(element, (dict, list))]
+            return [] if value is None or isinstance(value, dict) else [value]
+
+        seen = sorted({value for item in self.items for value in values(item)}, key=str)
+        return {value: self.count(lambda item, value=value: value in values(item)) for value in seen}
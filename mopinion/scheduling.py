@@ -0,0 +1,209 @@
+"""
+Priority classes for requests sharing a client.
+
+A ``PriorityScheduler`` sits in front of every request of a client and gives
+the requests in flight to priority classes. Each class has a share, the most
+requests it may have in flight, and a waiting request only starts when no class
+of a higher priority is waiting with room in its share. Bulk traffic such as a
+backfill paginating a report then yields to interactive calls at every page,
+with the same client and credentials.
+
+The class of a request is taken from the context, set with ``priority``. Context
+variables follow coroutines and tasks but not threads: a thread starts without a
+priority, use ``contextvars.copy_context().run`` to pass it on.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.scheduling import PriorityScheduler, priority
+  >>> scheduler = PriorityScheduler({"interactive": 8, "bulk": 2})
+  >>> client = MopinionClient(PUBLICKEY, PRIVATEKEY, scheduler=scheduler)
+  >>> client.get_reports(report_id=123)  # interactive, the first class by default
+  >>> with priority("bulk"):
+  ...     for page in client.get_reports_feedback(report_id=123, iterator=True):
+  ...         backfill(page)
+"""
+from collections import deque
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+from typing import Deque
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+import asyncio
+import threading
+
+
+__all__ = ["PriorityScheduler", "current_priority", "priority"]
+
+
+_priority: ContextVar[Optional[str]] = ContextVar("mopinion_priority", default=None)
+
+
+def current_priority() -> Optional[str]:
+    """Priority class of the current context, None if it is not set."""
+    return _priority.get()
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+@contextmanager
+def priority(name: str):
+    """Send the requests of this context with the priority class ``name``."""
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class PriorityScheduler:
+    """Share the requests in flight between priority classes.
+
+    Args:
+      shares (dict): Most requests in flight of each class, from the highest
+        priority to the lowest, e.g. ``{"interactive": 8, "bulk": 2}``.
+      limit (int): Most requests in flight in total. Defaults to the sum of the shares.
+      default (str): Class of requests without a priority. Defaults to the first class.
+
+    Attributes:
+      in_flight (dict): Requests in flight, per class.
+      waiting (dict): Requests waiting, per class.
+      completed (dict): Requests completed, per class.
+    """
+
+    def __init__(
+        self,
+        shares: Dict[str, int],
+        limit: Optional[int] = None,
+        default: Optional[str] = None,
+    ) -> None:
+        if not shares or any(share < 1 for share in shares.values()):
+            raise ValueError("Every priority class needs a share of at least 1")
+        self.shares = dict(shares)
+        self.classes = list(self.shares)
+        self.limit = limit or sum(self.shares.values())
+        if self.limit < 1:
+            raise ValueError(f"'{self.limit}' is not a valid limit")
+        self.default = default or self.classes[0]
+        self._check(self.default)
+        self.in_flight = dict.fromkeys(self.classes, 0)
+        self.waiting = dict.fromkeys(self.classes, 0)
+        self.completed = dict.fromkeys(self.classes, 0)
+        self._condition = threading.Condition()
+        # coroutines waiting for a slot, per class in order of arrival
+        self._waiters: Dict[str, Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {
+            name: deque() for name in self.classes
+        }
+
+    def _check(self, name: str) -> str:
+        if name not in self.shares:
+            raise ValueError(
+                f"'{name}' is not a priority class. "
+                f"Please consider one of: '{', '.join(self.classes)}'"
+            )
+        return name
+
+    def _resolve(self, name: Optional[str]) -> str:
+        return self._check(name or current_priority() or self.default)
+
+    def _can_start(self, name: str) -> bool:
+        if sum(self.in_flight.values()) >= self.limit or self.in_flight[name] >= self.shares[name]:
+            return False
+        # yield to waiting requests of a higher priority that could start
+        for higher in self.classes[: self.classes.index(name)]:
+            if self.waiting[higher] and self.in_flight[higher] < self.shares[higher]:
+                return False
+        return True
+
+    def _start(self, name: str) -> None:
+        self.in_flight[name] += 1
+
+    def acquire(self, name: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """Wait for a slot of the class ``name``, by default the context's.
+
+        Returns:
+          False if ``timeout`` expired first.
+        """
+        name = self._resolve(name)
+        with self._condition:
+            self.waiting[name] += 1
+            try:
+                acquired = self._condition.wait_for(lambda: self._can_start(name), timeout)
+            finally:
+                self.waiting[name] -= 1
+            if acquired:
+                self._start(name)
+            else:
+                # a lower class may have been waiting on this one
+                self._grant()
+                self._condition.notify_all()
+            return acquired
+
+    def _grant(self) -> None:
+        # hand the free slots to waiting coroutines by priority, with the lock held
+        for name in self.classes:
+            waiters = self._waiters[name]
+            while waiters and self._can_start(name):
+                loop, future = waiters.popleft()
+                self.waiting[name] -= 1
+                self._start(name)
+                loop.call_soon_threadsafe(_wake, future)
+
+    async def _async_acquire(self, name: str) -> None:
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if not self._waiters[name] and self._can_start(name):
+                self._start(name)
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters[name].append(waiter)
+            self.waiting[name] += 1
+        try:
+            await waiter[1]
+        except BaseException:
+            with self._condition:
+                if waiter in self._waiters[name]:
+                    self._waiters[name].remove(waiter)
+                    self.waiting[name] -= 1
+                else:
+                    # cancelled after the slot was granted, pass it on
+                    self.in_flight[name] -= 1
+                self._grant()
+                self._condition.notify_all()
+            raise
+
+    def release(self, name: Optional[str] = None) -> None:
+        name = self._resolve(name)
+        with self._condition:
+            self.in_flight[name] -= 1
+            self.completed[name] += 1
+            self._grant()
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, name: Optional[str] = None):
+        name = self._resolve(name)
+        self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    @asynccontextmanager
+    async def async_slot(self, name: Optional[str] = None):
+        name = self._resolve(name)
+        await self._async_acquire(name)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    def call(self, send: Callable):
+        with self.slot():
+            return send()
@@ -0,0 +1,484 @@
+"""
+Local full-text index over the open-text answers of feedback.
+
+``FeedbackIndex`` keeps an inverted index in SQLite: for every term, the
+documents (feedback items) containing it and the positions of the term in each
+of them. Postings are compressed: document numbers are stored as deltas and
+positions as deltas within a document, all as varints, so a posting costs a few
+bytes instead of a row.
+
+The index is updated incrementally. Pages are tokenised as they arrive and
+every batch of ``flush_every`` documents is appended as a new segment of the
+postings of each of its terms, existing segments are never rewritten. Feedback
+indexed again with a different text replaces its old version, feedback indexed
+again unchanged is skipped. ``optimize`` merges the segments of every term and
+drops replaced documents.
+
+Queries combine terms (all required), quoted phrases, ``-term`` exclusions and
+``OR`` between groups, and return feedback ids:
+
+  - ``website slow``: both terms;
+  - ``"works fine"``: the phrase;
+  - ``checkout -app``: ``checkout`` but not ``app``;
+  - ``refund OR "money back"``: either.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.search import FeedbackIndex
+  >>> client = MopinionClient(public_key=PUBLICKEY, private_key=PRIVATEKEY)
+  >>> with FeedbackIndex("comments.db", fields={"comment"}) as index:
+  ...     index.sync(client, "datasets", 123)
+  ...     ids = index.search('"too slow" OR crash -app', resource="datasets")
+"""
+from collections import defaultdict
+from mopinion.dataclasses import FeedbackQuery
+from requests.models import Response
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+import hashlib
+import re
+import sqlite3
+import threading
+
+
+__all__ = ["FeedbackIndex", "decode_varints", "encode_varints", "tokenize"]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    resource TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    feedback_id TEXT NOT NULL,
+    doc INTEGER NOT NULL UNIQUE,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (resource, resource_id, feedback_id)
+);
+
+CREATE TABLE IF NOT EXISTS replaced (
+    doc INTEGER PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    first_doc INTEGER NOT NULL,
+    documents INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (term, first_doc)
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    last_created TEXT,
+    PRIMARY KEY (resource, resource_id)
+);
+"""
+
+RESOURCES = {"datasets", "reports"}
+
+TOKEN = re.compile(r"\w+")
+# a phrase, an optionally negated term or OR
+QUERY_TOKEN = re.compile(r'(-?)"([^"]*)"|(-?)([^\s"]+)')
+
+Postings = Dict[int, List[int]]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words of ``text``."""
+    return TOKEN.findall(text.casefold())
+
+
+def encode_varints(numbers: Iterable[int]) -> bytes:
+    """Encode non-negative integers with 7 bits per byte, small numbers first."""
+    data = bytearray()
+    for number in numbers:
+        while number >= 0x80:
+            data.append(number & 0x7F | 0x80)
+            number >>= 7
+        data.append(number)
+    return bytes(data)
+
+
+def decode_varints(data: bytes) -> List[int]:
+    numbers, number, shift = [], 0, 0
+    for byte in data:
+        number |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            numbers.append(number)
+            number, shift = 0, 0
+    return numbers
+
+
+def _encode_postings(first_doc: int, postings: List[Tuple[int, List[int]]]) -> bytes:
+    # per document: doc delta, number of positions, position deltas
+    numbers, previous = [], first_doc
+    for doc, positions in postings:
+        numbers += (doc - previous, len(positions))
+        previous = doc
+        last = 0
+        for position in positions:
+            numbers.append(position - last)
+            last = position
+    return encode_varints(numbers)
+
+
+def _decode_postings(first_doc: int, data: bytes) -> Iterator[Tuple[int, List[int]]]:
+    numbers = decode_varints(data)
+    doc, index = first_doc, 0
+    while index < len(numbers):
+        doc += numbers[index]
+        count = numbers[index + 1]
+        index += 2
+        positions, position = [], 0
+        for delta in numbers[index : index + count]:
+            position += delta
+            positions.append(position)
+        index += count
+        yield doc, positions
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+class FeedbackIndex:
+    """Inverted index of the open-text answers of feedback items.
+
+    Args:
+      path (str): Database file, ``":memory:"`` for an in-memory index.
+      fields (set): Optional. Keys of the answers to index. Defaults to every
+        answer with a text value that is not a number.
+      flush_every (int): Documents buffered before a segment is written.
+        Defaults to 1000.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        fields: Optional[Iterable[str]] = None,
+        flush_every: int = 1000,
+    ) -> None:
+        self.path = path
+        self.fields = frozenset(fields) if fields is not None else None
+        self.flush_every = flush_every
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+        self._next_doc = self._connection.execute(
+            "SELECT coalesce(max(doc), 0) + 1 FROM documents"
+        ).fetchone()[0]
+        # buffered until the next flush
+        self._documents: Dict[Tuple[str, str, str], Tuple[int, str]] = {}
+        self._postings: Dict[str, List[Tuple[int, List[int]]]] = defaultdict(list)
+        self._replaced: List[int] = []
+        self._last_created: Dict[Tuple[str, str], str] = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        """Number of documents indexed."""
+        with self._lock:
+            self.flush()
+            return self._connection.execute("SELECT count(*) FROM documents").fetchone()[0]
+
+    @staticmethod
+    def _check_resource(resource: str) -> None:
+        if resource not in RESOURCES:
+            raise ValueError(
+                f"'{resource}' is not a valid resource. Please consider one of: "
+                f"'{', '.join(sorted(RESOURCES))}'"
+            )
+
+    def _texts(self, item: dict) -> List[str]:
+        texts = []
+        for answer in item.get("fields") or ():
+            if not isinstance(answer, dict):
+                continue
+            value = answer.get("value")
+            if not isinstance(value, str) or not value:
+                continue
+            if self.fields is not None:
+                if answer.get("key") in self.fields:
+                    texts.append(value)
+            elif not _is_number(value):
+                texts.append(value)
+        return texts
+
+    def ingest(
+        self,
+        pages: Iterable[Union[Response, dict]],
+        resource: str,
+        resource_id: Union[str, int],
+    ) -> int:
+        """Index the feedback of ``pages`` (responses or decoded pages).
+
+        Returns:
+          Number of items indexed, unchanged items excluded.
+        """
+        self._check_resource(resource)
+        resource_id = str(resource_id)
+        count = 0
+        for page in pages:
+            if not isinstance(page, dict):
+                page = page.json()
+            with self._lock:
+                for item in page.get("data") or ():
+                    if "id" in item:
+                        count += self._add(resource, resource_id, item)
+                if len(self._documents) >= self.flush_every:
+                    self.flush()
+        with self._lock:
+            self.flush()
+        return count
+
+    def _add(self, resource: str, resource_id: str, item: dict) -> bool:
+        key = (resource, resource_id, str(item["id"]))
+        created = item.get("created")
+        if created and created > self._last_created.get(key[:2], ""):
+            self._last_created[key[:2]] = created
+
+        texts = self._texts(item)
+        digest = hashlib.blake2b("\0".join(texts).encode("utf-8"), digest_size=16).hexdigest()
+        previous = self._documents.get(key)
+        if previous is None:
+            row = self._connection.execute(
+                "SELECT doc, digest FROM documents "
+                "WHERE resource = ? AND resource_id = ? AND feedback_id = ?",
+                key,
+            ).fetchone()
+            previous = tuple(row) if row else None
+        if previous is not None:
+            if previous[1] == digest:
+                return False
+            self._replaced.append(previous[0])
+
+        doc = self._next_doc
+        self._next_doc += 1
+        self._documents[key] = (doc, digest)
+        positions: Dict[str, List[int]] = defaultdict(list)
+        position = 0
+        for text in texts:
+            for term in tokenize(text):
+                positions[term].append(position)
+                position += 1
+            # phrases do not span answers
+            position += 1
+        for term, term_positions in positions.items():
+            self._postings[term].append((doc, term_positions))
+        return True
+
+    def flush(self) -> None:
+        """Write the buffered documents and their postings as new segments."""
+        with self._lock:
+            if not self._documents and not self._replaced:
+                return
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO replaced (doc) VALUES (?)",
+                    [(doc,) for doc in self._replaced],
+                )
+                self._connection.executemany(
+                    "INSERT INTO documents (resource, resource_id, feedback_id, doc, digest) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (resource, resource_id, feedback_id) "
+                    "DO UPDATE SET doc = excluded.doc, digest = excluded.digest",
+                    [(*key, doc, digest) for key, (doc, digest) in self._documents.items()],
+                )
+                self._connection.executemany(
+                    "INSERT INTO postings (term, first_doc, documents, data) VALUES (?, ?, ?, ?)",
+                    [
+                        (term, postings[0][0], len(postings), _encode_postings(postings[0][0], postings))
+                        for term, postings in self._postings.items()
+                    ],
+                )
+                self._connection.executemany(
+                    "INSERT INTO sync_state (resource, resource_id, last_created) "
+                    "VALUES (?, ?, ?) ON CONFLICT (resource, resource_id) DO UPDATE SET "
+                    "last_created = max(coalesce(last_created, ''), excluded.last_created)",
+                    [(*key, created) for key, created in self._last_created.items()],
+                )
+            self._documents.clear()
+            self._postings.clear()
+            self._replaced.clear()
+            self._last_created.clear()
+
+    def last_created(self, resource: str, resource_id: Union[str, int]) -> Optional[str]:
+        """Creation date of the newest feedback indexed for the resource."""
+        with self._lock:
+            self.flush()
+            row = self._connection.execute(
+                "SELECT last_created FROM sync_state WHERE resource = ? AND resource_id = ?",
+                (resource, str(resource_id)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def sync(
+        self,
+        client,
+        resource: str,
+        resource_id: Union[str, int],
+        limit: int = 100,
+    ) -> int:
+        """Fetch feedback newer than the last sync and index it.
+
+        Like ``FeedbackMirror.sync``, the days since the newest feedback indexed
+        are requested again, unchanged items are skipped.
+
+        Returns:
+          Number of items indexed.
+        """
+        self._check_resource(resource)
+        last_created = self.last_created(resource, resource_id)
+        query = FeedbackQuery(
+            limit=limit, date_from=last_created[:10] if last_created else None
+        )
+        pages = client.resource(
+            resource,
+            resource_id=resource_id,
+            sub_resource_name="feedback",
+            query_params=query,
+            iterator=True,
+        )
+        return self.ingest(pages, resource, resource_id)
+
+    def _term(self, term: str, replaced: Set[int]) -> Postings:
+        rows = self._connection.execute(
+            "SELECT first_doc, data FROM postings WHERE term = ? ORDER BY first_doc", (term,)
+        )
+        return {
+            doc: positions
+            for first_doc, data in rows
+            for doc, positions in _decode_postings(first_doc, data)
+            if doc not in replaced
+        }
+
+    @staticmethod
+    def _phrase(terms: List[Postings]) -> Set[int]:
+        docs = set(terms[0]).intersection(*terms[1:])
+        matches = set()
+        for doc in docs:
+            following = [set(postings[doc]) for postings in terms[1:]]
+            for start in terms[0][doc]:
+                if all(start + offset in positions for offset, positions in enumerate(following, 1)):
+                    matches.add(doc)
+                    break
+        return matches
+
+    @staticmethod
+    def _parse(query: str) -> List[List[Tuple[bool, List[str]]]]:
+        """Groups separated by OR, of ``(negated, terms)`` clauses."""
+        groups, group = [], []
+        for match in QUERY_TOKEN.finditer(query):
+            negated, phrase, term_negated, term = match.groups()
+            if term == "OR":
+                groups.append(group)
+                group = []
+                continue
+            terms = tokenize(phrase if phrase is not None else term)
+            if terms:
+                group.append((bool(negated or term_negated), terms))
+        groups.append(group)
+        return [group for group in groups if any(not negated for negated, _ in group)]
+
+    def search(
+        self,
+        query: str,
+        resource: Optional[str] = None,
+        resource_id: Optional[Union[str, int]] = None,
+    ) -> List[str]:
+        """Ids of the feedback matching ``query``, in the order they were indexed.
+
+        Args:
+          query (str): Terms, ``"phrases"``, ``-exclusions`` and ``OR``.
+          resource (str): Optional. ``datasets`` or ``reports``.
+          resource_id (str/int): Optional.
+        """
+        if resource is not None:
+            self._check_resource(resource)
+        groups = self._parse(query)
+        if not groups:
+            raise ValueError(f"'{query}' has no term to search.")
+
+        with self._lock:
+            self.flush()
+            replaced = {doc for doc, in self._connection.execute("SELECT doc FROM replaced")}
+            cache: Dict[str, Postings] = {}
+
+            def postings(term: str) -> Postings:
+                if term not in cache:
+                    cache[term] = self._term(term, replaced)
+                return cache[term]
+
+            docs: Set[int] = set()
+            for group in groups:
+                included, excluded = None, set()
+                for negated, terms in group:
+                    if len(terms) == 1:
+                        matches = set(postings(terms[0]))
+                    else:
+                        matches = self._phrase([postings(term) for term in terms])
+                    if negated:
+                        excluded |= matches
+                    else:
+                        included = matches if included is None else included & matches
+                docs |= included - excluded
+
+            conditions, params = ["doc IN (SELECT value FROM json_each(?))"], [str(sorted(docs))]
+            if resource is not None:
+                conditions.append("resource = ?")
+                params.append(resource)
+            if resource_id is not None:
+                conditions.append("resource_id = ?")
+                params.append(str(resource_id))
+            rows = self._connection.execute(
+                f"SELECT feedback_id FROM documents WHERE {' AND '.join(conditions)} ORDER BY doc",
+                params,
+            ).fetchall()
+        return [feedback_id for feedback_id, in rows]
+
+    def optimize(self) -> None:
+        """Merge the segments of every term and drop replaced documents."""
+        with self._lock:
+            self.flush()
+            replaced = {doc for doc, in self._connection.execute("SELECT doc FROM replaced")}
+            terms = [
+                term
+                for term, in self._connection.execute(
+                    "SELECT term FROM postings GROUP BY term HAVING count(*) > 1 OR ?",
+                    (bool(replaced),),
+                )
+            ]
+            with self._connection:
+                for term in terms:
+                    postings = sorted(self._term(term, replaced).items())
+                    self._connection.execute("DELETE FROM postings WHERE term = ?", (term,))
+                    if postings:
+                        first_doc = postings[0][0]
+                        self._connection.execute(
+                            "INSERT INTO postings (term, first_doc, documents, data) VALUES (?, ?, ?, ?)",
+                            (term, first_doc, len(postings), _encode_postings(first_doc, postings)),
+                        )
+                self._connection.execute("DELETE FROM replaced")
+            self._connection.execute("VACUUM")
@@ -3,8 +3,16 @@ BASE_URL = "https://api.mopinion.com"
 TOKEN_PATH = "/token"
 LATEST_VERSION = "2.0.0"
 
+# Content encodings by preference, only those with an installed decoder are offered
+ACCEPT_ENCODINGS = ["zstd", "br", "gzip", "deflate"]
+
 # Some settings for dataclasses
 VERBOSITY_LEVELS = ["quiet", "normal", "full"]
 ITERATE_VERBOSITY_LEVELS = ["normal", "full"]
 VERSIONS = ["1.18.14", "2.0.0", "2.1.0", "2.2.0"]
 CONTENT_NEGOTIATIONS = ["application/json", "application/x-yaml"]
+
+# Query parameters
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 1000
+DATE_FORMAT = "%Y-%m-%d"
@@ -0,0 +1,228 @@
+"""
+State shared by the processes of a host: signature tokens and a rate limit.
+
+Pre-fork servers run one ``MopinionClient`` per worker. With a ``SharedTokenStore``
+the first worker fetches the signature token and the others read it, and with
+a ``SharedRateLimiter`` all workers draw from a single token bucket, so together
+they stay within the API quota.
+
+The state lives in small JSON files, read and written under an exclusive file
+lock (``fcntl`` on Unix, ``msvcrt`` on Windows) held on a separate ``.lock`` file.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.shared import SharedRateLimiter, SharedTokenStore
+  >>> client = MopinionClient(
+  ...     PUBLICKEY,
+  ...     PRIVATEKEY,
+  ...     token_store=SharedTokenStore("/tmp/mopinion-tokens.json"),
+  ...     rate_limiter=SharedRateLimiter("/tmp/mopinion-rate.json", rate=10, burst=20),
+  ... )
+"""
+from contextlib import contextmanager
+from typing import Callable
+from typing import Iterator
+from typing import Optional
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+    import msvcrt
+
+
+__all__ = ["FileLock", "SharedRateLimiter", "SharedState", "SharedTokenStore"]
+
+
+class FileLock:
+    """Exclusive lock across processes, and across the threads of a process.
+
+    The lock file is opened on every acquisition, so the lock is fork-safe.
+
+    Args:
+      path (str): Lock file, created if missing.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def acquire(self) -> int:
+        self._lock.acquire()
+        try:
+            descriptor = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if fcntl is not None:
+                fcntl.flock(descriptor, fcntl.LOCK_EX)
+            else:  # pragma: no cover
+                while True:
+                    try:
+                        msvcrt.locking(descriptor, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+        except BaseException:
+            self._lock.release()
+            raise
+        return descriptor
+
+    def release(self, descriptor: int) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(descriptor, fcntl.LOCK_UN)
+            else:  # pragma: no cover
+                msvcrt.locking(descriptor, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(descriptor)
+            self._lock.release()
+
+    def __enter__(self):
+        self._descriptor = self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release(self._descriptor)
+
+
+class SharedState:
+    """JSON document updated under a ``FileLock``.
+
+    Args:
+      path (str): State file. The lock file is ``path`` + ``.lock``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = FileLock(f"{path}.lock")
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, state: dict) -> None:
+        # replaced atomically: readers never see a partial document
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(temporary, self.path)
+
+    @contextmanager
+    def transaction(self) -> Iterator[dict]:
+        """Lock the state and yield it; changes are written back on success."""
+        with self.lock:
+            state = self._read()
+            before = json.dumps(state, sort_keys=True)
+            yield state
+            if json.dumps(state, sort_keys=True) != before:
+                self._write(state)
+
+
+class SharedTokenStore:
+    """Signature tokens shared by the processes of a host.
+
+    Tokens are stored per credentials and base url, keyed by a hash; the private
+    key is never stored, and a rotated private key gets a token of its own. The
+    file is only readable by its owner.
+
+    Args:
+      path (str): Token file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.state = SharedState(path)
+
+    @staticmethod
+    def key(public_key: str, base_url: str, private_key: str) -> str:
+        private_digest = hashlib.sha256(private_key.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{base_url}|{public_key}|{private_digest}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.state.transaction() as tokens:
+            return tokens.get(key)
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], str]) -> str:
+        """Token stored under ``key``, fetched and stored first if missing.
+
+        The lock is held while fetching, so concurrent processes wait for the
+        first one instead of fetching tokens of their own.
+        """
+        with self.state.transaction() as tokens:
+            if key not in tokens:
+                tokens[key] = fetch()
+            return tokens[key]
+
+    def invalidate(self, key: str, token: Optional[str] = None) -> None:
+        """Forget the token under ``key``, e.g. after it was revoked.
+
+        Args:
+          key (str):
+          token (str): Optional. Only forget this token, not one another process
+            has fetched since.
+        """
+        with self.state.transaction() as tokens:
+            if token is None or tokens.get(key) == token:
+                tokens.pop(key, None)
+
+
+class SharedRateLimiter:
+    """Token bucket shared by the processes of a host.
+
+    Args:
+      path (str): State file.
+      rate (float): Requests per second.
+      burst (int): Requests allowed at once after an idle period. Defaults to ``rate``.
+    """
+
+    def __init__(self, path: str, rate: float, burst: int = None) -> None:
+        if rate <= 0:
+            raise ValueError(f"'{rate}' is not a valid rate.")
+        self.state = SharedState(path)
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+
+    def try_acquire(self) -> float:
+        """Take a token if available.
+
+        Returns:
+          0 when a token was taken, else the seconds until the next one.
+        """
+        now = time.time()
+        with self.state.transaction() as bucket:
+            tokens = bucket.get("tokens", self.burst)
+            updated = bucket.get("updated", now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+            if tokens >= 1:
+                bucket["tokens"], bucket["updated"] = tokens - 1, now
+                return 0.0
+            bucket["tokens"], bucket["updated"] = tokens, now
+            return (1 - tokens) / self.rate
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Wait for a token.
+
+        Args:
+          timeout (float): Seconds to wait at most. Optional.
+
+        Returns:
+          False if ``timeout`` expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
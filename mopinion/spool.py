@@ -0,0 +1,153 @@
+"""
+On-disk spool of pages, for re-reading large exports without refetching.
+
+Page bodies are appended to a data file and their offsets to an index file of
+fixed-size records. The data file is read back through ``mmap``, so pages are
+read on demand by the operating system: consumers can iterate, jump to page N
+or scan again without API calls and without keeping the pages in memory.
+
+A spool is reopened by creating a ``PageSpool`` on the same path. A page is
+only indexed once its body has been written, so a spool interrupted while
+writing is still valid up to its last complete page, and so is a spool whose
+index was written further than its data.
+
+Examples:
+  >>> from mopinion.spool import PageSpool
+  >>> with PageSpool("report-123.spool") as spool:
+  ...     for page in client.get_reports_feedback(report_id=123, iterator=True, spool=spool):
+  ...         validate(page)
+  ...     load(spool[0]["data"])
+  ...     for page in spool:  # again, without API calls
+  ...         transform(page)
+"""
+from requests.models import Response
+from typing import Iterable
+from typing import Iterator
+from typing import Union
+
+import json
+import mmap
+import os
+import struct
+import threading
+
+
+__all__ = ["PageSpool"]
+
+
+# offset and length of a page in the data file
+INDEX_RECORD = struct.Struct("<QQ")
+
+
+class PageSpool:
+    """Append-only spool of pages with an offset index.
+
+    Args:
+      path (str): Data file. The index is ``path`` + ``.idx``.
+      truncate (bool): Start a new spool, dropping the pages of an existing one.
+        Defaults to False.
+    """
+
+    def __init__(self, path: str, truncate: bool = False) -> None:
+        self.path = path
+        self.index_path = f"{path}.idx"
+        mode = "w+b" if truncate else "a+b"
+        self._data = open(path, mode)
+        self._index = open(self.index_path, mode)
+        self._lock = threading.Lock()
+        self._map = None
+
+        self._index.seek(0)
+        content = self._index.read()
+        # ignore a record cut by an interrupted write
+        complete = len(content) - len(content) % INDEX_RECORD.size
+        # and the records of pages whose body did not reach the data file,
+        # e.g. after a crash before the operating system wrote it
+        data_size = os.fstat(self._data.fileno()).st_size
+        self._offsets = []
+        for offset, length in INDEX_RECORD.iter_unpack(content[:complete]):
+            if offset + length > data_size:
+                break
+            self._offsets.append((offset, length))
+        self._size = sum(self._offsets[-1]) if self._offsets else 0
+        # drop the bytes of a page that was not indexed
+        self._data.truncate(self._size)
+        self._index.truncate(len(self._offsets) * INDEX_RECORD.size)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def append(self, page: Union[Response, bytes]) -> int:
+        """Append a page, a response or its body.
+
+        Returns:
+          Number of the page, from 0.
+        """
+        body = page if isinstance(page, (bytes, bytearray, memoryview)) else page.content
+        with self._lock:
+            offset = self._size
+            self._data.write(body)
+            self._data.flush()
+            self._index.write(INDEX_RECORD.pack(offset, len(body)))
+            self._index.flush()
+            self._offsets.append((offset, len(body)))
+            self._size = offset + len(body)
+            return len(self._offsets) - 1
+
+    def extend(self, pages: Iterable[Union[Response, bytes]]) -> int:
+        """Append ``pages``, returning how many were appended."""
+        count = 0
+        for page in pages:
+            self.append(page)
+            count += 1
+        return count
+
+    def _mapped(self) -> mmap.mmap:
+        # pages appended since the last mapping need a larger map
+        if self._map is None or len(self._map) < self._size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._data.fileno(), self._size, access=mmap.ACCESS_READ)
+        return self._map
+
+    def raw(self, number: int) -> bytes:
+        """Body of page ``number``, negative numbers count from the end."""
+        with self._lock:
+            offset, length = self._offsets[number]
+            if not length:
+                return b""
+            return self._mapped()[offset : offset + length]
+
+    def __getitem__(self, number: int) -> dict:
+        """Decoded page ``number``."""
+        return json.loads(self.raw(number))
+
+    def iter_raw(self, start: int = 0) -> Iterator[bytes]:
+        """Yield the bodies of the pages, from page ``start``."""
+        for number in range(start, len(self)):
+            yield self.raw(number)
+
+    def __iter__(self) -> Iterator[dict]:
+        for body in self.iter_raw():
+            yield json.loads(body)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._data.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def remove(self) -> None:
+        """Close the spool and delete its files."""
+        self.close()
+        for path in (self.path, self.index_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,52 @@
+"""
+Statistics collected by the client.
+"""
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Dict
+
+import threading
+
+
+__all__ = ["ClientStats"]
+
+
+@dataclass
+class ClientStats:
+    """Counters of the responses received by a client.
+
+    ``bytes_received`` are the bytes read from the network, compressed when the
+    server applied a ``Content-Encoding``. ``bytes_decoded`` are the bytes of the
+    bodies after decompression.
+    """
+
+    requests: int = 0
+    bytes_received: int = 0
+    bytes_decoded: int = 0
+    encodings: Dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def record_response(self, encoding: str, received: int, decoded: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += received
+            self.bytes_decoded += decoded
+            self.encodings[encoding] = self.encodings.get(encoding, 0) + 1
+
+    @property
+    def compression_ratio(self) -> float:
+        """Decoded bytes per received byte, 1.0 when nothing was compressed."""
+        if not self.bytes_received:
+            return 1.0
+        return self.bytes_decoded / self.bytes_received
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_decoded - self.bytes_received
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = self.bytes_received = self.bytes_decoded = 0
+            self.encodings = {}
@@ -1,5 +1,7 @@
 from requests.exceptions import RequestException
 
+import json
+
 
 class MockedResponse:
     def __init__(
@@ -15,6 +17,10 @@ class MockedResponse:
     def json(self) -> dict:
         return self.json_data
 
+    @property
+    def text(self) -> str:
+        return json.dumps(self.json_data)
+
     def raise_for_status(self):
         if self.raise_error:
             raise RequestException
@@ -0,0 +1,187 @@
+"""
+Stand-in for the Mopinion API, serving synthetic data on a local port.
+
+Used by the tests of the transports and by the benchmarks. It does not check
+the authentication headers.
+
+Examples:
+  >>> with StandInServer(total=1000) as server:
+  ...     client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=server.url)
+  ...     pages = list(client.get_datasets_feedback(dataset_id=1, iterator=True))
+"""
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import gzip
+import json
+import re
+import threading
+import time
+import urllib.parse
+
+
+FEEDBACK_PATH = re.compile(r"^/(datasets|reports)/(\d+)/feedback$")
+FIELDS_PATH = re.compile(r"^/(datasets|reports)/(\d+)/fields$")
+
+DEPLOYMENTS = [{"key": "web", "name": "Website"}, {"key": "app", "name": "App"}]
+REPORTS = [{"id": 1, "name": "Website"}, {"id": 2, "name": "App"}]
+# two datasets per report
+DATASETS = [
+    {"id": report["id"] * 10 + n, "name": f"Form {n}", "report_id": report["id"]}
+    for report in REPORTS
+    for n in (1, 2)
+]
+
+FIELDS = [
+    {"key": "nps", "label": "How likely are you to recommend us?", "type": "nps"},
+    {"key": "ces", "label": "How easy was it?", "type": "ces"},
+    {"key": "rating", "label": "Rate this page", "type": "rating"},
+    {"key": "comment", "label": "Any comments?", "type": "textarea"},
+]
+
+
+def feedback_item(feedback_id: int, dataset_id: int) -> dict:
+    day = 1 + feedback_id % 28
+    return {
+        "id": feedback_id,
+        "created": f"2023-01-{day:02d} {feedback_id % 24:02d}:00:00",
+        "dataset_id": dataset_id,
+        "report_id": 1,
+        "tags": ["web"] if feedback_id % 2 else ["app"],
+        "fields": [
+            {"key": "nps", "label": FIELDS[0]["label"], "value": feedback_id % 11},
+            {"key": "ces", "label": FIELDS[1]["label"], "value": 1 + feedback_id % 7},
+            {"key": "rating", "label": FIELDS[2]["label"], "value": 1 + feedback_id % 5},
+            {
+                "key": "comment",
+                "label": FIELDS[3]["label"],
+                "value": f"Feedback number {feedback_id}, the website works fine",
+            },
+        ],
+    }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        url = urllib.parse.urlparse(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        with server.lock:
+            server.requests.append(self.path)
+
+        feedback = FEEDBACK_PATH.match(url.path)
+        fields = FIELDS_PATH.match(url.path)
+        if url.path == "/token":
+            body = {"token": "stand-in-token"}
+        elif url.path == "/ping":
+            body = {"code": 200, "response": "pong", "version": "2.0.0"}
+        elif url.path == "/account":
+            body = {"_meta": {"code": 200}, "name": "Stand-in account"}
+        elif url.path == "/deployments":
+            body = {"_meta": {"code": 200, "has_more": False}, "data": DEPLOYMENTS}
+        elif url.path == "/reports":
+            body = {"_meta": {"code": 200, "has_more": False}, "data": REPORTS}
+        elif url.path == "/datasets":
+            body = {"_meta": {"code": 200, "has_more": False}, "data": DATASETS}
+        elif fields:
+            body = {"_meta": {"code": 200, "has_more": False}, "data": FIELDS}
+        elif feedback:
+            body = self.feedback_page(url.path, int(feedback.group(2)), query)
+        else:
+            self.send_json(404, {"_meta": {"code": 404, "message": "Not found"}})
+            return
+        self.send_json(200, body)
+
+    def feedback_page(self, path: str, resource_id: int, query: dict) -> dict:
+        total = self.server.total
+        limit = int(query.get("limit", 10))
+        page = int(query.get("page", 1))
+        start = (page - 1) * limit
+        ids = range(total - start, max(total - start - limit, 0), -1)
+        has_more = start + limit < total
+        return {
+            "_meta": {
+                "code": 200,
+                "total": total,
+                "count": len(ids),
+                "has_more": has_more,
+                "previous": f"{path}?limit={limit}&page={page - 1}" if page > 1 else False,
+                "next": f"{path}?limit={limit}&page={page + 1}" if has_more else False,
+            },
+            "data": [feedback_item(feedback_id, resource_id) for feedback_id in ids],
+        }
+
+    def send_json(self, status: int, body: dict):
+        content = json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            content = gzip.compress(content, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        headers["Content-Length"] = str(len(content))
+
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class StandInServer:
+    """Run the stand-in API in a background thread.
+
+    Args:
+      total (int): Number of feedback items of every dataset and report. Defaults to 100.
+      latency (float): Seconds to wait before answering each request. Defaults to 0.
+    """
+
+    def __init__(self, total: int = 100, latency: float = 0.0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.total = total
+        self.httpd.latency = latency
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = []
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> list:
+        return self.httpd.requests
+
+    @property
+    def total(self) -> int:
+        return self.httpd.total
+
+    @total.setter
+    def total(self, total: int) -> None:
+        # new feedback gets the highest ids
+        self.httpd.total = total
+
+    def start(self) -> "StandInServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
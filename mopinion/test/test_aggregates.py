@@ -0,0 +1,146 @@
+from mopinion.aggregates import FeedbackAggregates
+from mopinion.aggregates import Histogram
+from mopinion.aggregates import HyperLogLog
+from mopinion.aggregates import QuantileSketch
+from mopinion.aggregates import Sum
+from .mocks import MockedResponse
+from .mocks.server import feedback_item
+
+import json
+import os
+import random
+import tempfile
+import unittest
+
+
+class AggregatesTest(unittest.TestCase):
+    def shards(self, cls, values, *args):
+        whole, left, right = cls(*args), cls(*args), cls(*args)
+        for index, value in enumerate(values):
+            whole.update(value)
+            (left if index % 3 else right).update(value)
+        merged = cls.from_dict(json.loads(json.dumps(left.to_dict())))
+        return whole, merged.merge(cls.from_dict(right.to_dict()))
+
+    def test_sum(self):
+        whole, merged = self.shards(Sum, [3, -1, 4, 1, 5, 9, 2, 6])
+        self.assertEqual(merged.to_dict(), whole.to_dict())
+        self.assertEqual((merged.minimum, merged.maximum, merged.count), (-1, 9, 8))
+        self.assertEqual(merged.mean, 29 / 8)
+        self.assertIsNone(Sum().mean)
+
+    def test_histogram(self):
+        whole, merged = self.shards(Histogram, [i % 11 for i in range(100)])
+        self.assertEqual(merged.counts, whole.counts)
+        self.assertEqual(merged.count, 100)
+
+    def test_quantile_sketch(self):
+        values = [random.lognormvariate(0, 2) for _ in range(5000)] + [0.0, -2.5]
+        whole, merged = self.shards(QuantileSketch, values, 0.01)
+        self.assertEqual(merged.to_dict(), whole.to_dict())
+        ordered = sorted(values)
+        for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+            exact = ordered[int(q * (len(values) - 1))]
+            self.assertLessEqual(abs(merged.quantile(q) - exact), 0.01 * abs(exact) + 1e-9)
+        self.assertAlmostEqual(merged.quantile(0), -2.5, delta=0.025)
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+        with self.assertRaises(ValueError):
+            QuantileSketch(0.01).merge(QuantileSketch(0.02))
+        with self.assertRaises(ValueError):
+            QuantileSketch().quantile(1.5)
+
+    def test_hyperloglog(self):
+        whole, merged = self.shards(HyperLogLog, [i % 20000 for i in range(30000)], 12)
+        self.assertEqual(merged.registers, whole.registers)
+        self.assertAlmostEqual(merged.estimate(), 20000, delta=20000 * 0.05)
+
+        small = HyperLogLog()
+        for value in ["a", "b", "c", "a"]:
+            small.update(value)
+        self.assertEqual(len(small), 3)
+
+        with self.assertRaises(ValueError):
+            HyperLogLog(12).merge(HyperLogLog(10))
+        with self.assertRaises(ValueError):
+            HyperLogLog(12).merge(Sum())
+
+
+class FeedbackAggregatesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.items = [feedback_item(feedback_id, dataset_id=1) for feedback_id in range(1, 301)]
+
+    def test_incremental_and_sharded(self):
+        whole = FeedbackAggregates()
+        self.assertEqual(whole.update_pages([MockedResponse({"data": self.items})]), 300)
+
+        day_one = FeedbackAggregates()
+        day_one.update_pages([{"data": self.items[:100]}])
+        day_two = FeedbackAggregates()
+        day_two.update_pages([{"data": self.items[100:200]}, {"data": self.items[200:]}])
+        merged = day_one.merge(day_two)
+
+        self.assertEqual(merged.to_dict(), whole.to_dict())
+        self.assertEqual(merged.count, 300)
+        self.assertAlmostEqual(len(merged.ids), 300, delta=10)
+        self.assertEqual(merged.last_created, max(item["created"] for item in self.items))
+        nps = merged.fields["nps"]
+        self.assertEqual(nps.histogram.count, 300)
+        self.assertEqual(nps.sum.maximum, 10)
+
+    def test_refetched_last_day(self):
+        # newest first, like the API
+        items = sorted(self.items, key=lambda item: item["created"], reverse=True)
+        whole = FeedbackAggregates()
+        whole.update_pages([{"data": items}])
+
+        # the first run stops in the middle of a day
+        cutoff = "2023-01-15 12:00:00"
+        first = FeedbackAggregates()
+        first.update_pages([{"data": [item for item in items if item["created"] <= cutoff]}])
+        self.assertEqual(first.last_created[:10], "2023-01-15")
+
+        # the next one fetches from the start of that day
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "aggregates.json")
+            first.dump(path)
+            second = FeedbackAggregates.load(path)
+        date_from = second.last_created[:10]
+        refetched = [item for item in items if item["created"][:10] >= date_from]
+        folded = second.update_pages([{"data": refetched}])
+
+        self.assertEqual(folded, sum(1 for item in items if item["created"] > cutoff))
+        self.assertEqual(second.count, 300)
+        self.assertEqual(second.fields["nps"].histogram.count, 300)
+        self.assertEqual(second.to_dict(), whole.to_dict())
+
+        # a run without new feedback changes nothing
+        date_from = second.last_created[:10]
+        refetched = [item for item in items if item["created"][:10] >= date_from]
+        self.assertEqual(second.update_pages([{"data": refetched}]), 0)
+        self.assertEqual(second.to_dict(), whole.to_dict())
+
+    def test_dump_load(self):
+        aggregates = FeedbackAggregates(fields=("nps", "comment"))
+        aggregates.update_pages([{"data": self.items}])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "aggregates.json")
+            self.assertEqual(FeedbackAggregates.load(path, fields=("ces",)).fields.keys(), {"ces"})
+            aggregates.dump(path)
+            loaded = FeedbackAggregates.load(path)
+            self.assertEqual(os.listdir(directory), ["aggregates.json"])
+        self.assertEqual(loaded.to_dict(), aggregates.to_dict())
+        # comments are not numeric
+        self.assertEqual(loaded.fields["comment"].sum.count, 0)
+
+    def test_merge_new_fields(self):
+        left = FeedbackAggregates(fields=("nps",))
+        right = FeedbackAggregates(fields=("ces",))
+        right.update(self.items[0])
+        left.merge(right)
+        self.assertEqual(set(left.fields), {"nps", "ces"})
+        self.assertEqual(left.fields["ces"].sum.count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+from mopinion.analytics import aggregate_reference
+from mopinion.analytics import ScoreAggregator
+from mopinion.analytics import Summary
+from .mocks import MockedResponse
+from .mocks.server import feedback_item
+
+import unittest
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+FIELDS = {"nps": "nps", "ces": "ces", "rating": "csat"}
+
+ITEMS = [feedback_item(feedback_id, dataset_id=1 + feedback_id % 3) for feedback_id in range(1, 501)]
+
+
+class ReferenceTest(unittest.TestCase):
+    def test_nps(self):
+        items = [
+            {"fields": [{"key": "nps", "value": value}]}
+            for value in (10, 9, 8, 7, 6, 0, "10", None)
+        ]
+        result = aggregate_reference(items, fields={"nps": "nps"})
+        summary = result[None]["nps"]
+        self.assertEqual(summary.count, 7)
+        # 3 promoters, 2 detractors
+        self.assertAlmostEqual(summary.score, 100 * (3 - 2) / 7)
+        self.assertEqual(summary.distribution, {0.0: 1, 6.0: 1, 7.0: 1, 8.0: 1, 9.0: 1, 10.0: 2})
+
+    def test_csat_by_tag(self):
+        items = [
+            {"tags": ["a", "b"], "fields": [{"key": "rating", "value": 5}]},
+            {"tags": ["a"], "fields": [{"key": "rating", "value": 2}]},
+        ]
+        result = aggregate_reference(items, fields={"rating": "csat"}, group_by="tag")
+        self.assertEqual(result["a"]["rating"].score, 50)
+        self.assertEqual(result["b"]["rating"], Summary(1, 5.0, 100.0, {5.0: 1}))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            aggregate_reference([], fields={"nps": "median"})
+        with self.assertRaises(ValueError):
+            aggregate_reference([], group_by="week")
+
+
+@unittest.skipIf(numpy is None, "requires numpy")
+class ScoreAggregatorTest(unittest.TestCase):
+    def assertMatchesReference(self, result, reference):
+        self.assertEqual(result.keys(), reference.keys())
+        for group, summaries in reference.items():
+            self.assertEqual(result[group].keys(), summaries.keys())
+            for key, summary in summaries.items():
+                other = result[group][key]
+                self.assertEqual(other.count, summary.count)
+                self.assertAlmostEqual(other.mean, summary.mean)
+                self.assertAlmostEqual(other.score, summary.score)
+                self.assertEqual(other.distribution, summary.distribution)
+
+    def test_matches_reference(self):
+        for group_by in (None, "dataset", "report", "day", "tag"):
+            with self.subTest(group_by=group_by):
+                aggregator = ScoreAggregator(FIELDS, group_by=group_by, batch_size=64)
+                aggregator.update(ITEMS)
+                self.assertEqual(aggregator.items, len(ITEMS))
+                self.assertMatchesReference(
+                    aggregator.result(), aggregate_reference(ITEMS, FIELDS, group_by)
+                )
+
+    def test_update_pages(self):
+        pages = [MockedResponse({"data": ITEMS[:250]}), {"data": ITEMS[250:]}]
+        aggregator = ScoreAggregator(FIELDS, group_by="dataset")
+        aggregator.update_pages(pages)
+        self.assertMatchesReference(
+            aggregator.result(), aggregate_reference(ITEMS, FIELDS, "dataset")
+        )
+
+    def test_incremental(self):
+        aggregator = ScoreAggregator(FIELDS, group_by="day", batch_size=1000)
+        aggregator.update(ITEMS[:100])
+        aggregator.result()
+        aggregator.update(ITEMS[100:])
+        self.assertMatchesReference(aggregator.result(), aggregate_reference(ITEMS, FIELDS, "day"))
+
+    def test_columns_grow(self):
+        # items counting in several tags overflow the preallocated columns
+        items = [{**item, "tags": ["a", "b", "c"]} for item in ITEMS]
+        aggregator = ScoreAggregator(FIELDS, group_by="tag", batch_size=100)
+        aggregator.update(items[:100])
+        self.assertGreaterEqual(len(aggregator._batch["nps"].codes), 300)
+        aggregator.update(items[100:])
+        self.assertMatchesReference(aggregator.result(), aggregate_reference(items, FIELDS, "tag"))
+
+    def test_empty(self):
+        self.assertEqual(ScoreAggregator().result(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
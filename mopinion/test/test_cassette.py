@@ -0,0 +1,76 @@
+from mopinion import MopinionClient
+from mopinion.cassette import RecordingTransport
+from mopinion.cassette import REDACTED_TOKEN
+from mopinion.cassette import ReplayTransport
+from mopinion.exceptions import CassetteMiss
+from mopinion.transports import RequestsTransport
+from .mocks.server import StandInServer
+
+import gzip
+import os
+import tempfile
+import time
+import unittest
+
+
+class CassetteTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cassette.jsonl.gz")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def record(self, latency=0.0):
+        with StandInServer(total=25, latency=latency) as server:
+            transport = RecordingTransport(RequestsTransport(base_url=server.url), self.path)
+            with MopinionClient(
+                "PUBLIC_KEY", "PRIVATE_KEY", transport=transport, base_url=server.url
+            ) as client:
+                pages = client.get_datasets_feedback(
+                    dataset_id=1, query_params={"limit": 10}, iterator=True
+                )
+                return [page.json() for page in pages]
+
+    def test_record_and_replay(self):
+        recorded = self.record()
+
+        replay = ReplayTransport(self.path)
+        self.assertEqual(len(replay), 4)  # token and three pages
+        client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", transport=replay)
+        self.assertEqual(client.signature_token, REDACTED_TOKEN)
+        pages = client.get_datasets_feedback(
+            dataset_id=1, query_params={"limit": 10}, iterator=True
+        )
+        self.assertEqual([page.json() for page in pages], recorded)
+        self.assertEqual(client.stats.requests, 3)
+
+        with self.assertRaises(CassetteMiss):
+            client.get_datasets_feedback(dataset_id=2)
+
+    def test_credentials_not_recorded(self):
+        self.record()
+        with gzip.open(self.path, "rt", encoding="utf-8") as cassette:
+            content = cassette.read()
+        self.assertNotIn("X-Auth-Token", content)
+        self.assertNotIn("Authorization", content)
+
+    def test_token_not_recorded(self):
+        self.record()
+        with gzip.open(self.path, "rt", encoding="utf-8") as cassette:
+            content = cassette.read()
+        self.assertNotIn("stand-in-token", content)
+        self.assertIn(REDACTED_TOKEN, content)
+
+    def test_replay_timing(self):
+        self.record(latency=0.05)
+        client = MopinionClient(
+            "PUBLIC_KEY", "PRIVATE_KEY", transport=ReplayTransport(self.path, timing=True)
+        )
+        start = time.monotonic()
+        client.get_datasets_feedback(dataset_id=1, query_params={"limit": 10})
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+from contextlib import redirect_stderr
+from contextlib import redirect_stdout
+from mopinion.cli import main
+from mopinion.cli import Progress
+from mopinion.mirror import FeedbackMirror
+from .mocks.server import StandInServer
+
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class CommandLineTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = StandInServer(total=45).start()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def main(self, *argv):
+        command, *rest = argv
+        credentials = ["--public-key", "PUBLIC", "--private-key", "PRIVATE"]
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            code = main([command, *credentials, "--base-url", self.server.url, *rest])
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def test_export_jsonl(self):
+        output = self.path("feedback.jsonl.gz")
+        code, _, _ = self.main("export", "datasets", "1", "2", "-o", output, "--concurrency", "2")
+        self.assertEqual(code, 0)
+        with gzip.open(output, "rt") as file:
+            items = [json.loads(line) for line in file]
+        self.assertEqual(len(items), 90)
+        self.assertEqual(sorted(item["id"] for item in items if item["dataset_id"] == 2), list(range(1, 46)))
+        self.assertFalse(os.path.exists(f"{output}.state"))
+        # the page size was tuned
+        self.assertTrue(any("limit=20" in path for path in self.server.requests))
+
+    def test_export_csv(self):
+        output = self.path("feedback.csv")
+        code, _, _ = self.main("export", "reports", "1", "-o", output, "--format", "csv", "--page-size", "50")
+        self.assertEqual(code, 0)
+        with open(output, newline="") as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), 45)
+        self.assertEqual(rows[0]["id"], "45")
+        self.assertEqual(rows[0]["nps"], "1")
+        self.assertEqual(rows[0]["created"], "2023-01-18 21:00:00")
+        self.assertEqual(rows[0]["tags"], "web")
+
+    def test_export_raw(self):
+        output = self.path("pages.jsonl")
+        code, _, _ = self.main("export", "datasets", "1", "-o", output, "--format", "raw", "--page-size", "20")
+        self.assertEqual(code, 0)
+        with open(output) as file:
+            pages = [json.loads(line) for line in file]
+        self.assertEqual([len(page["data"]) for page in pages], [20, 20, 5])
+
+    def test_export_resume(self):
+        output = self.path("feedback.jsonl")
+        with open(output, "w") as file:
+            file.write('{"id": 45}\n')
+        with open(f"{output}.state", "w") as file:
+            json.dump(
+                {
+                    "datasets/1": {"query_params": {"limit": "10", "page": "4"}, "done": False},
+                    "datasets/2": {"query_params": None, "done": True},
+                },
+                file,
+            )
+        code, _, _ = self.main("export", "datasets", "1", "2", "-o", output, "--resume")
+        self.assertEqual(code, 0)
+        with open(output) as file:
+            ids = [json.loads(line)["id"] for line in file]
+        self.assertEqual(ids, [45] + list(range(15, 0, -1)))
+
+    def test_crawl(self):
+        output = self.path("account.json")
+        code, _, _ = self.main("crawl", "-o", output)
+        self.assertEqual(code, 0)
+        with open(output) as file:
+            account = json.load(file)
+        self.assertEqual(len(account["datasets"]), 4)
+        self.assertEqual(account["fields"]["datasets/11"][0]["key"], "nps")
+
+        code, stdout, _ = self.main("crawl", "--no-fields")
+        self.assertEqual(json.loads(stdout)["fields"], {})
+
+    def test_sync(self):
+        database = self.path("feedback.db")
+        code, stdout, _ = self.main("sync", "datasets", "1", "2", "--database", database)
+        self.assertEqual(code, 0)
+        self.assertEqual(stdout.splitlines(), ["datasets/1: 45 items", "datasets/2: 45 items"])
+        with FeedbackMirror(database) as mirror:
+            self.assertEqual(mirror.count("datasets"), 90)
+
+    def test_trace(self):
+        trace, har = self.path("run.trace"), self.path("run.har")
+        code, _, _ = self.main("sync", "datasets", "1", "--database", self.path("feedback.db"), "--trace", trace)
+        self.assertEqual(code, 0)
+
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            self.assertEqual(main(["trace", trace, "--top", "3", "--har", har]), 0)
+        self.assertIn("datasets/feedback", stdout.getvalue())
+        with open(har) as file:
+            self.assertEqual(len(json.load(file)["log"]["entries"]), 1)
+
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            main(["trace", trace, "--json"])
+        self.assertEqual(json.loads(stdout.getvalue())["requests"], 1)
+
+    def test_errors(self):
+        stderr = io.StringIO()
+        with redirect_stderr(stderr), self.assertRaises(SystemExit):
+            main(["export", "datasets", "1", "-o", "-", "--resume"])
+        self.assertIn("--resume needs an --output file", stderr.getvalue())
+
+        code, _, stderr = self.main("export", "datasets", "1", "-o", self.path("missing/out.jsonl"))
+        self.assertEqual(code, 1)
+        self.assertIn("mopinion: error:", stderr)
+
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(main([]), 2)
+
+    def test_progress(self):
+        stream = io.StringIO()
+        progress = Progress(stream, enabled=True, interval=0)
+        progress.update(items=10)
+        progress.update(items=5)
+        progress.close()
+        self.assertIn("2 pages, 15 items", stream.getvalue())
+        self.assertTrue(stream.getvalue().endswith("items/s)\n"))
+        self.assertFalse(Progress(io.StringIO()).enabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,6 @@
+import socket
+import threading
+import time
 import types
 import unittest
 
@@ -6,9 +9,14 @@ from mock import patch
 from requests import Session
 from requests.exceptions import RequestException
 
+from mopinion import hedging
 from mopinion import MopinionClient
 from mopinion.dataclasses import EndPoint
+from mopinion.dataclasses import FeedbackQuery
+from mopinion.exceptions import DeadlineExceeded
+from mopinion.transports import Urllib3Transport
 from .mocks import MockedResponse
+from .mocks.server import StandInServer
 
 
 class APITest(unittest.TestCase):
@@ -28,6 +36,47 @@ class APITest(unittest.TestCase):
         self.assertEqual(len(client.session.adapters), 3)
         self.assertEqual(client.signature_token, "token")
 
+    @patch("requests.sessions.Session.request")
+    def test_session_rebuilt_after_fork(self, mocked_response):
+        mocked_response.return_value = MockedResponse({"token": "token"})
+        client = MopinionClient(self.public_key, self.private_key)
+        parent_session = client.session
+        self.assertIs(parent_session, client.session)
+
+        with patch("mopinion.transports.os.getpid", return_value=-1):
+            child_session = client.session
+            self.assertIsNot(parent_session, child_session)
+            self.assertIs(child_session, client.session)
+            self.assertEqual(len(child_session.adapters), 3)
+
+        # the signature token is kept, no extra call to /token
+        self.assertEqual(client.signature_token, "token")
+        self.assertEqual(1, mocked_response.call_count)
+
+    @patch("requests.sessions.Session.request")
+    def test_thread_local_sessions(self, mocked_response):
+        mocked_response.return_value = MockedResponse({"token": "token"})
+        client = MopinionClient(
+            self.public_key, self.private_key, thread_local_sessions=True
+        )
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(client.session))
+        thread.start()
+        thread.join()
+        self.assertIs(client.session, client.session)
+        self.assertIsNot(client.session, sessions[0])
+        self.assertEqual(1, mocked_response.call_count)
+        client.close()
+
+    @patch("mopinion.client.MopinionClient._get_signature_token")
+    def test_session_of_other_transports(self, mocked_token):
+        mocked_token.return_value = "token"
+        transport = Urllib3Transport()
+        client = MopinionClient(self.public_key, self.private_key, transport=transport)
+        with self.assertRaises(TypeError):
+            client.session
+        client.close()
+
     @patch("requests.sessions.Session.request")
     def test_get_signature_token(self, mocked_response):
         mocked_response.return_value = MockedResponse({"token": "my-token"})
@@ -122,6 +171,39 @@ class APITest(unittest.TestCase):
             ]
         )
 
+    @patch("requests.sessions.Session.request")
+    def test_api_request_feedback_query(self, mocked_response):
+        mocked_response.side_effect = [
+            MockedResponse({"token": "token"}),
+            MockedResponse({"_meta": {"code": 200}}),
+        ]
+        client = MopinionClient(self.public_key, self.private_key)
+        query = FeedbackQuery(limit=100, date_from="2023-01-01", fields=["id"])
+        client.get_datasets_feedback(dataset_id=1, query_params=query)
+        _, kwargs = mocked_response.call_args
+        self.assertEqual(kwargs["params"], {"limit": 100, "filter[date]": "gte:2023-01-01"})
+
+        with self.assertRaises(ValueError):
+            client.request(endpoint="/datasets/1", query_params=query)
+
+    @patch("requests.sessions.Session.request")
+    def test_api_request_timeout(self, mocked_response):
+        mocked_response.return_value = MockedResponse({"token": "token"})
+        client = MopinionClient(self.public_key, self.private_key, timeout=10)
+        client.request("/account")
+        _, kwargs = mocked_response.call_args
+        self.assertEqual(kwargs["timeout"], 10)
+
+        client.request("/account", timeout=2.5)
+        _, kwargs = mocked_response.call_args
+        self.assertEqual(kwargs["timeout"], 2.5)
+
+        # the request gets what is left of the deadline
+        client.get_account(deadline=1)
+        _, kwargs = mocked_response.call_args
+        self.assertLessEqual(kwargs["timeout"], 1)
+        self.assertGreater(kwargs["timeout"], 0.5)
+
     @patch("requests.sessions.Session.request")
     def test_api_request_2(self, mocked_response):
         mocked_response.side_effect = [
@@ -392,5 +474,47 @@ class APITest(unittest.TestCase):
             client.is_available()
 
 
+class DeadlineTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = StandInServer().start()
+        self.client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=self.server.url)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.server.stop()
+
+    def test_slow_response(self):
+        self.server.httpd.latency = 1
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            self.client.get_account(deadline=0.2)
+        self.assertLess(time.monotonic() - start, 0.6)
+
+        # the request given up on times out at the deadline too, without retrying
+        while hedging._deadline_workers.busy and time.monotonic() - start < 5:
+            time.sleep(0.01)
+        self.assertLess(time.monotonic() - start, 0.6)
+        time.sleep(1.5 - (time.monotonic() - start))
+        self.assertEqual(self.server.requests.count("/account"), 1)
+
+    @patch.object(MopinionClient, "_get_signature_token", return_value="token")
+    def test_retries_are_bounded(self, mocked_token):
+        # nothing listens on the port, the retries back off for 6 seconds
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+        client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=url)
+        start = time.monotonic()
+        # the retries stop when the next backoff would outlast the deadline
+        with self.assertRaises(RequestException):
+            client.get_account(deadline=0.5)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(hedging._deadline_workers.busy, 0)
+
+    def test_in_time(self):
+        response = self.client.get_account(deadline=5)
+        self.assertEqual(response.status_code, 200)
+
+
 if __name__ == "__main__":
     unittest.main()
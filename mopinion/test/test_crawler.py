@@ -0,0 +1,46 @@
+from mopinion import MopinionClient
+from mopinion.crawler import AccountCrawler
+from mopinion.crawler import Field
+from .mocks.server import StandInServer
+
+import unittest
+
+
+class AccountCrawlerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = StandInServer().start()
+        self.client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=self.server.url)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.server.stop()
+
+    def test_crawl(self):
+        index = AccountCrawler(self.client, max_workers=4).crawl()
+        self.assertEqual(set(index.deployments), {"web", "app"})
+        self.assertEqual(set(index.reports), {1, 2})
+        self.assertEqual(set(index.datasets), {11, 12, 21, 22})
+        self.assertEqual(index.datasets_of(2), {21, 22})
+        self.assertEqual(index.reports_of(11), {1})
+        self.assertEqual(index.reports_of(99), set())
+
+        self.assertEqual(len(index.fields), 6)
+        nps = index.field("nps", dataset_id=12)
+        self.assertEqual(nps, Field("nps", "How likely are you to recommend us?", "nps"))
+        self.assertEqual(index.field("comment").type, "textarea")
+        self.assertIsNone(index.field("unknown"))
+
+    def test_cache(self):
+        crawler = AccountCrawler(self.client)
+        crawler.crawl(fields=False)
+        requests = len(self.server.requests)
+        index = crawler.crawl(fields=False)
+        self.assertEqual(len(self.server.requests), requests)
+        self.assertEqual(index.fields, {})
+
+        crawler.crawl(fields=False, refresh=True)
+        self.assertEqual(len(self.server.requests), requests + 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,6 @@
+from datetime import date
 from mopinion.dataclasses import EndPoint
+from mopinion.dataclasses import FeedbackQuery
 from mopinion.dataclasses import ResourceUri
 from mopinion.dataclasses import ResourceVerbosity
 
@@ -72,6 +74,49 @@ class ArgumentValidationTest(unittest.TestCase):
         with self.assertRaises(ValueError):
             EndPoint(path="/reports/1/buzz")
 
+    def test_feedback_query_defaults_are_not_sent(self):
+        query = FeedbackQuery(limit=10, page=1)
+        self.assertEqual(query.to_query_params(), {})
+
+    def test_feedback_query_params(self):
+        query = FeedbackQuery(
+            limit=100,
+            page=3,
+            date_from=date(2023, 1, 1),
+            date_to="2023-01-31",
+            filters={"nps": "gte:8"},
+            fields=["id", "nps"],
+        )
+        self.assertEqual(
+            query.to_query_params(),
+            {
+                "limit": 100,
+                "page": 3,
+                "filter[date]": ["gte:2023-01-01", "lte:2023-01-31"],
+                "filter[nps]": "gte:8",
+            },
+        )
+        self.assertEqual(query.fields, ("id", "nps"))
+        self.assertEqual(query.filters, (("nps", "gte:8"),))
+        # frozen queries are hashable, with dict or list filters
+        query = FeedbackQuery(filters={"tags": ["web", "app"]})
+        self.assertEqual(hash(query), hash(FeedbackQuery(filters=(("tags", ["web", "app"]),))))
+        self.assertEqual(query.to_query_params(), {"filter[tags]": ["web", "app"]})
+
+    def test_feedback_query_wrong(self):
+        wrong_arguments = [
+            {"limit": 0},
+            {"limit": 100000},
+            {"page": 0},
+            {"date_from": "01-01-2023"},
+            {"date_from": "2023-02-01", "date_to": "2023-01-01"},
+            {"filters": {"nps; drop": "1"}},
+            {"fields": "id"},
+        ]
+        for arguments in wrong_arguments:
+            with self.assertRaises(ValueError):
+                FeedbackQuery(**arguments)
+
 
 if __name__ == "__main__":
     unittest.main()
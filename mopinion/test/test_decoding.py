@@ -0,0 +1,119 @@
+from datetime import datetime
+from mopinion.dataclasses import FeedbackQuery
+from mopinion.decoding import decode_page
+from mopinion.decoding import FeedbackSchema
+from .mocks import MockedResponse
+
+import unittest
+
+
+PAGE = {
+    "_meta": {"code": 200, "has_more": False},
+    "data": [
+        {
+            "id": 1,
+            "created": "2023-01-01 10:00:00",
+            "tags": ["a"],
+            "fields": [
+                {"key": "nps", "label": "NPS", "value": 9},
+                {"key": "comment", "label": "Comment", "value": "Great"},
+            ],
+        },
+        {"id": 2, "created": "2023-01-02 10:00:00", "tags": []},
+    ],
+}
+
+
+class DecodingTest(unittest.TestCase):
+    def test_decode_page_without_fields(self):
+        page = decode_page(MockedResponse(PAGE))
+        self.assertEqual(page, PAGE)
+
+    def test_decode_page_projection(self):
+        page = decode_page(MockedResponse(PAGE), fields=["id", "nps"])
+        self.assertEqual(page["_meta"], PAGE["_meta"])
+        self.assertEqual(
+            page["data"],
+            [
+                {"id": 1, "fields": [{"key": "nps", "label": "NPS", "value": 9}]},
+                {"id": 2},
+            ],
+        )
+
+    def test_decode_page_projection_errors(self):
+        class Truncated:
+            text = '{"_meta": {"code": 200}, "data": [{"id": 1}, {"id": 2'
+
+        with self.assertRaises(ValueError):
+            decode_page(Truncated(), fields=["id"])
+
+    def test_feedback_query_decode(self):
+        query = FeedbackQuery(fields=("created",))
+        page = query.decode(MockedResponse(PAGE))
+        self.assertEqual(
+            [item for item in page["data"]],
+            [{"created": "2023-01-01 10:00:00"}, {"created": "2023-01-02 10:00:00"}],
+        )
+
+
+FIELDS = {
+    "_meta": {"code": 200},
+    "data": [
+        {"key": "nps", "label": "NPS", "type": "nps"},
+        {"key": "comment", "label": "Comment", "type": "textarea"},
+        {"key": "amount", "label": "Amount", "type": "number"},
+        {"key": "visit-date", "label": "Visit", "type": "date"},
+    ],
+}
+
+
+class FeedbackSchemaTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.schema = FeedbackSchema.from_fields(MockedResponse(FIELDS))
+
+    def test_columns(self):
+        self.assertEqual(
+            self.schema.columns,
+            ("id", "created", "dataset_id", "report_id", "tags", "nps", "comment", "amount", "visit-date"),
+        )
+        self.assertEqual(self.schema.index("visit-date"), 8)
+
+    def test_decode_page(self):
+        rows = self.schema.decode_page(MockedResponse(PAGE))
+        self.assertEqual(len(rows), 2)
+        row = rows[0]
+        self.assertEqual(row.id, 1)
+        self.assertEqual(row.created, datetime(2023, 1, 1, 10))
+        self.assertEqual(row.tags, ("a",))
+        self.assertEqual(row.nps, 9)
+        self.assertEqual(row.comment, "Great")
+        self.assertIsNone(row.amount)
+        self.assertEqual(rows[1].tags, ())
+        self.assertIsNone(rows[1].nps)
+
+    def test_typed_values(self):
+        item = {
+            "id": "7",
+            "fields": [
+                {"key": "nps", "value": "10"},
+                {"key": "amount", "value": "12.5"},
+                {"key": "visit-date", "value": "2023-02-03"},
+                {"key": "unknown", "value": "dropped"},
+                {"key": "comment", "value": 42},
+            ],
+        }
+        row = self.schema.decode_item(item)
+        self.assertEqual(row.id, 7)
+        self.assertEqual(row.nps, 10)
+        self.assertEqual(row.amount, 12.5)
+        self.assertEqual(row[self.schema.index("visit-date")], datetime(2023, 2, 3))
+        self.assertEqual(row.comment, "42")
+        self.assertNotIn("dropped", row)
+
+    def test_iter_rows(self):
+        rows = list(self.schema.iter_rows([MockedResponse(PAGE), PAGE]))
+        self.assertEqual([row.id for row in rows], [1, 2, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
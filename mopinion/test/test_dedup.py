@@ -0,0 +1,59 @@
+from mopinion.dedup import BloomFilter
+from mopinion.dedup import Deduplicator
+from mopinion.dedup import Gap
+from mopinion.dedup import SeenIds
+from .mocks import MockedResponse
+
+import unittest
+
+
+def page(ids, total=None):
+    meta = {"has_more": True}
+    if total is not None:
+        meta["total"] = total
+    return {"_meta": meta, "data": [{"id": i} for i in ids]}
+
+
+class DeduplicationTest(unittest.TestCase):
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        added = sum(bloom.add(i) for i in range(1000))
+        self.assertGreater(added, 980)
+        self.assertTrue(all(i in bloom for i in range(1000)))
+        self.assertFalse(bloom.add(10))
+        false_positives = sum(i in bloom for i in range(1000, 11000))
+        self.assertLess(false_positives, 300)
+
+    def test_seen_ids_switch_to_bloom(self):
+        seen = SeenIds(threshold=10)
+        self.assertTrue(all(seen.add(i) for i in range(10)))
+        self.assertTrue(seen.exact)
+        self.assertFalse(seen.add(5))
+        seen.add(10)
+        self.assertFalse(seen.exact)
+        self.assertIn(3, seen)
+        self.assertFalse(seen.add(3))
+        self.assertTrue(seen.add(11))
+
+    def test_duplicates_dropped_across_pages(self):
+        # two items were created during the walk, shifting items to page 2
+        pages = [
+            MockedResponse(page([10, 9, 8, 7], total=10)),
+            page([8, 7, 6, 5], total=12),
+            page([4, 3, 2, 1], total=12),
+        ]
+        deduplicator = Deduplicator()
+        items = list(deduplicator.iter_items(pages))
+        self.assertEqual([item["id"] for item in items], list(range(10, 0, -1)))
+        self.assertEqual(deduplicator.duplicates, 2)
+        self.assertEqual(deduplicator.gaps, [])
+
+    def test_gaps_reported(self):
+        pages = [page([10, 9, 8], total=10), page([6, 5, 4], total=9)]
+        deduplicator = Deduplicator()
+        list(deduplicator.iter_pages(pages))
+        self.assertEqual(deduplicator.gaps, [Gap(page=2, missing=1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+from mopinion import MopinionClient
+from mopinion.export import RawExporter
+from mopinion.export import scan_meta
+from mopinion.transports import Urllib3Transport
+from .mocks.server import StandInServer
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class ScanMetaTest(unittest.TestCase):
+    def test_head(self):
+        body = b'{"_meta": {"has_more": true, "next": "/x?page=2"}, "data": [1, 2'
+        self.assertEqual(scan_meta(body), {"has_more": True, "next": "/x?page=2"})
+
+    def test_tail(self):
+        body = b'{"data": [{"comment": "\\"_meta\\": {}"}], "_meta": {"has_more": false}}'
+        self.assertEqual(scan_meta(body[:20], body[-60:]), {"has_more": False})
+
+    def test_not_found(self):
+        self.assertIsNone(scan_meta(b'{"_meta": {"has_more": tr'))
+        self.assertIsNone(scan_meta(b'{"data": []}', b'{"data": []}'))
+        # inside a value, not the last key of the document
+        self.assertIsNone(scan_meta(b"", b'"x": {"_meta": {"a": 1}}, "data": []}'))
+
+
+class RawExporterTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = StandInServer(total=95).start()
+        self.client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=self.server.url)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.server.stop()
+
+    def test_export_to_file(self):
+        sink = io.BytesIO()
+        exporter = RawExporter(self.client, chunk_size=1024)
+        pages = exporter.export("datasets", 1, "feedback", sink, query_params={"limit": 20})
+        self.assertEqual(pages, 5)
+        lines = sink.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(exporter.bytes, sum(len(line) for line in lines))
+        ids = [item["id"] for line in lines for item in json.loads(line)["data"]]
+        self.assertEqual(ids, list(range(95, 0, -1)))
+        self.assertEqual(self.client.stats.requests, 5)
+        self.assertEqual(self.client.stats.bytes_decoded, exporter.bytes)
+        self.assertLess(self.client.stats.bytes_received, exporter.bytes)
+
+    def test_export_to_directory(self):
+        directory = tempfile.mkdtemp()
+        try:
+            target = os.path.join(directory, "archive")
+            RawExporter(self.client).export("datasets", 1, "feedback", target)
+            files = sorted(os.listdir(target))
+            self.assertEqual(len(files), 10)
+            self.assertEqual(files[0], "page-000001.json")
+            with open(os.path.join(target, files[-1]), "rb") as file:
+                self.assertEqual(len(json.load(file)["data"]), 5)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_urllib3_transport(self):
+        transport = Urllib3Transport(base_url=self.server.url)
+        with MopinionClient(
+            "PUBLIC_KEY", "PRIVATE_KEY", base_url=self.server.url, transport=transport
+        ) as client:
+            sink = io.BytesIO()
+            RawExporter(client).export("reports", 2, "feedback", sink, query_params={"limit": 50})
+        lines = sink.getvalue().splitlines()
+        self.assertEqual([len(json.loads(line)["data"]) for line in lines], [50, 45])
+
+    def test_invalid(self):
+        exporter = RawExporter(self.client)
+        with self.assertRaises(ValueError):
+            exporter.export("datasets", 1, "feedback", io.BytesIO(), verbosity="quiet")
+        with self.assertRaises(ValueError):
+            exporter.export("datasets", 1, "feedback")
+
+
+if __name__ == "__main__":
+    unittest.main()
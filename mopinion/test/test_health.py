@@ -0,0 +1,143 @@
+from mopinion import MopinionClient
+from mopinion.health import HealthMonitor
+from mopinion.resilience import AdaptiveConcurrencyLimiter
+from mopinion.resilience import CircuitBreaker
+from mopinion.resilience import CircuitBreakers
+from requests.exceptions import ConnectionError
+from requests.models import Response
+from .mocks.server import StandInServer
+
+import time
+import unittest
+
+
+class Outage:
+    """Transport failing every request."""
+
+    def request(self, **kwargs):
+        raise ConnectionError("down")
+
+
+class TokenExpired:
+    """Transport rejecting the first ping with a 401."""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.rejected = False
+
+    def request(self, **kwargs):
+        if kwargs["url"].endswith("/ping") and not self.rejected:
+            self.rejected = True
+            response = Response()
+            response.status_code = 401
+            response._content = b'{"_meta": {"code": 401}}'
+            return response
+        return self.transport.request(**kwargs)
+
+
+class CountingRateLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self, timeout=None):
+        self.acquired += 1
+        return True
+
+
+class HealthMonitorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = StandInServer().start()
+        self.client = MopinionClient(
+            "PUBLIC_KEY",
+            "PRIVATE_KEY",
+            base_url=self.server.url,
+            circuit_breakers=CircuitBreakers(),
+            limiter=AdaptiveConcurrencyLimiter(initial=8),
+        )
+        self.changes = []
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.server.stop()
+
+    def pings(self):
+        return self.server.requests.count("/ping")
+
+    def test_check(self):
+        monitor = HealthMonitor(self.client, failure_threshold=2, on_change=self.changes.append)
+        self.assertIsNone(monitor.is_available())
+        self.assertTrue(monitor.check())
+        self.assertEqual(monitor.is_available(verbose=True)["response"], "pong")
+        self.assertIsNotNone(monitor.latency)
+        self.assertIsNone(monitor.latency_trend())
+
+        self.client.get_account()
+        transport, self.client.transport = self.client.transport, Outage()
+        self.assertFalse(monitor.check())
+        self.assertIsInstance(monitor.error, ConnectionError)
+        self.assertIsNone(monitor.is_available(verbose=True))
+        self.assertEqual(self.client.limiter.limit, 4)
+        # the circuits open after the threshold
+        self.assertEqual(self.client.circuit_breakers["account"].state, CircuitBreaker.CLOSED)
+        self.assertFalse(monitor.check())
+        self.assertEqual(self.client.circuit_breakers["account"].state, CircuitBreaker.OPEN)
+        self.assertEqual(monitor.failures, 2)
+        # families not used yet are protected too
+        self.assertEqual(self.client.circuit_breakers["reports"].state, CircuitBreaker.OPEN)
+
+        # the circuits close as soon as the API is back
+        self.client.transport = transport
+        self.assertTrue(monitor.check())
+        self.assertEqual(monitor.failures, 0)
+        self.assertEqual(self.client.circuit_breakers["account"].state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.client.circuit_breakers["reports"].state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.client.get_account().status_code, 200)
+        self.assertEqual(self.changes, [False, True])
+        self.assertIsNotNone(monitor.latency_trend())
+
+    def test_expired_token(self):
+        monitor = HealthMonitor(self.client, failure_threshold=1)
+        transport = self.client.transport
+        self.client.transport = TokenExpired(transport)
+        self.assertTrue(monitor.check())
+        self.client.transport = transport
+        self.assertEqual(self.server.requests.count("/token"), 2)
+        self.assertEqual(monitor.failures, 0)
+        self.assertEqual(self.client.circuit_breakers["account"].state, CircuitBreaker.CLOSED)
+
+    def test_rate_limited_pings(self):
+        self.client.rate_limiter = CountingRateLimiter()
+        monitor = HealthMonitor(self.client)
+        self.assertTrue(monitor.check())
+        self.assertTrue(monitor.check())
+        self.assertEqual(self.client.rate_limiter.acquired, 2)
+
+    def test_slow_pings(self):
+        monitor = HealthMonitor(self.client, latency_target=0.01)
+        self.server.httpd.latency = 0.02
+        self.assertTrue(monitor.check())
+        self.assertEqual(self.client.limiter.limit, 4)
+
+    def test_background(self):
+        self.assertTrue(self.client.is_available())
+        self.assertEqual(self.pings(), 1)
+        with HealthMonitor(self.client, interval=0.01) as monitor:
+            self.assertIs(self.client.health_monitor, monitor)
+            while monitor.available is None:
+                time.sleep(0.001)
+            pings = self.pings()
+            # answered from the cache
+            for _ in range(5):
+                self.assertTrue(self.client.is_available())
+            self.assertEqual(self.client.is_available(verbose=True)["code"], 200)
+            while self.pings() < pings + 2:
+                time.sleep(0.001)
+        self.assertIsNone(self.client.health_monitor)
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            HealthMonitor(self.client, interval=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+from mock import patch
+from mopinion import MopinionClient
+from mopinion.exceptions import DeadlineExceeded
+from mopinion.hedging import Hedger
+from mopinion.hedging import LatencyTracker
+from mopinion.hedging import within_deadline
+from mopinion.hedging import WorkerPool
+from .mocks import MockedResponse
+
+import itertools
+import threading
+import time
+import unittest
+
+
+class HedgingTest(unittest.TestCase):
+    def test_latency_tracker(self):
+        tracker = LatencyTracker(window=10)
+        self.assertIsNone(tracker.percentile("datasets", 0.5))
+        for latency in range(20):
+            tracker.record("datasets", latency)
+        self.assertEqual(tracker.count("datasets"), 10)
+        self.assertEqual(tracker.percentile("datasets", 0.5), 15)
+        self.assertEqual(tracker.percentile("datasets", 0.99), 19)
+
+    def test_no_hedging_without_samples(self):
+        hedger = Hedger(min_samples=5)
+        self.assertEqual(hedger.call("account", lambda: "response"), "response")
+        self.assertIsNone(hedger.delay("account"))
+        self.assertEqual(hedger.hedged, 0)
+
+    def test_slow_request_is_hedged(self):
+        hedger = Hedger(min_samples=3, min_delay=0.01)
+        for _ in range(3):
+            hedger.latencies.record("reports", 0.01)
+
+        calls = itertools.count()
+        release = threading.Event()
+
+        def send():
+            # the first call hangs until the hedged one has answered
+            if next(calls) == 0:
+                release.wait(5)
+                return "slow"
+            return "fast"
+
+        start = time.monotonic()
+        self.assertEqual(hedger.call("reports", send), "fast")
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(hedger.hedged, 1)
+        release.set()
+        hedger.close()
+
+    def test_errors_are_raised(self):
+        hedger = Hedger(min_samples=1, min_delay=0.01)
+        hedger.latencies.record("reports", 0.01)
+
+        def send():
+            raise ValueError("broken")
+
+        with self.assertRaises(ValueError):
+            hedger.call("reports", send)
+        hedger.close()
+
+    def test_primary_does_not_queue(self):
+        # the duplicates are busy, the primary request still starts right away
+        hedger = Hedger(min_samples=1, min_delay=5, max_workers=1)
+        hedger.latencies.record("reports", 5)
+        release = threading.Event()
+        hedger.duplicates.submit(release.wait, 5)
+
+        start = time.monotonic()
+        self.assertEqual(hedger.call("reports", lambda: "response"), "response")
+        self.assertLess(time.monotonic() - start, 1)
+        release.set()
+        hedger.close()
+
+    def test_threads_are_bounded(self):
+        hedger = Hedger(min_samples=1, min_delay=5, max_workers=1)
+        hedger.latencies.record("reports", 5)
+        release = threading.Event()
+        hedger.primaries.submit(release.wait, 5)
+
+        # no thread is free, the request is sent from the caller's thread
+        caller = threading.current_thread()
+        self.assertIs(hedger.call("reports", threading.current_thread), caller)
+        self.assertEqual(hedger.primaries.busy, 1)
+        release.set()
+        hedger.close()
+
+    def test_within_deadline(self):
+        self.assertEqual(within_deadline(lambda: "response", 1), "response")
+
+        release = threading.Event()
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            within_deadline(lambda: release.wait(5), 0.05)
+        self.assertLess(time.monotonic() - start, 1)
+        release.set()
+
+        with self.assertRaises(ValueError):
+            within_deadline(lambda: int("broken"), 1)
+
+    def test_within_deadline_bounded(self):
+        workers = WorkerPool(max_workers=1, name="test-deadline")
+        release = threading.Event()
+        workers.submit(release.wait, 5)
+
+        # the call waiting for a thread when the deadline expires is never made
+        calls = []
+        with self.assertRaises(DeadlineExceeded):
+            within_deadline(lambda: calls.append(1), 0.05, workers=workers)
+        release.set()
+        while workers.busy:
+            time.sleep(0.01)
+        self.assertEqual(calls, [])
+        workers.close()
+
+    @patch("requests.sessions.Session.request")
+    def test_client_with_hedging(self, mocked_response):
+        mocked_response.return_value = MockedResponse({"token": "token"})
+        hedger = Hedger()
+        client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", hedging=hedger)
+        client.get_datasets_feedback(dataset_id=1)
+        client.get_datasets_feedback(dataset_id=2)
+        self.assertEqual(hedger.latencies.count("datasets/feedback"), 2)
+
+    def test_wrong_percentile(self):
+        with self.assertRaises(ValueError):
+            Hedger(percentile=95)
+
+
+if __name__ == "__main__":
+    unittest.main()
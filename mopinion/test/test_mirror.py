@@ -0,0 +1,76 @@
+from mopinion import MopinionClient
+from mopinion.mirror import FeedbackMirror
+from .mocks import MockedResponse
+from .mocks.server import StandInServer
+from .mocks.server import feedback_item
+
+import unittest
+
+
+class FeedbackMirrorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mirror = FeedbackMirror()
+
+    def tearDown(self) -> None:
+        self.mirror.close()
+
+    def test_ingest_and_query(self):
+        pages = [
+            MockedResponse({"data": [feedback_item(i, 1) for i in range(1, 11)]}),
+            {"data": [feedback_item(i, 1) for i in range(11, 21)]},
+        ]
+        self.assertEqual(self.mirror.ingest(pages, "datasets", 1), 20)
+        self.assertEqual(self.mirror.count("datasets", 1), 20)
+        self.assertEqual(self.mirror.count("datasets", 2), 0)
+
+        # nps is the id modulo 11
+        items = self.mirror.query("datasets", 1, where={"nps": ("<", 2)})
+        self.assertEqual(sorted(item["id"] for item in items), [1, 11, 12])
+
+        items = self.mirror.query(where={"tags": "web", "rating": (">=", 5)})
+        self.assertEqual(sorted(item["id"] for item in items), [9, 19])
+
+        items = self.mirror.query(since="2023-01-05", until="2023-01-07")
+        self.assertEqual(sorted(item["id"] for item in items), [4, 5])
+
+        items = self.mirror.query("datasets", 1, limit=3)
+        self.assertEqual(len(items), 3)
+        self.assertEqual(items[0], feedback_item(items[0]["id"], 1))
+
+    def test_upsert(self):
+        item = feedback_item(1, 1)
+        self.mirror.ingest([{"data": [item]}], "reports", 1)
+        item["fields"][0]["value"] = 10
+        self.mirror.ingest([{"data": [item]}], "reports", 1)
+        self.assertEqual(self.mirror.count("reports", 1), 1)
+        self.assertEqual(self.mirror.count(where={"nps": 1}), 0)
+        self.assertEqual(self.mirror.query(where={"nps": 10}), [item])
+
+    def test_where_none(self):
+        answered, unanswered = feedback_item(1, 1), feedback_item(2, 1)
+        unanswered["fields"][0]["value"] = None
+        self.mirror.ingest([{"data": [answered, unanswered]}], "datasets", 1)
+        self.assertEqual(self.mirror.query(where={"nps": None}), [unanswered])
+        self.assertEqual(self.mirror.query(where={"nps": ("!=", None)}), [answered])
+        with self.assertRaises(ValueError):
+            self.mirror.query(where={"nps": ("<", None)})
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(ValueError):
+            self.mirror.ingest([], "deployments", 1)
+        with self.assertRaises(ValueError):
+            self.mirror.query(where={"nps": ("; DROP", 1)})
+
+    def test_sync(self):
+        with StandInServer(total=30) as server:
+            client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=server.url)
+            self.assertEqual(self.mirror.sync(client, "datasets", 1, limit=20), 30)
+            self.assertEqual(self.mirror.last_created("datasets", 1), "2023-01-28 03:00:00")
+
+            self.mirror.sync(client, "datasets", 1)
+            self.assertIn("filter%5Bdate%5D=gte%3A2023-01-28", server.requests[-1])
+            self.assertEqual(self.mirror.count("datasets", 1), 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,8 @@ import unittest
 from mock import patch
 
 from mopinion import MopinionClient
+from mopinion.client import next_query_params
+from mopinion.exceptions import DeadlineExceeded
 from .mocks import MockedResponse
 
 
@@ -73,6 +75,67 @@ class APITest(unittest.TestCase):
         with self.assertRaises(StopIteration):
             next(paginated_resource)
 
+    @patch("requests.sessions.Session.request")
+    def test_api_resource_generator_repeated_params(self, mocked_response):
+        next_url = "/datasets/1/feedback?page=2&filter[date]=gte:2023-01-01&filter[date]=lte:2023-01-31"
+        mocked_response.side_effect = [
+            MockedResponse({"token": "token"}),
+            MockedResponse({"_meta": {"has_more": True, "next": next_url}}),
+            MockedResponse({"_meta": {"has_more": False, "next": False}}),
+        ]
+        client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY")
+        pages = list(client.get_datasets_feedback(dataset_id=1, iterator=True))
+        self.assertEqual(2, len(pages))
+        _, kwargs = mocked_response.call_args
+        self.assertEqual(
+            kwargs["params"],
+            {"page": "2", "filter[date]": ["gte:2023-01-01", "lte:2023-01-31"]},
+        )
+
+    def test_next_query_params(self):
+        next_url = "/datasets/1/feedback?page=2&limit=10&filter[date]=gte:2023-01-01&filter[date]=lte:2023-01-31"
+        self.assertEqual(
+            next_query_params(next_url),
+            {"page": "2", "limit": "10", "filter[date]": ["gte:2023-01-01", "lte:2023-01-31"]},
+        )
+
+    @patch("mopinion.client.time.monotonic")
+    @patch("requests.sessions.Session.request")
+    def test_api_resource_generator_deadline(self, mocked_response, mocked_time):
+        next_url = "/datasets/1/feedback?page=2"
+        clock = [100.0]
+        responses = iter(
+            [
+                (0, MockedResponse({"token": "token"})),
+                (7, MockedResponse({"_meta": {"has_more": True, "next": next_url}})),
+                (4, MockedResponse({"_meta": {"has_more": True, "next": next_url}})),
+            ]
+        )
+
+        def respond(**kwargs):
+            # each page takes its time on the mocked clock
+            seconds, response = next(responses)
+            clock[0] += seconds
+            return response
+
+        mocked_response.side_effect = respond
+        mocked_time.side_effect = lambda: clock[0]
+
+        client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", timeout=5)
+        pages = client.get_datasets_feedback(dataset_id=1, iterator=True, deadline=10)
+
+        next(pages)
+        _, kwargs = mocked_response.call_args
+        self.assertEqual(kwargs["timeout"], 5)
+
+        next(pages)
+        _, kwargs = mocked_response.call_args
+        self.assertEqual(kwargs["timeout"], 3)
+
+        with self.assertRaises(DeadlineExceeded):
+            next(pages)
+        self.assertEqual(3, mocked_response.call_count)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,134 @@
+from mopinion import MopinionClient
+from mopinion.dataclasses import FeedbackQuery
+from mopinion.paging import PageSizeTuner
+from mopinion.transports import RequestsTransport
+from requests.exceptions import ReadTimeout
+from .mocks.server import StandInServer
+
+import os
+import shutil
+import tempfile
+import unittest
+import urllib.parse
+
+
+class PageSizeTunerTest(unittest.TestCase):
+    def test_next_limit(self):
+        tuner = PageSizeTuner(min_limit=10, max_limit=100, latency_target=1, max_bytes=1000)
+        self.assertEqual(tuner.next_limit(10, 10, latency=0.1, size=100), 10)
+        self.assertEqual(tuner.next_limit(10, 20, latency=0.1, size=100), 20)
+        self.assertEqual(tuner.next_limit(40, 80, latency=0.1, size=100), 80)
+        # 80 items consumed are no multiple of 160 and 160 is above the maximum
+        self.assertEqual(tuner.next_limit(80, 80, latency=0.1, size=100), 80)
+        self.assertEqual(tuner.next_limit(20, 30, latency=0.1, size=100), 20)
+        self.assertEqual(tuner.next_limit(40, 80, latency=0.7, size=100), 40)
+        self.assertEqual(tuner.next_limit(40, 80, latency=2, size=100), 20)
+        self.assertEqual(tuner.next_limit(40, 80, latency=0.1, size=2000), 20)
+        self.assertEqual(tuner.next_limit(10, 80, latency=2, size=100), 10)
+
+    def test_shrink(self):
+        tuner = PageSizeTuner(min_limit=10)
+        self.assertEqual(tuner.shrink(40, 80), 20)
+        self.assertIsNone(tuner.shrink(10, 80))
+
+    def test_limit(self):
+        tuner = PageSizeTuner(min_limit=10, max_limit=1000)
+        self.assertEqual(tuner.limit("datasets/feedback"), 10)
+        tuner.remember("datasets/feedback", 640)
+        self.assertEqual(tuner.limit("datasets/feedback"), 640)
+        self.assertEqual(PageSizeTuner(min_limit=10, max_limit=100)._ladder(640), 80)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            PageSizeTuner(min_limit=0)
+        with self.assertRaises(ValueError):
+            PageSizeTuner(max_limit=5000)
+
+
+class TimeoutAboveTransport(RequestsTransport):
+    """Times out pages larger than ``max_limit``."""
+
+    def __init__(self, base_url, max_limit):
+        super().__init__(base_url)
+        self.max_limit = max_limit
+        self.timeouts = 0
+
+    def request(self, method, url, headers, params=None, timeout=None):
+        if params and int(params.get("limit", 10)) > self.max_limit:
+            self.timeouts += 1
+            raise ReadTimeout("stand-in timeout")
+        return super().request(method, url, headers, params, timeout)
+
+
+class TunedIteratorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = StandInServer(total=1000).start()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def client(self, page_sizes, **kwargs):
+        return MopinionClient(
+            "PUBLIC_KEY", "PRIVATE_KEY", base_url=self.server.url, page_sizes=page_sizes, **kwargs
+        )
+
+    def walk(self, client, **kwargs):
+        pages = client.get_datasets_feedback(dataset_id=1, iterator=True, **kwargs)
+        return [item["id"] for page in pages for item in page.json()["data"]]
+
+    def limits(self):
+        return [
+            int(urllib.parse.parse_qs(urllib.parse.urlparse(path).query).get("limit", ["10"])[0])
+            for path in self.server.requests
+            if "/feedback" in path
+        ]
+
+    def test_walk(self):
+        path = os.path.join(self.directory, "limits.json")
+        tuner = PageSizeTuner(latency_target=10, path=path)
+        with self.client(tuner) as client:
+            self.assertEqual(self.walk(client), list(range(1000, 0, -1)))
+        limits = self.limits()
+        self.assertEqual(limits[:6], [10, 10, 20, 40, 80, 160])
+        self.assertLess(len(limits), 15)
+
+        # the next run starts from the remembered limit
+        del self.server.requests[:]
+        tuner = PageSizeTuner(latency_target=10, path=path)
+        with self.client(tuner) as client:
+            self.assertEqual(self.walk(client), list(range(1000, 0, -1)))
+        self.assertEqual(self.limits()[0], 640)
+
+    def test_explicit_limit(self):
+        tuner = PageSizeTuner(latency_target=10)
+        with self.client(tuner) as client:
+            self.walk(client, query_params={"limit": 250})
+            self.walk(client, query_params=FeedbackQuery(limit=500))
+        self.assertEqual(self.limits(), [250] * 4 + [500] * 2)
+
+    def test_feedback_query(self):
+        tuner = PageSizeTuner(latency_target=10)
+        with self.client(tuner) as client:
+            ids = self.walk(client, query_params=FeedbackQuery(date_from="2023-01-01"))
+        self.assertEqual(ids, list(range(1000, 0, -1)))
+        self.assertIn("filter%5Bdate%5D=gte%3A2023-01-01", self.server.requests[1])
+
+    def test_retry_smaller_page(self):
+        transport = TimeoutAboveTransport(self.server.url, max_limit=40)
+        tuner = PageSizeTuner(latency_target=10)
+        with self.client(tuner, transport=transport) as client:
+            self.assertEqual(self.walk(client), list(range(1000, 0, -1)))
+        self.assertGreater(transport.timeouts, 0)
+        self.assertLessEqual(max(self.limits()), 40)
+
+    def test_failure_at_min_limit(self):
+        transport = TimeoutAboveTransport(self.server.url, max_limit=5)
+        with self.client(PageSizeTuner(), transport=transport) as client:
+            with self.assertRaises(ReadTimeout):
+                self.walk(client)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+from mopinion import MopinionClient
+from mopinion.pipeline import decode
+from mopinion.pipeline import Pipeline
+from mopinion.pipeline import PipelineCancelled
+from mopinion.pipeline import Stage
+from .mocks.server import StandInServer
+
+import asyncio
+import threading
+import time
+import unittest
+
+
+class PipelineTest(unittest.TestCase):
+    def test_run_with_threads(self):
+        output = []
+        pipeline = Pipeline(
+            range(100),
+            stages=[Stage(lambda x: x * 2, workers=4), lambda x: x if x % 3 else None],
+            sink=output.append,
+            maxsize=2,
+        )
+        self.assertEqual(pipeline.run(), 66)
+        self.assertEqual(sorted(output), [x * 2 for x in range(100) if x * 2 % 3])
+
+    def test_order_kept_with_single_workers(self):
+        output = []
+        Pipeline(range(50), stages=[str], sink=output.append).run()
+        self.assertEqual(output, [str(x) for x in range(50)])
+
+    def test_backpressure(self):
+        produced = []
+
+        def source():
+            for x in range(100):
+                produced.append(x)
+                yield x
+
+        release = threading.Event()
+
+        def slow(x):
+            release.wait(5)
+            return x
+
+        pipeline = Pipeline(source(), stages=[slow], maxsize=2)
+        thread = threading.Thread(target=pipeline.run)
+        thread.start()
+        time.sleep(0.2)
+        # one item in the stage, two in each queue and one waiting to be put
+        self.assertLessEqual(len(produced), 6)
+        release.set()
+        thread.join()
+        self.assertEqual(pipeline.processed, 100)
+
+    def test_error_stops_the_pipeline(self):
+        def fail(x):
+            if x == 10:
+                raise ValueError("broken")
+            return x
+
+        with self.assertRaises(ValueError):
+            Pipeline(range(1000), stages=[Stage(fail, workers=2)]).run()
+
+    def test_cancel(self):
+        pipeline = Pipeline(iter(int, 1), stages=[lambda x: x])
+        pipeline.sink = lambda x: pipeline.cancel() if pipeline.processed > 5 else None
+        with self.assertRaises(PipelineCancelled):
+            pipeline.run()
+        self.assertTrue(pipeline.cancelled)
+
+    def test_run_async(self):
+        async def double(x):
+            await asyncio.sleep(0)
+            return x * 2
+
+        output = []
+        pipeline = Pipeline(
+            range(20),
+            stages=[Stage(double, workers=3), Stage(lambda x: x + 1, workers=2)],
+            sink=output.append,
+        )
+        self.assertEqual(asyncio.run(pipeline.run_async()), 20)
+        self.assertEqual(sorted(output), [x * 2 + 1 for x in range(20)])
+
+    def test_run_async_error(self):
+        def fail(x):
+            raise ValueError("broken")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(Pipeline(range(10), stages=[fail]).run_async())
+
+    def test_cancel_async_from_a_thread(self):
+        closed = threading.Event()
+
+        def source():
+            try:
+                while True:
+                    yield 1
+            finally:
+                closed.set()
+
+        pipeline = Pipeline(source(), stages=[lambda x: time.sleep(0.001)])
+        threading.Timer(0.05, pipeline.cancel).start()
+        with self.assertRaises(PipelineCancelled):
+            asyncio.run(asyncio.wait_for(pipeline.run_async(), 5))
+        self.assertTrue(closed.is_set())
+
+    def test_async_source_closed_on_error(self):
+        closed = []
+
+        async def source():
+            try:
+                for x in range(100):
+                    yield x
+            finally:
+                closed.append(True)
+
+        def fail(x):
+            raise ValueError("broken")
+
+        async def main():
+            with self.assertRaises(ValueError):
+                await Pipeline(source(), stages=[fail]).run_async()
+            # closed by the pipeline, not when the event loop shuts down
+            self.assertEqual(closed, [True])
+
+        asyncio.run(main())
+
+    def test_pages_of_a_resource(self):
+        with StandInServer(total=95) as server:
+            client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=server.url)
+            pages = client.get_datasets_feedback(
+                dataset_id=1, query_params={"limit": 10}, iterator=True
+            )
+            ids = []
+            Pipeline(
+                pages,
+                stages=[Stage(decode, workers=2), lambda page: page["data"]],
+                sink=lambda items: ids.extend(item["id"] for item in items),
+            ).run()
+        self.assertEqual(sorted(ids), list(range(1, 96)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+from mock import patch
+from mopinion import MopinionClient
+from mopinion.exceptions import CircuitOpenError
+from mopinion.resilience import AdaptiveConcurrencyLimiter
+from mopinion.resilience import CircuitBreaker
+from mopinion.resilience import CircuitBreakers
+from mopinion.resilience import is_failure
+from requests.exceptions import ConnectionError
+from requests.exceptions import HTTPError
+from requests.exceptions import RequestException
+from .mocks import MockedResponse
+
+import asyncio
+import threading
+import unittest
+
+
+def fail():
+    raise ConnectionError("down")
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_is_failure(self):
+        self.assertTrue(is_failure(ConnectionError()))
+        self.assertTrue(is_failure(HTTPError(response=MockedResponse({}, 503))))
+        self.assertTrue(is_failure(HTTPError(response=MockedResponse({}, 429))))
+        self.assertFalse(is_failure(HTTPError(response=MockedResponse({}, 404))))
+        self.assertFalse(is_failure(ValueError()))
+        self.assertFalse(is_failure(CircuitOpenError()))
+
+    def test_circuit_opens_and_recovers(self):
+        breaker = CircuitBreaker("reports", failure_threshold=2, reset_timeout=60)
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                breaker.call(fail)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(lambda: "not sent")
+
+        # after the reset timeout a single trial call is let through
+        breaker.reset_timeout = 0
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_opens_again(self):
+        breaker = CircuitBreaker("reports", failure_threshold=1, reset_timeout=0)
+        with self.assertRaises(ConnectionError):
+            breaker.call(fail)
+        with self.assertRaises(ConnectionError):
+            breaker.call(fail)
+        breaker.reset_timeout = 60
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_trip_all_and_reset(self):
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+        breakers["account"]
+        with self.assertRaises(ConnectionError):
+            breakers.call("reports", fail)
+
+        breakers.trip_all()
+        self.assertEqual(breakers["account"].state, CircuitBreaker.OPEN)
+        self.assertEqual(breakers["datasets"].state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breakers.call("deployments", lambda: "ok")
+
+        # circuits opened by their own failures stay open
+        breakers.reset_tripped()
+        self.assertEqual(breakers["account"].state, CircuitBreaker.CLOSED)
+        self.assertEqual(breakers["datasets"].state, CircuitBreaker.CLOSED)
+        self.assertEqual(breakers["reports"].state, CircuitBreaker.OPEN)
+        self.assertEqual(breakers.call("fields", lambda: "ok"), "ok")
+
+    def test_client_errors_do_not_open(self):
+        breaker = CircuitBreaker("reports", failure_threshold=1)
+
+        def not_found():
+            raise HTTPError(response=MockedResponse({}, 404))
+
+        with self.assertRaises(HTTPError):
+            breaker.call(not_found)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    @patch("requests.sessions.Session.request")
+    def test_client_circuit_breakers(self, mocked_response):
+        mocked_response.side_effect = [
+            MockedResponse({"token": "token"}),
+            MockedResponse({}, 500, raise_error=True),
+            MockedResponse({"_meta": {"code": 200}}),
+        ]
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+        client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", circuit_breakers=breakers)
+        with self.assertRaises(RequestException):
+            client.get_reports_feedback(report_id=1)
+        with self.assertRaises(CircuitOpenError):
+            client.get_reports_feedback(report_id=2)
+        # other endpoint families are not affected
+        self.assertEqual(client.get_account().json()["_meta"]["code"], 200)
+        self.assertEqual(3, mocked_response.call_count)
+
+
+class AdaptiveConcurrencyLimiterTest(unittest.TestCase):
+    def test_additive_increase(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2, max_limit=3)
+        for _ in range(3):
+            with limiter.slot():
+                self.assertEqual(limiter.in_flight, 1)
+        self.assertEqual(limiter.limit, 3)
+        for _ in range(10):
+            limiter.call(lambda: None)
+        self.assertEqual(limiter.limit, 3)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_multiplicative_decrease(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=8, min_limit=2)
+        with self.assertRaises(ConnectionError):
+            limiter.call(fail)
+        self.assertEqual(limiter.limit, 4)
+        limiter.congested()
+        limiter.congested()
+        self.assertEqual(limiter.limit, 2)
+
+    def test_slow_responses_decrease(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=8, latency_target=1.0)
+        limiter.acquire()
+        limiter.release(latency=2.0)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_acquire_blocks_at_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=1)
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire(timeout=0.01))
+        limiter.release(latency=0.0)
+        self.assertTrue(limiter.acquire(timeout=0.01))
+
+    def test_async_slot(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2, max_limit=2)
+        peak = []
+
+        async def task():
+            async with limiter.async_slot():
+                peak.append(limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(*[task() for _ in range(6)])
+
+        asyncio.run(main())
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_async_waiters_woken_in_order(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=1, max_limit=1)
+        limiter.acquire()
+        order = []
+
+        async def task(number):
+            async with limiter.async_slot():
+                order.append(number)
+
+        async def main():
+            tasks = [asyncio.ensure_future(task(number)) for number in range(5)]
+            # a waiter giving up does not keep a slot
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(task("cancelled"), 0.01)
+            # released from another thread, no coroutine polls meanwhile
+            threading.Timer(0.01, limiter.release, kwargs={"latency": 0.0}).start()
+            await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+        asyncio.run(main())
+        self.assertEqual(order, [0, 1, 2, 3, 4])
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_wrong_limits(self):
+        with self.assertRaises(ValueError):
+            AdaptiveConcurrencyLimiter(initial=10, max_limit=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+from mopinion import MopinionClient
+from mopinion.dataclasses import FeedbackQuery
+from mopinion.sampling import Sample
+from mopinion.sampling import Sampling
+from .mocks.server import StandInServer
+
+import unittest
+
+
+class SamplingTest(unittest.TestCase):
+    def test_validation(self):
+        invalid = (
+            {"fraction": 0},
+            {"fraction": 1.5},
+            {"pages": 0},
+            {"strategy": "systematic"},
+            {"limit": 5000},
+            {"confidence": 1},
+        )
+        for kwargs in invalid:
+            with self.assertRaises(ValueError):
+                Sampling(**kwargs)
+
+    def test_draw(self):
+        strata = Sampling(fraction=0.2, seed=1).draw(50)
+        self.assertEqual(len(strata), 5)
+        self.assertEqual(sum(size for size, _ in strata), 50)
+        for number, (size, pages) in enumerate(strata):
+            self.assertEqual(len(pages), 2)
+            self.assertTrue(all(number * 10 < page <= (number + 1) * 10 for page in pages))
+        self.assertEqual(strata, Sampling(fraction=0.2, seed=1).draw(50))
+
+        (size, pages), = Sampling(pages=7, strategy="random", seed=1).draw(50)
+        self.assertEqual((size, len(pages), len(set(pages))), (50, 7, 7))
+        # at least two pages, at most all of them
+        self.assertEqual(len(Sampling(fraction=0.01).draw(50)[0][1]), 2)
+        self.assertEqual(Sampling(fraction=0.5).draw(1), [(1, [1])])
+        self.assertEqual(Sampling().draw(0), [])
+
+    def test_exact(self):
+        pages = [
+            [{"id": n, "nps": n % 11, "tags": ["web"] if n % 2 else ["app"]} for n in range(start, start + 10)]
+            for start in (0, 10, 20)
+        ]
+        sample = Sample(total=30, limit=10, strata=[(3, pages)], pages=[1, 2, 3], requests=4)
+        self.assertEqual(sample.fraction, 1.0)
+        estimate = sample.count(lambda item: "web" in item["tags"])
+        self.assertEqual((estimate.value, estimate.low, estimate.high), (15, 15, 15))
+        self.assertAlmostEqual(sample.mean("nps").value, sum(n % 11 for n in range(30)) / 30)
+        self.assertEqual(sample.mean("nps").standard_error, 0)
+        self.assertEqual({tag: estimate.value for tag, estimate in sample.distribution("tags").items()}, {"app": 15, "web": 15})
+
+
+class ClientSamplingTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = StandInServer(total=1000).start()
+        self.client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=self.server.url)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.server.stop()
+
+    def test_sample(self):
+        for strategy in ("stratified", "random"):
+            sampling = Sampling(fraction=0.2, limit=20, strategy=strategy, seed=3)
+            sample = self.client.resource("datasets", 1, "feedback", sample=sampling)
+            self.assertEqual(sample.total, 1000)
+            self.assertEqual(sample.requests, 11)
+            self.assertEqual(len(sample.items), 200)
+
+            # feedback is split evenly between the tags
+            web = sample.count(lambda item: "web" in item["tags"])
+            self.assertLessEqual(web.low, 500)
+            self.assertGreaterEqual(web.high, 500)
+            # every page has as many of each, the estimate is exact
+            self.assertEqual(web.standard_error, 0)
+            detractors = sample.count(lambda item: item["fields"][0]["value"] <= 6)
+            true_count = sum(1 for n in range(1, 1001) if n % 11 <= 6)
+            self.assertGreater(detractors.standard_error, 0)
+            self.assertLessEqual(detractors.low, true_count)
+            self.assertGreaterEqual(detractors.high, true_count)
+            share = sample.proportion(lambda item: "web" in item["tags"])
+            self.assertAlmostEqual(share.value * 1000, web.value)
+
+            nps = sample.mean("nps")
+            true_mean = sum(n % 11 for n in range(1, 1001)) / 1000
+            self.assertLessEqual(nps.low, true_mean)
+            self.assertGreaterEqual(nps.high, true_mean)
+            self.assertEqual(len(sample.distribution("nps")), 11)
+            self.assertEqual(sample.count().value, 1000)
+
+        feedback = [path for path in self.server.requests if "/feedback" in path]
+        self.assertIn("/datasets/1/feedback?limit=1&page=1", feedback)
+
+    def test_full_sample(self):
+        query = FeedbackQuery(limit=250)
+        sample = self.client.resource("reports", 1, "feedback", query_params=query, sample=Sampling(fraction=1))
+        self.assertEqual(sample.pages, [1, 2, 3, 4])
+        self.assertEqual(sorted(item["id"] for item in sample.items), list(range(1, 1001)))
+        self.assertEqual(sample.mean("rating").standard_error, 0)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.client.resource("datasets", 1, "fields", sample=Sampling())
+        with self.assertRaises(ValueError):
+            self.client.resource("datasets", 1, "feedback", iterator=True, sample=Sampling())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+from mopinion import MopinionClient
+from mopinion.scheduling import current_priority
+from mopinion.scheduling import priority
+from mopinion.scheduling import PriorityScheduler
+from .mocks.server import StandInServer
+
+import asyncio
+import threading
+import time
+import unittest
+
+
+class PrioritySchedulerTest(unittest.TestCase):
+    def test_priority_context(self):
+        self.assertIsNone(current_priority())
+        with priority("bulk"):
+            self.assertEqual(current_priority(), "bulk")
+            with priority("interactive"):
+                self.assertEqual(current_priority(), "interactive")
+            self.assertEqual(current_priority(), "bulk")
+        self.assertIsNone(current_priority())
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            PriorityScheduler({})
+        with self.assertRaises(ValueError):
+            PriorityScheduler({"bulk": 0})
+        with self.assertRaises(ValueError):
+            PriorityScheduler({"bulk": 1}, default="interactive")
+        scheduler = PriorityScheduler({"interactive": 2, "bulk": 1})
+        self.assertEqual(scheduler.limit, 3)
+        with self.assertRaises(ValueError), priority("unknown"):
+            scheduler.acquire()
+
+    def test_shares(self):
+        scheduler = PriorityScheduler({"interactive": 2, "bulk": 1})
+        self.assertTrue(scheduler.acquire("bulk"))
+        # bulk is at its share, interactive still has room
+        self.assertFalse(scheduler.acquire("bulk", timeout=0.01))
+        self.assertTrue(scheduler.acquire())
+        self.assertTrue(scheduler.acquire("interactive"))
+        self.assertFalse(scheduler.acquire("interactive", timeout=0.01))
+        self.assertEqual(scheduler.in_flight, {"interactive": 2, "bulk": 1})
+
+        scheduler.release("bulk")
+        self.assertEqual(scheduler.completed, {"interactive": 0, "bulk": 1})
+        self.assertEqual(scheduler.waiting, {"interactive": 0, "bulk": 0})
+
+    def test_higher_priority_first(self):
+        scheduler = PriorityScheduler({"interactive": 1, "bulk": 1}, limit=1)
+        scheduler.acquire("bulk")
+        started = []
+
+        def run(name):
+            with scheduler.slot(name):
+                started.append(name)
+
+        bulk = threading.Thread(target=run, args=("bulk",))
+        bulk.start()
+        while not scheduler.waiting["bulk"]:
+            time.sleep(0.001)
+        interactive = threading.Thread(target=run, args=("interactive",))
+        interactive.start()
+        while not scheduler.waiting["interactive"]:
+            time.sleep(0.001)
+
+        scheduler.release("bulk")
+        bulk.join()
+        interactive.join()
+        self.assertEqual(started, ["interactive", "bulk"])
+
+    def test_async_slot(self):
+        scheduler = PriorityScheduler({"interactive": 1, "bulk": 1})
+
+        async def run():
+            with priority("bulk"):
+                async with scheduler.async_slot():
+                    self.assertEqual(scheduler.in_flight["bulk"], 1)
+                    await asyncio.gather(*(inner() for _ in range(3)))
+
+        async def inner():
+            # tasks inherit the priority of their parent
+            self.assertEqual(current_priority(), "bulk")
+            async with scheduler.async_slot("interactive"):
+                await asyncio.sleep(0.01)
+
+        # interactive tasks wait for each other but not for bulk
+        asyncio.run(asyncio.wait_for(run(), 5))
+        self.assertEqual(scheduler.completed, {"interactive": 3, "bulk": 1})
+
+    def test_async_waiters_woken_by_priority(self):
+        scheduler = PriorityScheduler({"interactive": 1, "bulk": 1}, limit=1)
+        scheduler.acquire("bulk")
+        started = []
+
+        async def run(name, number):
+            async with scheduler.async_slot(name):
+                started.append((name, number))
+
+        async def main():
+            tasks = [asyncio.ensure_future(run("bulk", number)) for number in range(2)]
+            tasks += [asyncio.ensure_future(run("interactive", number)) for number in range(2)]
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.waiting, {"interactive": 2, "bulk": 2})
+            # released from another thread, no coroutine polls meanwhile
+            threading.Timer(0.01, scheduler.release, args=("bulk",)).start()
+            await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+        asyncio.run(main())
+        self.assertEqual(
+            started, [("interactive", 0), ("interactive", 1), ("bulk", 0), ("bulk", 1)]
+        )
+        self.assertEqual(scheduler.in_flight, {"interactive": 0, "bulk": 0})
+
+
+class ClientSchedulerTest(unittest.TestCase):
+    def test_client(self):
+        with StandInServer(total=25) as server:
+            scheduler = PriorityScheduler({"interactive": 4, "bulk": 1})
+            client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=server.url, scheduler=scheduler)
+            with priority("bulk"):
+                pages = list(client.get_datasets_feedback(dataset_id=1, iterator=True))
+            client.get_account()
+            client.close()
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(scheduler.completed, {"interactive": 1, "bulk": 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
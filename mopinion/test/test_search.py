@@ -0,0 +1,124 @@
+from mopinion import MopinionClient
+from mopinion.search import decode_varints
+from mopinion.search import encode_varints
+from mopinion.search import FeedbackIndex
+from mopinion.search import tokenize
+from .mocks import MockedResponse
+from .mocks.server import StandInServer
+
+import os
+import shutil
+import tempfile
+import unittest
+
+
+def item(feedback_id, *comments, created="2023-01-01 00:00:00"):
+    fields = [{"key": "nps", "value": "7"}]
+    fields += [{"key": f"comment{n}", "value": comment} for n, comment in enumerate(comments)]
+    return {"id": feedback_id, "created": created, "fields": fields}
+
+
+class HelpersTest(unittest.TestCase):
+    def test_varints(self):
+        numbers = [0, 1, 127, 128, 300, 2**35]
+        data = encode_varints(numbers)
+        self.assertEqual(len(encode_varints([127])), 1)
+        self.assertEqual(len(encode_varints([128])), 2)
+        self.assertEqual(decode_varints(data), numbers)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Works FINE, thanks! Ça marche"), ["works", "fine", "thanks", "ça", "marche"])
+
+
+class FeedbackIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = FeedbackIndex(flush_every=2)
+        pages = [
+            MockedResponse(
+                {
+                    "data": [
+                        item(1, "The website works fine"),
+                        item(2, "Checkout is too slow", "works on the app"),
+                    ]
+                }
+            ),
+            {"data": [item(3, "Fine website, slow checkout"), item(4, "App crashes on checkout")]},
+        ]
+        self.assertEqual(self.index.ingest(pages, "datasets", 1), 4)
+        self.index.ingest([{"data": [item(5, "The website is fine")]}], "reports", 2)
+
+    def tearDown(self) -> None:
+        self.index.close()
+
+    def test_search(self):
+        search = self.index.search
+        self.assertEqual(search("website"), ["1", "3", "5"])
+        self.assertEqual(search("Website FINE"), ["1", "3", "5"])
+        self.assertEqual(search("checkout -app"), ["3"])
+        self.assertEqual(search("checkout -crashes"), ["2", "3"])
+        self.assertEqual(search('"slow checkout"'), ["3"])
+        self.assertEqual(search('"too slow" OR crashes'), ["2", "4"])
+        self.assertEqual(search("website", resource="datasets"), ["1", "3"])
+        self.assertEqual(search("website", resource="reports", resource_id=2), ["5"])
+        self.assertEqual(search("missing"), [])
+        # numbers are not indexed
+        self.assertEqual(search("7"), [])
+        # phrases do not span answers
+        self.assertEqual(search('"slow works"'), [])
+        with self.assertRaises(ValueError):
+            search("-website")
+        with self.assertRaises(ValueError):
+            search("website", resource="accounts")
+
+    def test_segments_and_updates(self):
+        connection = self.index._connection
+        segments = connection.execute("SELECT count(*) FROM postings WHERE term = 'checkout'").fetchone()[0]
+        self.assertEqual(segments, 2)
+
+        # unchanged items are skipped, changed ones replace their old version
+        pages = [{"data": [item(1, "The website works fine"), item(3, "Fast checkout now")]}]
+        self.assertEqual(self.index.ingest(pages, "datasets", 1), 1)
+        self.assertEqual(self.index.search("checkout"), ["2", "4", "3"])
+        self.assertEqual(self.index.search("slow"), ["2"])
+        self.assertEqual(len(self.index), 5)
+
+        self.index.optimize()
+        segments = connection.execute("SELECT count(*) FROM postings WHERE term = 'checkout'").fetchone()[0]
+        self.assertEqual(segments, 1)
+        self.assertEqual(connection.execute("SELECT count(*) FROM replaced").fetchone()[0], 0)
+        self.assertEqual(self.index.search("checkout"), ["2", "4", "3"])
+        self.assertEqual(self.index.search('"fast checkout"'), ["3"])
+        self.assertEqual(self.index.search("slow"), ["2"])
+
+    def test_fields(self):
+        index = FeedbackIndex(fields={"comment1"})
+        index.ingest([{"data": [item(2, "Checkout is too slow", "works on the app")]}], "datasets", 1)
+        self.assertEqual(index.search("app"), ["2"])
+        self.assertEqual(index.search("checkout OR 7"), [])
+        index.close()
+
+
+class FeedbackIndexSyncTest(unittest.TestCase):
+    def test_sync_and_reopen(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "index.db")
+        try:
+            with StandInServer(total=30) as server:
+                client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=server.url)
+                with FeedbackIndex(path) as index:
+                    self.assertEqual(index.sync(client, "datasets", 1), 30)
+                    self.assertEqual(index.last_created("datasets", 1), "2023-01-28 03:00:00")
+                    self.assertEqual(index.search('"number 17"'), ["17"])
+                    self.assertEqual(len(index.search("website fine")), 30)
+
+                with FeedbackIndex(path) as index:
+                    # the items of the newest day are fetched again, but unchanged
+                    self.assertEqual(index.sync(client, "datasets", 1), 0)
+                    self.assertEqual(index.search("17 OR 18"), ["18", "17"])
+                client.close()
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
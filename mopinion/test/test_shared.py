@@ -0,0 +1,162 @@
+from mock import patch
+from mopinion import MopinionClient
+from mopinion import settings
+from mopinion.resilience import AdaptiveConcurrencyLimiter
+from mopinion.shared import SharedRateLimiter
+from mopinion.shared import SharedTokenStore
+from requests.models import Response
+from .mocks.server import StandInServer
+
+import json
+import multiprocessing
+import os
+import shutil
+import stat
+import tempfile
+import time
+import unittest
+
+
+def fetch_token(path, directory):
+    def fetch():
+        with open(os.path.join(directory, "fetches"), "a") as file:
+            file.write("x")
+        time.sleep(0.05)
+        return "token"
+
+    SharedTokenStore(path).get_or_fetch("key", fetch)
+
+
+def acquire(path, count):
+    limiter = SharedRateLimiter(path, rate=50, burst=5)
+    for _ in range(count):
+        limiter.acquire()
+
+
+def response(status_code, body):
+    response = Response()
+    response.status_code = status_code
+    response.url = settings.BASE_URL
+    response._content = json.dumps(body).encode("utf-8")
+    return response
+
+
+class SharedTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def run_processes(self, target, *args, processes=4):
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=target, args=args) for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires fork")
+    def test_token_fetched_once_across_processes(self):
+        self.run_processes(fetch_token, self.path("tokens.json"), self.directory)
+        with open(self.path("fetches")) as file:
+            self.assertEqual(file.read(), "x")
+        self.assertEqual(SharedTokenStore(self.path("tokens.json")).get("key"), "token")
+        self.assertEqual(stat.S_IMODE(os.stat(self.path("tokens.json")).st_mode), 0o600)
+
+    def test_token_store_invalidate(self):
+        store = SharedTokenStore(self.path("tokens.json"))
+        self.assertEqual(store.get_or_fetch("key", lambda: "first"), "first")
+        self.assertEqual(store.get_or_fetch("key", lambda: "second"), "first")
+        store.invalidate("key")
+        self.assertIsNone(store.get("key"))
+        self.assertEqual(store.get_or_fetch("key", lambda: "second"), "second")
+        # a token fetched since by another process is kept
+        store.invalidate("key", "first")
+        self.assertEqual(store.get("key"), "second")
+
+    def test_token_store_key(self):
+        key = SharedTokenStore.key("PUBLIC_KEY", settings.BASE_URL, "PRIVATE_KEY")
+        self.assertEqual(key, SharedTokenStore.key("PUBLIC_KEY", settings.BASE_URL, "PRIVATE_KEY"))
+        self.assertNotEqual(key, SharedTokenStore.key("PUBLIC_KEY", settings.BASE_URL, "ROTATED_KEY"))
+        self.assertNotIn("PRIVATE_KEY", key)
+
+    @patch("requests.sessions.Session.request")
+    def test_client_renews_rejected_token(self, mocked_request):
+        store = SharedTokenStore(self.path("tokens.json"))
+        key = SharedTokenStore.key("PUBLIC_KEY", settings.BASE_URL, "PRIVATE_KEY")
+        store.get_or_fetch(key, lambda: "revoked")
+        mocked_request.side_effect = [
+            response(401, {"_meta": {"code": 401}}),
+            response(200, {"token": "renewed"}),
+            response(200, {"_meta": {"code": 200}}),
+        ]
+        client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", token_store=store)
+        self.assertEqual(client.signature_token, "revoked")
+
+        self.assertEqual(client.get_account().json()["_meta"]["code"], 200)
+        self.assertEqual(client.signature_token, "renewed")
+        self.assertEqual(store.get(key), "renewed")
+        self.assertEqual(mocked_request.call_count, 3)
+
+    def test_rate_limiter(self):
+        limiter = SharedRateLimiter(self.path("rate.json"), rate=10, burst=2)
+        self.assertEqual(limiter.try_acquire(), 0)
+        self.assertEqual(limiter.try_acquire(), 0)
+        self.assertGreater(limiter.try_acquire(), 0)
+        self.assertFalse(limiter.acquire(timeout=0.01))
+        self.assertTrue(limiter.acquire(timeout=1))
+
+        with self.assertRaises(ValueError):
+            SharedRateLimiter(self.path("rate.json"), rate=0)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires fork")
+    def test_rate_limiter_across_processes(self):
+        start = time.monotonic()
+        self.run_processes(acquire, self.path("rate.json"), 5, processes=3)
+        # 15 requests, 5 at once then 50 per second
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_client(self):
+        store = SharedTokenStore(self.path("tokens.json"))
+        limiter = SharedRateLimiter(self.path("rate.json"), rate=1000)
+        with StandInServer() as server:
+            clients = [
+                MopinionClient(
+                    "PUBLIC_KEY",
+                    "PRIVATE_KEY",
+                    base_url=server.url,
+                    token_store=store,
+                    rate_limiter=limiter,
+                )
+                for _ in range(3)
+            ]
+            for client in clients:
+                self.assertEqual(client.signature_token, "stand-in-token")
+                self.assertTrue(client.is_available())
+                client.close()
+            self.assertEqual(server.requests.count("/token"), 1)
+
+    def test_rate_limit_is_not_latency(self):
+        # waiting for the rate limit does not shrink the concurrency limit
+        limiter = AdaptiveConcurrencyLimiter(initial=4, latency_target=0.05)
+        with StandInServer() as server:
+            client = MopinionClient(
+                "PUBLIC_KEY",
+                "PRIVATE_KEY",
+                base_url=server.url,
+                rate_limiter=SharedRateLimiter(self.path("rate.json"), rate=10, burst=1),
+                limiter=limiter,
+            )
+            for _ in range(3):
+                client.get_account()
+            client.close()
+        self.assertGreaterEqual(limiter.limit, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+from mopinion import MopinionClient
+from mopinion.spool import INDEX_RECORD
+from mopinion.spool import PageSpool
+from .mocks.server import StandInServer
+
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class PageSpoolTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "pages.spool")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def test_append_and_read(self):
+        with PageSpool(self.path) as spool:
+            self.assertEqual(spool.append(b'{"page": 1}'), 0)
+            self.assertEqual(spool.raw(0), b'{"page": 1}')
+            spool.extend([b'{"page": 2}', b"", b'{"page": 3}'])
+            self.assertEqual(len(spool), 4)
+            self.assertEqual(spool[-1], {"page": 3})
+            self.assertEqual(spool.raw(2), b"")
+            self.assertEqual(list(spool.iter_raw(start=3)), [b'{"page": 3}'])
+            with self.assertRaises(IndexError):
+                spool.raw(4)
+
+    def test_reopen(self):
+        with PageSpool(self.path) as spool:
+            spool.extend([b'{"page": 1}', b'{"page": 2}'])
+        # an interrupted append: body written, index record cut
+        with open(self.path, "ab") as data, open(f"{self.path}.idx", "ab") as index:
+            data.write(b'{"page": 3')
+            index.write(INDEX_RECORD.pack(22, 11)[:5])
+
+        with PageSpool(self.path) as spool:
+            self.assertEqual(len(spool), 2)
+            spool.append(b'{"page": 3}')
+            self.assertEqual(list(spool), [{"page": 1}, {"page": 2}, {"page": 3}])
+
+        with PageSpool(self.path, truncate=True) as spool:
+            self.assertEqual(len(spool), 0)
+
+    def test_reopen_missing_data(self):
+        with PageSpool(self.path) as spool:
+            spool.extend([b'{"page": 1}', b'{"page": 2}'])
+        # the index reached the disk, the data of the last page did not
+        with open(self.path, "r+b") as data:
+            data.truncate(15)
+
+        with PageSpool(self.path) as spool:
+            self.assertEqual(len(spool), 1)
+            self.assertEqual(list(spool), [{"page": 1}])
+            spool.append(b'{"page": 2}')
+            self.assertEqual(list(spool), [{"page": 1}, {"page": 2}])
+        self.assertEqual(os.path.getsize(f"{self.path}.idx"), 2 * INDEX_RECORD.size)
+
+    def test_remove(self):
+        spool = PageSpool(self.path)
+        spool.append(b"{}")
+        spool.remove()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_client(self):
+        with StandInServer(total=45) as server, PageSpool(self.path) as spool:
+            client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=server.url)
+            pages = client.get_datasets_feedback(
+                dataset_id=1, iterator=True, query_params={"limit": 20}, spool=spool
+            )
+            fetched = [page.json() for page in pages]
+            client.get_account(spool=spool)
+            client.close()
+            requests = len(server.requests)
+
+            self.assertEqual(len(spool), 4)
+            self.assertEqual(list(spool)[:3], fetched)
+            self.assertEqual(spool[1]["data"][0]["id"], 25)
+            self.assertEqual(spool[3]["name"], "Stand-in account")
+            self.assertEqual(len(server.requests), requests)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+from mock import patch
+from mopinion import MopinionClient
+from mopinion.stats import ClientStats
+from mopinion.transports import accept_encoding
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from urllib3.response import HTTPResponse
+from .mocks import MockedResponse
+
+import gzip
+import io
+import json
+import unittest
+
+
+def gzip_response(data: dict, body: bytes) -> Response:
+    headers = {"Content-Encoding": "gzip", "Content-Type": "application/json"}
+    response = Response()
+    response.status_code = 200
+    response.headers = CaseInsensitiveDict(headers)
+    response.raw = HTTPResponse(
+        body=io.BytesIO(body),
+        headers=headers,
+        status=200,
+        preload_content=False,
+        decode_content=True,
+    )
+    # like requests without stream=True, the body is read before returning
+    response.content
+    return response
+
+
+class StatsTest(unittest.TestCase):
+    def test_client_stats(self):
+        stats = ClientStats()
+        self.assertEqual(stats.compression_ratio, 1.0)
+        stats.record_response("gzip", 100, 1000)
+        stats.record_response("identity", 100, 100)
+        self.assertEqual(stats.requests, 2)
+        self.assertEqual(stats.bytes_saved, 900)
+        self.assertEqual(stats.compression_ratio, 5.5)
+        self.assertEqual(stats.encodings, {"gzip": 1, "identity": 1})
+        stats.reset()
+        self.assertEqual(stats.requests, 0)
+
+    def test_accept_encoding(self):
+        decoders = ["gzip", "x-gzip", "deflate", "br", "zstd"]
+        with patch.object(HTTPResponse, "CONTENT_DECODERS", decoders):
+            self.assertEqual(
+                accept_encoding(), "zstd, br;q=0.9, gzip;q=0.8, deflate;q=0.7"
+            )
+        with patch.object(HTTPResponse, "CONTENT_DECODERS", ["gzip", "deflate"]):
+            self.assertEqual(accept_encoding(), "gzip, deflate;q=0.9")
+
+    @patch("requests.sessions.Session.request")
+    def test_compressed_transfer_recorded(self, mocked_response):
+        data = {"_meta": {"code": 200}, "data": [{"comment": "great"}] * 100}
+        body = gzip.compress(json.dumps(data).encode("utf-8"))
+        mocked_response.side_effect = [
+            MockedResponse({"token": "token"}),
+            gzip_response(data, body),
+        ]
+        client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY")
+        self.assertIn("gzip", client.session.headers["Accept-Encoding"])
+
+        response = client.request("/account")
+        self.assertEqual(response.json(), data)
+        self.assertEqual(client.stats.requests, 1)
+        self.assertEqual(client.stats.encodings, {"gzip": 1})
+        self.assertEqual(client.stats.bytes_decoded, len(json.dumps(data)))
+        self.assertEqual(client.stats.bytes_received, len(body))
+        self.assertLess(client.stats.bytes_received, client.stats.bytes_decoded)
+
+
+if __name__ == "__main__":
+    unittest.main()
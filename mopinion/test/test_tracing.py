@@ -0,0 +1,138 @@
+from mopinion import MopinionClient
+from mopinion.tracing import format_summary
+from mopinion.tracing import read_trace
+from mopinion.tracing import summarize
+from mopinion.tracing import to_har
+from mopinion.tracing import Tracer
+from requests.exceptions import HTTPError
+from .mocks.server import StandInServer
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+def entry(request_id, family, started, time, retries=0, error=None):
+    entry = {
+        "id": request_id,
+        "type": "request",
+        "started": started,
+        "method": "GET",
+        "endpoint": f"/{family}",
+        "family": family,
+        "params": {"page": request_id},
+        "status": 503 if error else 200,
+        "wait": time / 2,
+        "receive": time / 2,
+        "retries": retries,
+        "received": 100,
+        "size": 400,
+        "time": time,
+    }
+    if error:
+        entry["error"] = error
+    return entry
+
+
+class TracerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = StandInServer(total=25).start()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def test_trace(self):
+        tracer = Tracer()
+        client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=self.server.url, tracer=tracer)
+        for page in client.get_datasets_feedback(dataset_id=1, iterator=True):
+            page.json()
+        with self.assertRaises(HTTPError):
+            client.get_reports(report_id=1)
+        client.close()
+
+        # the iterator decodes the pages again for their metadata, not recorded
+        decodes = [line["id"] for line in tracer.entries if line["type"] == "decode"]
+        self.assertEqual(len(decodes), 3)
+        self.assertEqual(len(set(decodes)), 3)
+
+        entries = read_trace(tracer)
+        self.assertEqual(len(entries), 4)
+        first = entries[0]
+        self.assertEqual(first["family"], "datasets/feedback")
+        self.assertEqual(first["endpoint"], "/datasets/1/feedback")
+        self.assertEqual(first["status"], 200)
+        self.assertEqual(first["retries"], 0)
+        self.assertGreater(first["size"], 0)
+        self.assertLessEqual(first["wait"], first["time"])
+        self.assertIsNotNone(first["decode"])
+        self.assertEqual(entries[1]["params"], {"limit": "10", "page": "2"})
+        missing = entries[-1]
+        self.assertEqual(missing["status"], 404)
+        self.assertIn("HTTPError", missing["error"])
+        self.assertIsNone(missing["decode"])
+
+    def test_trace_file(self):
+        path = os.path.join(self.directory, "run.trace")
+        with Tracer(path) as tracer:
+            client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=self.server.url, tracer=tracer)
+            client.get_account().json()
+            list(client.get_reports_feedback(report_id=1, iterator=True))
+            client.close()
+        with open(path) as file:
+            lines = [json.loads(line) for line in file]
+        # the iterator decodes the pages for their metadata
+        self.assertEqual([line["type"] for line in lines], ["request", "decode"] * 4)
+
+        summary = summarize(path)
+        self.assertEqual(summary["requests"], 4)
+        families = {endpoint["family"]: endpoint for endpoint in summary["endpoints"]}
+        self.assertEqual(families["reports/feedback"]["requests"], 3)
+        self.assertEqual(families["account"]["requests"], 1)
+        self.assertEqual(len(summary["decode_heavy"]), 4)
+        self.assertIn("reports/feedback", format_summary(summary))
+
+        har = to_har(path, base_url=self.server.url)
+        self.assertEqual(har["log"]["version"], "1.2")
+        self.assertEqual(len(har["log"]["entries"]), 4)
+        self.assertTrue(har["log"]["entries"][0]["request"]["url"].endswith("/account"))
+        self.assertEqual(har["log"]["entries"][0]["timings"]["connect"], -1)
+
+
+class SummaryTest(unittest.TestCase):
+    def test_summary(self):
+        entries = [entry(n, "datasets/feedback", n, 100 * n) for n in range(1, 6)]
+        # a burst of retries and errors on reports
+        entries += [entry(n, "reports/feedback", 100 + n, 50, retries=2) for n in range(6, 9)]
+        entries += [entry(9, "reports/feedback", 109, 10, error="HTTPError: 503")]
+        entries += [entry(10, "reports/feedback", 500, 10, retries=1)]
+        entries.append({"type": "decode", "id": 2, "time": 30.0})
+        entries.append({"type": "decode", "id": 4, "time": 80.0})
+
+        summary = summarize(entries, top=2, storm_window=30, storm_threshold=5)
+        self.assertEqual(summary["requests"], 10)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["retries"], 7)
+        self.assertEqual(summary["decode"], 110.0)
+
+        datasets, reports = summary["endpoints"]
+        self.assertEqual(datasets["family"], "datasets/feedback")
+        self.assertEqual((datasets["requests"], datasets["time"], datasets["max"]), (5, 1500, 500))
+        self.assertEqual((reports["retries"], reports["errors"]), (7, 1))
+
+        self.assertEqual([item["id"] for item in summary["slowest"]], [5, 4])
+        self.assertEqual([item["id"] for item in summary["decode_heavy"]], [4, 2])
+        self.assertEqual(
+            summary["retry_storms"],
+            [{"family": "reports/feedback", "since": 106, "until": 109, "retries": 7}],
+        )
+        report = format_summary(summary)
+        self.assertIn("Retry storms:", report)
+        self.assertIn("Decode-heavy pages:", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
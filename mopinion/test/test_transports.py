@@ -0,0 +1,89 @@
+from mopinion import MopinionClient
+from mopinion.transports import HttpxTransport
+from mopinion.transports import RequestsTransport
+from mopinion.transports import Urllib3Transport
+from requests.exceptions import HTTPError
+from .mocks.server import StandInServer
+
+import requests
+import socket
+import unittest
+
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class TransportTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = StandInServer(total=25).start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def check_transport(self, transport):
+        with MopinionClient(
+            "PUBLIC_KEY", "PRIVATE_KEY", transport=transport, base_url=self.server.url
+        ) as client:
+            self.assertEqual(client.signature_token, "stand-in-token")
+            self.assertTrue(client.is_available())
+
+            pages = list(
+                client.get_datasets_feedback(
+                    dataset_id=1, query_params={"limit": 10}, iterator=True
+                )
+            )
+            self.assertEqual([len(page.json()["data"]) for page in pages], [10, 10, 5])
+            self.assertEqual(pages[0].json()["data"][0]["id"], 25)
+
+            # compressed responses are recorded
+            self.assertEqual(client.stats.encodings.get("gzip"), 4)
+            self.assertLess(client.stats.bytes_received, client.stats.bytes_decoded)
+
+            with self.assertRaises(HTTPError):
+                client.get_deployments("unknown")
+
+        self.assertEqual(self.server.requests[2], "/datasets/1/feedback?limit=10")
+
+    def test_requests_transport(self):
+        self.check_transport(RequestsTransport(base_url=self.server.url))
+
+    def test_urllib3_transport(self):
+        self.check_transport(Urllib3Transport(base_url=self.server.url))
+
+    @unittest.skipIf(httpx is None, "httpx is not installed")
+    def test_httpx_transport(self):
+        self.check_transport(HttpxTransport(base_url=self.server.url, http2=False))
+
+
+class DeadServerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # a port nothing listens on
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    def check_transport(self, transport):
+        with transport:
+            with self.assertRaises(requests.ConnectionError):
+                transport.request("GET", f"{self.url}/ping", headers={}, timeout=5)
+            with self.assertRaises(requests.ConnectionError):
+                transport.stream("GET", f"{self.url}/ping", headers={}, timeout=5)
+            with self.assertRaises(requests.ConnectionError):
+                MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", transport=transport, base_url=self.url)
+
+    def test_requests_transport(self):
+        self.check_transport(RequestsTransport(base_url=self.url, max_retries=0))
+
+    def test_urllib3_transport(self):
+        self.check_transport(Urllib3Transport(base_url=self.url, max_retries=0))
+
+    @unittest.skipIf(httpx is None, "httpx is not installed")
+    def test_httpx_transport(self):
+        self.check_transport(HttpxTransport(base_url=self.url, max_retries=0, http2=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
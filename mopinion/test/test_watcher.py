@@ -0,0 +1,141 @@
+from mopinion import MopinionClient
+from mopinion.watcher import FeedbackWatcher
+from .mocks.server import StandInServer
+
+import asyncio
+import time
+import unittest
+
+
+class FeedbackWatcherTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = StandInServer(total=50).start()
+        self.client = MopinionClient("PUBLIC_KEY", "PRIVATE_KEY", base_url=self.server.url)
+        self.events = []
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.server.stop()
+
+    def callback(self, resource, resource_id, item):
+        self.events.append((resource, resource_id, item["id"]))
+
+    def feedback_requests(self):
+        return [path for path in self.server.requests if "/feedback" in path]
+
+    def test_poll(self):
+        watcher = FeedbackWatcher(self.client, limit=10, callback=self.callback)
+        watcher.watch("datasets", 1)
+        # the first poll records the newest item
+        self.assertEqual(watcher.poll("datasets", 1), [])
+        self.assertEqual(watcher.watches["datasets", "1"].last_id, 50)
+        self.assertEqual(watcher.poll("datasets", 1), [])
+
+        self.server.total = 53
+        items = watcher.poll("datasets", 1)
+        self.assertEqual([item["id"] for item in items], [51, 52, 53])
+        self.assertEqual(self.events, [("datasets", 1, 51), ("datasets", 1, 52), ("datasets", 1, 53)])
+
+        # more new items than a page
+        self.server.total = 78
+        del self.server.requests[:]
+        self.assertEqual(len(watcher.poll("datasets", 1)), 25)
+        self.assertEqual(len(self.feedback_requests()), 3)
+        self.assertIn("filter%5Bdate%5D=gte%3A", self.feedback_requests()[0])
+
+        watch = watcher.watches["datasets", "1"]
+        self.assertEqual((watch.polls, watch.delivered), (4, 28))
+
+    def test_first_feedback_of_an_empty_resource(self):
+        watcher = FeedbackWatcher(self.client, limit=10, callback=self.callback)
+        self.server.total = 0
+        watcher.watch("datasets", 1)
+        self.assertEqual(watcher.poll("datasets", 1), [])
+        self.assertTrue(watcher.watches["datasets", "1"].initialized)
+        self.assertIsNone(watcher.watches["datasets", "1"].last_id)
+
+        self.server.total = 1
+        self.assertEqual([item["id"] for item in watcher.poll("datasets", 1)], [1])
+        self.assertEqual(self.events, [("datasets", 1, 1)])
+        self.assertEqual(watcher.poll("datasets", 1), [])
+
+    def test_adaptive_intervals(self):
+        watcher = FeedbackWatcher(self.client, min_interval=0.01, max_interval=0.08)
+        watch = watcher.watch("reports", 2, callback=self.callback)
+        self.assertEqual(watcher.run_pending(), 1)
+        self.assertEqual(watch.interval, 0.02)
+        self.assertEqual(watcher.run_pending(), 0)
+        time.sleep(0.03)
+        watcher.run_pending()
+        self.assertEqual(watch.interval, 0.04)
+
+        self.server.total = 60
+        time.sleep(0.05)
+        watcher.run_pending()
+        self.assertEqual(watch.interval, 0.02)
+        self.assertEqual(len(self.events), 10)
+
+        # idle resources stay at the maximum
+        for _ in range(4):
+            time.sleep(watch.interval + 0.01)
+            watcher.run_pending()
+        self.assertEqual(watch.interval, 0.08)
+
+    def test_errors(self):
+        class FailingClient:
+            def resource(self, *args, **kwargs):
+                raise ConnectionError("unreachable")
+
+        errors = []
+        watcher = FeedbackWatcher(
+            FailingClient(), min_interval=0.01, on_error=lambda watch, error: errors.append(error)
+        )
+        watch = watcher.watch("datasets", 1)
+        watcher.run_pending()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(watch.errors, 1)
+        self.assertEqual(watch.interval, 0.02)
+
+    def test_background_thread_and_subscribe(self):
+        watcher = FeedbackWatcher(self.client, min_interval=0.01, max_interval=0.02)
+
+        async def receive():
+            queue = watcher.subscribe()
+            watcher.watch("datasets", 3)
+            with watcher:
+                await asyncio.sleep(0.05)
+                self.server.total = 52
+                return [await asyncio.wait_for(queue.get(), 5) for _ in range(2)]
+
+        events = asyncio.run(receive())
+        self.assertEqual(
+            [(resource, id, item["id"]) for resource, id, item in events],
+            [("datasets", 3, 51), ("datasets", 3, 52)],
+        )
+
+    def test_subscribe_full_queue(self):
+        watcher = FeedbackWatcher(self.client, min_interval=0.01, max_interval=0.02)
+
+        async def receive():
+            queue = watcher.subscribe(maxsize=1)
+            watcher.watch("datasets", 3)
+            with watcher:
+                await asyncio.sleep(0.05)
+                self.server.total = 55
+                await asyncio.sleep(0.2)
+                # the watcher waits for room instead of dropping events
+                self.assertTrue(queue.full())
+                return [await asyncio.wait_for(queue.get(), 5) for _ in range(5)]
+
+        events = asyncio.run(receive())
+        self.assertEqual([item["id"] for _, _, item in events], [51, 52, 53, 54, 55])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            FeedbackWatcher(self.client, min_interval=10, max_interval=1)
+        with self.assertRaises(ValueError):
+            FeedbackWatcher(self.client).watch("account", 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
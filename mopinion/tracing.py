@@ -0,0 +1,337 @@
+"""
+Per-request traces of a client, and a summary of their hotspots.
+
+With ``tracer=Tracer(path)`` a ``MopinionClient`` writes one JSON line per
+request to ``path``: endpoint and query, start time, time to the response
+headers (``wait``), time to read the body (``receive``), retries made by the
+transport, status, bytes received and decoded, and the error if any. The time
+spent decoding a body with ``response.json()`` is written as a separate line
+when it happens.
+
+The HTTP pools of ``requests`` and ``urllib3`` do not report the time spent
+connecting or negotiating TLS: it is part of ``wait``, and ``connect`` and
+``ssl`` are -1 in the HAR export like any unavailable timing.
+
+``summarize`` reads a trace and reports the slowest endpoint families and
+requests, retry storms and decode-heavy pages. ``to_har`` converts a trace to a
+HAR 1.2 document for browser tools. ``mopinion trace FILE`` prints the summary.
+
+Examples:
+  >>> from mopinion import MopinionClient
+  >>> from mopinion.tracing import Tracer, format_summary, summarize
+  >>> with Tracer("nightly.trace") as tracer:
+  ...     client = MopinionClient(PUBLICKEY, PRIVATEKEY, tracer=tracer)
+  ...     for page in client.get_reports_feedback(report_id=123, iterator=True):
+  ...         store(page.json())
+  >>> print(format_summary(summarize("nightly.trace")))
+"""
+from collections import defaultdict
+from datetime import datetime
+from datetime import timezone
+from requests.models import Response
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Union
+
+import functools
+import itertools
+import json
+import threading
+import time
+
+
+__all__ = ["Tracer", "format_summary", "read_trace", "summarize", "to_har"]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+class Tracer:
+    """Record a trace of the requests of a client.
+
+    Args:
+      path (str): Optional. File the trace is appended to, one JSON object per
+        line. Without it the trace is only kept in ``entries``.
+
+    Attributes:
+      entries (list): Entries recorded, when there is no ``path``.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.entries: List[dict] = []
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def record(self, entry: dict) -> None:
+        with self._lock:
+            if self._file is None:
+                self.entries.append(entry)
+            else:
+                self._file.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+
+    def start(self) -> dict:
+        """Open an entry, completed by ``finish``."""
+        return {"id": next(self._ids), "started": time.time(), "_start": time.monotonic()}
+
+    def finish(
+        self,
+        entry: dict,
+        method: str,
+        endpoint: str,
+        family: str,
+        params: Optional[dict],
+        response: Optional[Response] = None,
+        received: Optional[int] = None,
+        error: Optional[BaseException] = None,
+        streamed: bool = False,
+    ) -> None:
+        """Record a request, from the response or the error it ended with."""
+        total = time.monotonic() - entry.pop("_start")
+        entry.update(type="request", method=method, endpoint=endpoint, family=family, params=params)
+        if error is not None and response is None:
+            response = getattr(error, "response", None)
+        if response is not None:
+            # requests measures the time to the response headers
+            elapsed = response.elapsed.total_seconds() if response.elapsed else None
+            wait = total if elapsed is None or streamed else min(elapsed, total)
+            retries = getattr(getattr(response.raw, "retries", None), "history", ())
+            entry.update(
+                status=response.status_code,
+                wait=_ms(wait),
+                receive=_ms(total - wait),
+                retries=len(retries),
+                received=received,
+                size=None if streamed else len(response.content),
+            )
+        entry["time"] = _ms(total)
+        if error is not None:
+            entry["error"] = f"{type(error).__name__}: {error}"
+        self.record(entry)
+        if response is not None and error is None:
+            self._time_decoding(entry["id"], response)
+
+    def _time_decoding(self, request_id: int, response: Response) -> None:
+        # the body is decoded by the caller, if ever; only the first decode is
+        # recorded, then the method of the response is restored
+        decode = response.json
+
+        @functools.wraps(decode)
+        def json(**kwargs):
+            response.__dict__.pop("json", None)
+            start = time.monotonic()
+            try:
+                return decode(**kwargs)
+            finally:
+                self.record({"type": "decode", "id": request_id, "time": _ms(time.monotonic() - start)})
+
+        response.json = json
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_trace(trace: Union[str, Tracer, Iterable[dict]]) -> List[dict]:
+    """Request entries of a trace file or tracer, with their decode time."""
+    if isinstance(trace, Tracer):
+        lines = list(trace.entries)
+    elif isinstance(trace, str):
+        with open(trace, encoding="utf-8") as file:
+            lines = [json.loads(line) for line in file if line.strip()]
+    else:
+        lines = list(trace)
+    requests = {}
+    decoding = defaultdict(float)
+    for line in lines:
+        if line.get("type") == "decode":
+            decoding[line["id"]] += line["time"]
+        else:
+            requests[line["id"]] = dict(line)
+    for request_id, entry in requests.items():
+        entry["decode"] = round(decoding[request_id], 3) if request_id in decoding else None
+    return sorted(requests.values(), key=lambda entry: entry["started"])
+
+
+def _percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def summarize(
+    trace: Union[str, Tracer, Iterable[dict]],
+    top: int = 10,
+    storm_window: float = 60.0,
+    storm_threshold: int = 5,
+) -> dict:
+    """Hotspots of a trace.
+
+    Args:
+      trace: Trace file, ``Tracer`` or entries.
+      top (int): Requests listed as the slowest and most decode-heavy. Defaults to 10.
+      storm_window (float): Seconds of a retry storm. Defaults to 60.
+      storm_threshold (int): Retries and failed requests of a family within
+        ``storm_window`` that make a storm. Defaults to 5.
+
+    Returns:
+      dict with ``requests``, ``errors``, ``retries``, ``time``, ``decode``
+      (milliseconds), ``endpoints`` (per family, by total time), ``slowest``,
+      ``retry_storms`` and ``decode_heavy``.
+    """
+    entries = read_trace(trace)
+    families = defaultdict(list)
+    for entry in entries:
+        families[entry["family"]].append(entry)
+
+    endpoints = []
+    for family, group in families.items():
+        times = [entry["time"] for entry in group]
+        endpoints.append(
+            {
+                "family": family,
+                "requests": len(group),
+                "errors": sum(1 for entry in group if entry.get("error")),
+                "retries": sum(entry.get("retries") or 0 for entry in group),
+                "time": round(sum(times), 3),
+                "mean": round(sum(times) / len(times), 3),
+                "p95": _percentile(times, 0.95),
+                "max": max(times),
+                "decode": round(sum(entry["decode"] or 0 for entry in group), 3),
+                "received": sum(entry.get("received") or 0 for entry in group),
+            }
+        )
+    endpoints.sort(key=lambda endpoint: endpoint["time"], reverse=True)
+
+    storms = []
+    for family, group in families.items():
+        # retries and failures of the family in a sliding window
+        events = [
+            (entry["started"], (entry.get("retries") or 0) + (1 if entry.get("error") else 0))
+            for entry in group
+        ]
+        events = [event for event in events if event[1]]
+        start, count, storm = 0, 0, None
+        for end, (started, weight) in enumerate(events):
+            count += weight
+            while started - events[start][0] > storm_window:
+                count -= events[start][1]
+                start += 1
+            if count >= storm_threshold:
+                if storm is not None and events[start][0] <= storm["until"]:
+                    storm["until"] = started
+                    storm["retries"] = max(storm["retries"], count)
+                else:
+                    storm = {"family": family, "since": events[start][0], "until": started, "retries": count}
+                    storms.append(storm)
+    storms.sort(key=lambda storm: storm["since"])
+
+    decoded = [entry for entry in entries if entry["decode"] is not None]
+    decode_heavy = sorted(decoded, key=lambda entry: entry["decode"], reverse=True)[:top]
+    return {
+        "requests": len(entries),
+        "errors": sum(1 for entry in entries if entry.get("error")),
+        "retries": sum(entry.get("retries") or 0 for entry in entries),
+        "time": round(sum(entry["time"] for entry in entries), 3),
+        "decode": round(sum(entry["decode"] or 0 for entry in decoded), 3),
+        "endpoints": endpoints,
+        "slowest": sorted(entries, key=lambda entry: entry["time"], reverse=True)[:top],
+        "retry_storms": storms,
+        "decode_heavy": decode_heavy,
+    }
+
+
+def _request_line(entry: dict) -> str:
+    query = "&".join(f"{key}={value}" for key, value in (entry.get("params") or {}).items())
+    url = f"{entry['endpoint']}?{query}" if query else entry["endpoint"]
+    return f"{url} ({entry.get('status', entry.get('error'))})"
+
+
+def format_summary(summary: dict) -> str:
+    """Text report of ``summarize``."""
+    lines = [
+        f"{summary['requests']} requests, {summary['errors']} errors, "
+        f"{summary['retries']} retries, {summary['time']:.0f} ms in requests, "
+        f"{summary['decode']:.0f} ms decoding",
+        "",
+        "Endpoints by total time:",
+    ]
+    for endpoint in summary["endpoints"]:
+        lines.append(
+            f"  {endpoint['family']:<24} {endpoint['requests']:>6} req {endpoint['time']:>10.0f} ms"
+            f"  mean {endpoint['mean']:.0f}  p95 {endpoint['p95']:.0f}  max {endpoint['max']:.0f}"
+            f"  retries {endpoint['retries']}  decode {endpoint['decode']:.0f} ms"
+        )
+    lines += ["", "Slowest requests:"]
+    for entry in summary["slowest"]:
+        lines.append(f"  {entry['time']:>10.0f} ms  {_request_line(entry)}")
+    if summary["retry_storms"]:
+        lines += ["", "Retry storms:"]
+        for storm in summary["retry_storms"]:
+            since = datetime.fromtimestamp(storm["since"], timezone.utc).strftime("%H:%M:%S")
+            until = datetime.fromtimestamp(storm["until"], timezone.utc).strftime("%H:%M:%S")
+            lines.append(f"  {storm['family']}: {storm['retries']} retries {since}-{until} UTC")
+    if summary["decode_heavy"]:
+        lines += ["", "Decode-heavy pages:"]
+        for entry in summary["decode_heavy"]:
+            lines.append(
+                f"  {entry['decode']:>10.0f} ms decoding, {entry['time']:.0f} ms request  {_request_line(entry)}"
+            )
+    return "\n".join(lines)
+
+
+def to_har(trace: Union[str, Tracer, Iterable[dict]], base_url: str = "") -> dict:
+    """HAR 1.2 document of a trace, decode times in the ``_decode`` timing."""
+    entries = []
+    for entry in read_trace(trace):
+        params = entry.get("params") or {}
+        entries.append(
+            {
+                "startedDateTime": datetime.fromtimestamp(entry["started"], timezone.utc).isoformat(),
+                "time": entry["time"],
+                "request": {
+                    "method": entry["method"],
+                    "url": f"{base_url}{entry['endpoint']}",
+                    "httpVersion": "HTTP/1.1",
+                    "headers": [],
+                    "cookies": [],
+                    "queryString": [{"name": key, "value": str(value)} for key, value in params.items()],
+                    "headersSize": -1,
+                    "bodySize": 0,
+                },
+                "response": {
+                    "status": entry.get("status", 0),
+                    "statusText": entry.get("error", ""),
+                    "httpVersion": "HTTP/1.1",
+                    "headers": [],
+                    "cookies": [],
+                    "content": {"size": entry.get("size") or -1, "mimeType": "application/json"},
+                    "redirectURL": "",
+                    "headersSize": -1,
+                    "bodySize": entry["received"] if entry.get("received") is not None else -1,
+                },
+                "cache": {},
+                "timings": {
+                    "blocked": -1,
+                    "dns": -1,
+                    "connect": -1,
+                    "ssl": -1,
+                    "send": 0,
+                    "wait": entry.get("wait", entry["time"]),
+                    "receive": entry.get("receive", 0),
+                    "_decode": entry["decode"] if entry["decode"] is not None else -1,
+                    "_retries": entry.get("retries", 0),
+                },
+            }
+        )
+    return {"log": {"version": "1.2", "creator": {"name": "mopinion", "version": ""}, "entries": entries}}
@@ -0,0 +1,411 @@
+"""
+HTTP transports used by the client to send requests.
+
+The default transport is built on ``requests``. Alternative backends can be
+selected with the ``transport`` argument of ``MopinionClient``:
+
+  - ``RequestsTransport``: ``requests.Session`` with an ``HTTPAdapter``. Default.
+  - ``Urllib3Transport``: a raw ``urllib3.PoolManager``, with less overhead per call.
+  - ``HttpxTransport``: an ``httpx.Client``, with optional HTTP/2 multiplexing.
+    Requires ``pip install mopinion[http2]``.
+
+Every transport returns ``requests.models.Response`` objects and raises the
+``requests.exceptions`` of a failure, so the resource API does not depend on
+the backend.
+
+Requests sent within ``send_deadline`` stop retrying when the backoff would
+outlast the deadline.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from mopinion import settings
+from requests.adapters import HTTPAdapter
+from requests.adapters import Retry
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from typing import Any
+from typing import Optional
+from urllib3.response import HTTPResponse
+
+import abc
+import os
+import requests
+import threading
+import time
+import urllib3
+import urllib.parse
+import weakref
+
+
+__all__ = [
+    "accept_encoding",
+    "ConnectionTransport",
+    "DeadlineRetry",
+    "HttpxTransport",
+    "RequestsTransport",
+    "send_deadline",
+    "Transport",
+    "Urllib3Transport",
+]
+
+
+# time.monotonic() by which the requests being sent must be done
+_deadline_at: ContextVar[Optional[float]] = ContextVar("mopinion_deadline_at", default=None)
+
+
+@contextmanager
+def send_deadline(deadline_at: Optional[float]):
+    """Stop retrying the requests sent in the block at ``deadline_at``.
+
+    Applies to the retries of ``RequestsTransport`` and ``Urllib3Transport``.
+
+    Args:
+      deadline_at (float): ``time.monotonic()`` by which the requests must be done.
+    """
+    token = _deadline_at.set(deadline_at)
+    try:
+        yield
+    finally:
+        _deadline_at.reset(token)
+
+
+class DeadlineRetry(Retry):
+    """``Retry`` giving up when the backoff would outlast the ``send_deadline``."""
+
+    def increment(self, *args, **kwargs) -> Retry:
+        retry = super().increment(*args, **kwargs)
+        deadline_at = _deadline_at.get()
+        if deadline_at is not None and time.monotonic() + retry.get_backoff_time() >= deadline_at:
+            # no time left for another attempt, fail as if the retries were exhausted
+            return self.new(total=0).increment(*args, **kwargs)
+        return retry
+
+
+def accept_encoding() -> str:
+    """Build the ``Accept-Encoding`` header from the decoders available in urllib3.
+
+    Brotli and zstd are offered only when their optional packages (``brotli`` and
+    ``zstandard``) are installed. Encodings are weighted in order of preference.
+    """
+    encodings = [
+        encoding
+        for encoding in settings.ACCEPT_ENCODINGS
+        if encoding in HTTPResponse.CONTENT_DECODERS
+    ]
+    return ", ".join(
+        f"{encoding};q={1 - index / 10:.1f}" if index else encoding
+        for index, encoding in enumerate(encodings)
+    )
+
+
+def _urllib3_error(error: Exception) -> requests.RequestException:
+    """The ``requests`` exception of a urllib3 error, mapped like ``HTTPAdapter.send``."""
+    if isinstance(error, urllib3.exceptions.MaxRetryError):
+        reason = error.reason
+        if isinstance(reason, urllib3.exceptions.ConnectTimeoutError) and not isinstance(
+            reason, urllib3.exceptions.NewConnectionError
+        ):
+            return requests.exceptions.ConnectTimeout(error)
+        if isinstance(reason, urllib3.exceptions.ReadTimeoutError):
+            return requests.exceptions.ReadTimeout(error)
+        if isinstance(reason, urllib3.exceptions.ResponseError):
+            return requests.exceptions.RetryError(error)
+        if isinstance(reason, urllib3.exceptions.ProxyError):
+            return requests.exceptions.ProxyError(error)
+        if isinstance(reason, urllib3.exceptions.SSLError):
+            return requests.exceptions.SSLError(error)
+        return requests.exceptions.ConnectionError(error)
+    if isinstance(error, urllib3.exceptions.SSLError):
+        return requests.exceptions.SSLError(error)
+    if isinstance(error, urllib3.exceptions.ReadTimeoutError):
+        return requests.exceptions.ReadTimeout(error)
+    if isinstance(error, urllib3.exceptions.DecodeError):
+        return requests.exceptions.ContentDecodingError(error)
+    if isinstance(error, urllib3.exceptions.LocationValueError):
+        return requests.exceptions.InvalidURL(error)
+    return requests.exceptions.ConnectionError(error)
+
+
+def _httpx_error(error: Exception) -> requests.RequestException:
+    """The ``requests`` exception of an httpx error."""
+    import httpx
+
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.exceptions.ConnectTimeout(error)
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.ReadTimeout(error)
+    if isinstance(error, httpx.RemoteProtocolError):
+        # the server closed the connection or sent a broken body
+        return requests.exceptions.ChunkedEncodingError(error)
+    if isinstance(error, httpx.DecodingError):
+        return requests.exceptions.ContentDecodingError(error)
+    if isinstance(error, httpx.TooManyRedirects):
+        return requests.exceptions.TooManyRedirects(error)
+    if isinstance(error, httpx.InvalidURL):
+        return requests.exceptions.InvalidURL(error)
+    return requests.exceptions.ConnectionError(error)
+
+
+class Transport(abc.ABC):
+    """Interface of the transports used by ``MopinionClient``."""
+
+    base_url: str = settings.BASE_URL
+
+    @abc.abstractmethod
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: dict,
+        params: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Response:
+        """Send a request. ``timeout`` in seconds, no timeout when not given."""
+        raise NotImplementedError
+
+    def stream(
+        self,
+        method: str,
+        url: str,
+        headers: dict,
+        params: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Response:
+        """Send a request without reading the body, read it with ``iter_content``.
+
+        Transports that cannot stream read the body before returning.
+        """
+        return self.request(method, url, headers, params, timeout)
+
+    def transferred_bytes(self, response: Response) -> Optional[int]:
+        """Bytes read from the network for ``response``, before decompression."""
+        raw = getattr(response, "raw", None)
+        if isinstance(raw, HTTPResponse):
+            return raw.tell()
+        return None
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ConnectionTransport(Transport):
+    """Base class of the transports holding connections.
+
+    Subclasses build a connection object (a session, a pool, ...) with ``_build``
+    and send requests with it in ``_send``. The base class makes them fork-safe:
+    when the process has been forked the inherited connections are discarded and
+    new ones are built. With ``thread_local=True`` every thread gets its own connection.
+
+    Args:
+      base_url (str): Defaults to the Mopinion API.
+      max_retries (int): Defaults to 3.
+      backoff_factor (int): Defaults to 1.
+      thread_local (bool): One connection per thread. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        base_url: str = settings.BASE_URL,
+        max_retries: int = 3,
+        backoff_factor: int = 1,
+        thread_local: bool = False,
+    ) -> None:
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.thread_local = thread_local
+        self._reset()
+
+    @abc.abstractmethod
+    def _build(self) -> Any:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _send(
+        self,
+        connection: Any,
+        method: str,
+        url: str,
+        headers: dict,
+        params: Optional[dict],
+        timeout: Optional[float],
+    ) -> Response:
+        raise NotImplementedError
+
+    def _stream(self, connection, method, url, headers, params, timeout) -> Response:
+        return self._send(connection, method, url, headers, params, timeout)
+
+    def _close(self, connection: Any) -> None:
+        connection.close()
+
+    @property
+    def connection(self) -> Any:
+        """Connection for the current process, and thread if ``thread_local`` is set."""
+        if self._pid != os.getpid():
+            self._reset()
+
+        if not self.thread_local:
+            return self._connection
+
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._track(self._build())
+        return connection
+
+    def _track(self, connection: Any) -> Any:
+        with self._connections_lock:
+            self._connections.add(connection)
+        return connection
+
+    def _reset(self) -> None:
+        # Connections inherited from a parent process are dropped, not closed:
+        # their sockets are still in use by the parent.
+        self._pid = os.getpid()
+        self._connections_lock = threading.Lock()
+        self._connections = weakref.WeakSet()
+        self._local = threading.local()
+        self._connection = None if self.thread_local else self._track(self._build())
+
+    def request(self, method, url, headers, params=None, timeout=None) -> Response:
+        return self._send(self.connection, method, url, headers, params, timeout)
+
+    def stream(self, method, url, headers, params=None, timeout=None) -> Response:
+        return self._stream(self.connection, method, url, headers, params, timeout)
+
+    def close(self) -> None:
+        if self._pid != os.getpid():
+            return
+        with self._connections_lock:
+            connections = list(self._connections)
+        for connection in connections:
+            self._close(connection)
+
+
+class RequestsTransport(ConnectionTransport):
+    """Transport on top of ``requests.Session``."""
+
+    @property
+    def session(self) -> requests.Session:
+        return self.connection
+
+    def _build(self) -> requests.Session:
+        session = requests.Session()
+        session.headers["Accept-Encoding"] = accept_encoding()
+        retries = DeadlineRetry(total=self.max_retries, backoff_factor=self.backoff_factor)
+        adapter = HTTPAdapter(max_retries=retries)
+        session.mount(self.base_url, adapter=adapter)
+        return session
+
+    def _send(self, session, method, url, headers, params, timeout, **kwargs):
+        kwargs.update(method=method, url=url, headers=headers)
+        if params:
+            kwargs["params"] = params
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return session.request(**kwargs)
+
+    def _stream(self, session, method, url, headers, params, timeout):
+        return self._send(session, method, url, headers, params, timeout, stream=True)
+
+
+class Urllib3Transport(ConnectionTransport):
+    """Transport on top of ``urllib3.PoolManager``, skipping the ``requests`` machinery."""
+
+    def _build(self) -> urllib3.PoolManager:
+        retries = DeadlineRetry(total=self.max_retries, backoff_factor=self.backoff_factor)
+        return urllib3.PoolManager(retries=retries)
+
+    def _close(self, pool: urllib3.PoolManager) -> None:
+        pool.clear()
+
+    def _stream(self, pool, method, url, headers, params, timeout):
+        if params:
+            url = f"{url}?{urllib.parse.urlencode(params, doseq=True)}"
+        headers = {"Accept-Encoding": accept_encoding(), **headers}
+        try:
+            raw = pool.request(
+                method,
+                url,
+                headers=headers,
+                preload_content=False,
+                decode_content=True,
+                timeout=urllib3.Timeout(total=timeout),
+            )
+        except (urllib3.exceptions.HTTPError, OSError) as error:
+            raise _urllib3_error(error) from error
+
+        response = Response()
+        response.status_code = raw.status
+        response.headers = CaseInsensitiveDict(raw.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = raw.reason
+        response.url = url
+        response.raw = raw
+        return response
+
+    def _send(self, pool, method, url, headers, params, timeout):
+        response = self._stream(pool, method, url, headers, params, timeout)
+        # read the body, the connection goes back to the pool once consumed;
+        # iter_content raises the requests exceptions of a broken body
+        response.content
+        return response
+
+
+class HttpxTransport(ConnectionTransport):
+    """Transport on top of ``httpx.Client``.
+
+    With ``http2=True`` (default) concurrent requests from several threads are
+    multiplexed over a single HTTP/2 connection, so ``thread_local`` should be
+    left disabled. Retries are only applied to connection errors.
+
+    Args:
+      http2 (bool): Defaults to True.
+    """
+
+    def __init__(self, *args, http2: bool = True, **kwargs) -> None:
+        self.http2 = http2
+        super().__init__(*args, **kwargs)
+
+    def _build(self):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError(
+                "HttpxTransport requires httpx, install it with: pip install mopinion[http2]"
+            ) from None
+
+        transport = httpx.HTTPTransport(http2=self.http2, retries=self.max_retries)
+        return httpx.Client(http2=self.http2, transport=transport, timeout=None)
+
+    def _send(self, client, method, url, headers, params, timeout):
+        import httpx
+
+        try:
+            raw = client.request(
+                method, url, headers=headers, params=params, timeout=timeout
+            )
+        except (
+            httpx.TransportError, httpx.DecodingError, httpx.TooManyRedirects, httpx.InvalidURL
+        ) as error:
+            raise _httpx_error(error) from error
+
+        response = Response()
+        response.status_code = raw.status_code
+        response.headers = CaseInsensitiveDict(raw.headers)
+        response.encoding = raw.encoding
+        response.reason = raw.reason_phrase
+        response.url = str(raw.url)
+        response.elapsed = raw.elapsed
+        response.raw = raw
+        response._content = raw.content
+        return response
+
+    def transferred_bytes(self, response: Response) -> Optional[int]:
+        return getattr(response.raw, "num_bytes_downloaded", None)
@@ -0,0 +1,284 @@
+"""
+Watch datasets and reports for new feedback.
+
+``FeedbackWatcher`` polls many resources from a single scheduler thread. Each
+resource has its own interval: it is halved when a poll finds new feedback and
+doubled when it finds none or fails, within ``min_interval`` and
+``max_interval``, so busy resources are polled often and idle ones rarely.
+
+A poll requests the newest feedback, from the day of the newest item seen, and
+stops paginating at the first item already seen. New items are delivered oldest
+first to the callbacks and to the asyncio queues of ``subscribe``.
+
+Examples:
+  >>> from mopinion.watcher import FeedbackWatcher
+  >>> watcher = FeedbackWatcher(client, min_interval=10, max_interval=600)
+  >>> watcher.watch("datasets", 123, callback=print)
+  >>> watcher.watch("reports", 456, callback=print)
+  >>> with watcher:  # polls in a background thread
+  ...     time.sleep(3600)
+  >>>
+  >>> queue = watcher.subscribe()  # from a coroutine
+  >>> resource, resource_id, item = await queue.get()
+"""
+from dataclasses import dataclass
+from dataclasses import field
+from mopinion.dataclasses import FeedbackQuery
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+import asyncio
+import concurrent.futures
+import heapq
+import threading
+import time
+
+
+__all__ = ["FeedbackWatcher", "Watch"]
+
+
+@dataclass
+class Watch:
+    """State of a watched resource."""
+
+    resource: str
+    resource_id: Union[str, int]
+    interval: float
+    callback: Optional[Callable] = None
+    initialized: bool = False
+    last_id: Optional[int] = None
+    last_created: Optional[str] = None
+    polls: int = 0
+    delivered: int = 0
+    errors: int = 0
+    due: float = field(default=0.0, repr=False)
+
+
+class FeedbackWatcher:
+    """Poll resources for new feedback with adaptive intervals.
+
+    Args:
+      client (MopinionClient):
+      min_interval (float): Seconds between polls of a busy resource. Defaults to 5.
+      max_interval (float): Seconds between polls of an idle resource. Defaults to 300.
+      limit (int): Items per page. Defaults to 20.
+      callback (callable): Optional. Called with ``(resource, resource_id, item)``
+        for every new item of resources watched without a callback of their own.
+      on_error (callable): Optional. Called with ``(watch, error)`` when a poll fails.
+    """
+
+    def __init__(
+        self,
+        client,
+        min_interval: float = 5,
+        max_interval: float = 300,
+        limit: int = 20,
+        callback: Optional[Callable] = None,
+        on_error: Optional[Callable] = None,
+    ) -> None:
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Intervals need 0 < min_interval <= max_interval")
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.limit = limit
+        self.callback = callback
+        self.on_error = on_error
+        self.watches: Dict[Tuple[str, str], Watch] = {}
+        self._queue: List[Tuple[float, int, Tuple[str, str]]] = []
+        self._counter = 0
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def watch(
+        self,
+        resource: str,
+        resource_id: Union[str, int],
+        callback: Optional[Callable] = None,
+    ) -> Watch:
+        """Start watching a dataset or report, polled right away."""
+        if resource not in ("datasets", "reports"):
+            raise ValueError(
+                f"'{resource}' is not a valid resource. "
+                "Please consider one of: 'datasets, reports'"
+            )
+        key = (resource, str(resource_id))
+        with self._lock:
+            watch = self.watches.get(key)
+            if watch is None:
+                watch = self.watches[key] = Watch(
+                    resource, resource_id, self.min_interval, callback
+                )
+                self._schedule(key, time.monotonic())
+        self._wake.set()
+        return watch
+
+    def unwatch(self, resource: str, resource_id: Union[str, int]) -> None:
+        with self._lock:
+            self.watches.pop((resource, str(resource_id)), None)
+
+    def subscribe(self, maxsize: int = 0) -> asyncio.Queue:
+        """Queue receiving ``(resource, resource_id, item)`` for every new item.
+
+        Must be called from a coroutine, the queue belongs to its event loop.
+        When a queue with a ``maxsize`` is full, the polls wait for room.
+        """
+        queue = asyncio.Queue(maxsize)
+        with self._lock:
+            self._subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def _schedule(self, key: Tuple[str, str], due: float) -> None:
+        self.watches[key].due = due
+        self._counter += 1
+        heapq.heappush(self._queue, (due, self._counter, key))
+
+    def poll(self, resource: str, resource_id: Union[str, int]) -> List[dict]:
+        """Poll a watched resource now and deliver its new items.
+
+        The first poll only records the newest item, if any: the items found by
+        the next polls are new, even when the resource had none at first.
+
+        Returns:
+          New items, oldest first.
+        """
+        watch = self.watches[(resource, str(resource_id))]
+        watch.polls += 1
+        query = FeedbackQuery(
+            limit=self.limit,
+            date_from=watch.last_created[:10] if watch.last_created else None,
+        )
+        pages = self.client.resource(
+            resource,
+            resource_id=resource_id,
+            sub_resource_name="feedback",
+            query_params=query,
+            iterator=True,
+        )
+        first = not watch.initialized
+        items = []
+        try:
+            for page in pages:
+                data = page.json().get("data") or []
+                new = [item for item in data if self._is_new(watch, item)]
+                items.extend(new)
+                # the first poll only needs the newest item
+                if len(new) < len(data) or first:
+                    break
+        finally:
+            pages.close()
+
+        items.sort(key=lambda item: int(item["id"]))
+        watch.initialized = True
+        if items:
+            watch.last_id = int(items[-1]["id"])
+            watch.last_created = items[-1].get("created") or watch.last_created
+        if first:
+            return []
+        for item in items:
+            self._deliver(watch, item)
+        watch.delivered += len(items)
+        return items
+
+    @staticmethod
+    def _is_new(watch: Watch, item: dict) -> bool:
+        return "id" in item and (watch.last_id is None or int(item["id"]) > watch.last_id)
+
+    def _deliver(self, watch: Watch, item: dict) -> None:
+        event = (watch.resource, watch.resource_id, item)
+        callback = watch.callback or self.callback
+        if callback is not None:
+            callback(*event)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            self._put(loop, queue, event)
+
+    def _put(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, event) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            # polled from the event loop itself, it cannot wait for room
+            queue.put_nowait(event)
+            return
+        # a full queue holds the polls back until the subscriber catches up
+        future = asyncio.run_coroutine_threadsafe(queue.put(event), loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return
+            except concurrent.futures.TimeoutError:
+                if self._stopped.is_set() or loop.is_closed():
+                    future.cancel()
+                    return
+
+    def run_pending(self) -> int:
+        """Poll the resources that are due and schedule their next poll.
+
+        Returns:
+          Number of polls.
+        """
+        polls = 0
+        while True:
+            with self._lock:
+                if not self._queue or self._queue[0][0] > time.monotonic():
+                    return polls
+                due, _, key = heapq.heappop(self._queue)
+                watch = self.watches.get(key)
+                if watch is None or watch.due != due:
+                    # unwatched, or rescheduled
+                    continue
+
+            try:
+                items = self.poll(watch.resource, watch.resource_id)
+            except Exception as error:
+                watch.errors += 1
+                watch.interval = min(self.max_interval, watch.interval * 2)
+                if self.on_error is not None:
+                    self.on_error(watch, error)
+            else:
+                if items:
+                    watch.interval = max(self.min_interval, watch.interval / 2)
+                else:
+                    watch.interval = min(self.max_interval, watch.interval * 2)
+            polls += 1
+            with self._lock:
+                if key in self.watches:
+                    self._schedule(key, time.monotonic() + watch.interval)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self.run_pending()
+            with self._lock:
+                wait = self._queue[0][0] - time.monotonic() if self._queue else None
+            self._wake.wait(wait if wait is None else max(0.0, wait))
+            self._wake.clear()
+
+    def start(self) -> "FeedbackWatcher":
+        """Poll in a background thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="mopinion-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -47,6 +47,11 @@ setup(
     install_requires=install_requires,
     tests_require=tests_require,
     python_requires=">=3.6",
-    extras_require={"test": tests_require},
-    entry_points={"console_scripts": []},
+    extras_require={
+        "test": tests_require,
+        "compression": ["brotli", "zstandard"],
+        "http2": ["httpx[http2]"],
+        "analytics": ["numpy"],
+    },
+    entry_points={"console_scripts": ["mopinion = mopinion.cli:main"]},
 )